@@ -0,0 +1,136 @@
+"""A background service that keeps distance readings fresh."""
+
+import threading
+
+import numpy
+
+from clock import RealClock
+from sensor import SWEEP_DTYPE
+
+DEFAULT_BUFFER_SIZE = 256	# Readings kept in the history ring buffer
+
+
+class AcquisitionService(object):
+	"""Continuously sweep a sensor through a schedule of angles.
+
+	Readings are written from a background thread into a timestamped ring
+	buffer, and into a table of the latest reading for each scheduled angle.
+	Both are protected by a lock, so a control loop can read the latest
+	reading for an angle at any time without waiting on the sensor.
+	"""
+
+	def __init__(self, sensor, angles, buffer_size=DEFAULT_BUFFER_SIZE,
+				 clock=None):
+		"""Create an AcquisitionService.
+
+		Args:
+		sensor - a sensor that provides iter_sweep(), such as an
+			UltrasonicSensor.
+		angles - the schedule of directions to sense, in degrees.
+		buffer_size - the number of readings kept in the history.
+		clock - the clock the sensor timestamps readings with (default
+			RealClock()).
+		"""
+
+		if not angles:
+			raise ValueError('no angles scheduled')
+
+		self.sensor = sensor
+		self.angles = list(angles)
+		self.clock = clock or RealClock()
+		self.error = None
+
+		self._slots = {}
+		for angle in self.angles:
+			self._slots.setdefault(angle, len(self._slots))
+		self._latest = numpy.zeros(len(self._slots), dtype=SWEEP_DTYPE)
+		self._latest['timestamp'] = numpy.nan	# no reading yet
+		self._buffer = numpy.zeros(buffer_size, dtype=SWEEP_DTYPE)
+		self._count = 0
+		self._lock = threading.Lock()
+		self._stop_event = threading.Event()
+		self._thread = None
+
+	@property
+	def running(self):
+		return self._thread is not None and self._thread.is_alive()
+
+	@property
+	def count(self):
+		"""The total number of readings taken since creation."""
+
+		return self._count
+
+	def start(self):
+		"""Start sweeping in the background, if not already running."""
+
+		if self.running:
+			return
+		self.error = None
+		self._stop_event.clear()
+		self._thread = threading.Thread(target=self._run, name='acquisition')
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self, timeout=None):
+		"""Stop sweeping, and wait for the current reading to complete."""
+
+		self._stop_event.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+
+	def _run(self):
+		try:
+			while not self._stop_event.is_set():
+				for reading in self.sensor.iter_sweep(self.angles):
+					self._record(reading)
+					if self._stop_event.is_set():
+						break
+		except Exception as e:
+			self.error = e
+
+	def _record(self, reading):
+		with self._lock:
+			self._buffer[self._count % len(self._buffer)] = reading
+			self._latest[self._slots[reading[0]]] = reading
+			self._count += 1
+
+	def latest(self, angle, max_age=None):
+		"""Return the latest reading in the given direction.
+
+		Args:
+		angle - a scheduled direction, in degrees.
+		max_age - if given, readings older than this many seconds are
+			treated as missing.
+
+		Returns a tuple (distance, timestamp), or None if there is no fresh
+		reading.  Raises the sensor's exception if the service has failed.
+		"""
+
+		if self.error is not None:
+			raise self.error
+		try:
+			slot = self._slots[angle]
+		except KeyError:
+			raise ValueError('angle {0} is not scheduled'.format(angle))
+
+		with self._lock:
+			angle, distance, timestamp = self._latest[slot]
+
+		if numpy.isnan(timestamp):
+			return None
+		if max_age is not None and self.clock.time() - timestamp > max_age:
+			return None
+		return int(distance), float(timestamp)
+
+	def history(self):
+		"""Return a copy of the buffered readings, oldest first."""
+
+		with self._lock:
+			size = len(self._buffer)
+			if self._count <= size:
+				return self._buffer[:self._count].copy()
+			start = self._count % size
+			return numpy.concatenate((self._buffer[start:],
+									  self._buffer[:start]))
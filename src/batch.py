@@ -0,0 +1,187 @@
+"""Monte Carlo experiments for tuning CorridorState in the simulation.
+
+Each configuration in a grid of controller gains and corridor conditions is
+run several times with different seeds, in parallel, and the metrics of
+every run are written to a columnar results file:
+
+	python batch.py --tau-p 0.1,0.2,0.4 --tau-d 0.5,1.0 --width 50,60,80 \\
+		--sensor-noise 0,2 --offset -10,0,10 --runs 20 -o results.npz
+
+Load the results with numpy.load(); each metric and parameter is an array
+with one entry per run.
+"""
+
+import argparse
+from collections import namedtuple
+import itertools
+import multiprocessing
+
+import numpy
+
+import simdriver
+import state
+
+CORRIDOR_LENGTH = 300	# Length of the simulated corridor, in cm
+START_X = 20			# Distance of the starting position along the corridor
+TIME_LIMIT = 120		# Secs of simulated time before a run is abandoned
+
+Config = namedtuple('Config', ['tau_p', 'tau_d', 'width', 'sensor_noise',
+							   'motion_noise', 'offset', 'heading'])
+DEFAULTS = Config(tau_p=state.CorridorState.TAU_P,
+				  tau_d=state.CorridorState.TAU_D,
+				  width=60, sensor_noise=1.0, motion_noise=0.02, offset=0,
+				  heading=0.0)
+
+RESULT_DTYPE = numpy.dtype([(name, float) for name in Config._fields] + [
+	('config', int),			# index of the configuration in the grid
+	('seed', int),
+	('cte_rms', float),			# RMS cross-track error while moving, in cm
+	('exit_time', float),		# secs to reach the end, or nan
+	('steering_effort', float),	# mean absolute steering factor
+	('steps', int),				# number of steering adjustments
+	('collided', bool),
+	('timed_out', bool),
+])
+
+
+def grid(**values):
+	"""Return the list of Configs for every combination of the values.
+
+	Keyword arguments are sequences of values for the fields of Config.
+	Fields that are not given take their value from DEFAULTS.
+	"""
+
+	fields = [values.get(name, [DEFAULTS._asdict()[name]])
+			  for name in Config._fields]
+	return [Config(*combination) for combination in itertools.product(*fields)]
+
+
+def run_one(task):
+	"""Run CorridorState once in a simulated corridor.
+
+	Args:
+	task - a tuple (config index, Config, seed).
+
+	Returns a tuple of the fields of RESULT_DTYPE.
+	"""
+
+	index, config, seed = task
+	numpy.random.seed(seed)		# CorridorState samples its sensing directions
+
+	r = simdriver.build_robot(
+		maze=simdriver.corridor(width=config.width, length=CORRIDOR_LENGTH),
+		pose=(START_X, config.width / 2.0 + config.offset, config.heading),
+		sensor_noise=config.sensor_noise, motion_noise=config.motion_noise,
+		seed=seed, time_limit=TIME_LIMIT)
+
+	steering = []
+	steer = r.steer
+	def record_steer(steering_factor):
+		steering.append(steering_factor)
+		steer(steering_factor)
+	r.steer = record_steer
+
+	corridor_state = state.CorridorState(r)
+	corridor_state.TAU_P = config.tau_p
+	corridor_state.TAU_D = config.tau_d
+
+	timed_out = False
+	try:
+		corridor_state.run()
+	except simdriver.SimulationTimeout:
+		timed_out = True
+
+	world = simdriver.world
+	t, x, y, theta = numpy.array(world.trajectory).T
+	cte = y[1:] - config.width / 2.0	# positive is left of center
+	cte_rms = numpy.sqrt(numpy.mean(cte ** 2)) if len(cte) else 0.0
+	end = numpy.flatnonzero(x >= CORRIDOR_LENGTH - config.width / 2.0)
+	exit_time = t[end[0]] if len(end) else numpy.nan
+	effort = numpy.mean(numpy.abs(steering)) if steering else 0.0
+
+	return tuple(config) + (index, seed, cte_rms, exit_time, effort,
+							len(steering), world.collided, timed_out)
+
+
+def run_batch(configs, runs=1, processes=None, seed=0):
+	"""Run every configuration several times, in parallel.
+
+	Args:
+	configs - a sequence of Configs.
+	runs - the number of runs of each configuration.
+	processes - the number of worker processes (default one per core).
+	seed - the first of the consecutive seeds given to the runs.
+
+	Returns a numpy array of RESULT_DTYPE, with the runs of each
+	configuration in order.
+	"""
+
+	tasks = [(i, config, seed + i * runs + k)
+			 for i, config in enumerate(configs) for k in range(runs)]
+	processes = processes or multiprocessing.cpu_count()
+	chunksize = max(1, len(tasks) // (4 * processes))
+	pool = multiprocessing.Pool(processes)
+	try:
+		results = pool.map(run_one, tasks, chunksize)
+	finally:
+		pool.close()
+		pool.join()
+
+	return numpy.array(results, dtype=RESULT_DTYPE)
+
+
+def save(path, results):
+	"""Write results to a compressed file with one array per field."""
+
+	numpy.savez_compressed(path, **dict(
+		(name, results[name]) for name in results.dtype.names))
+
+
+def summarize(results):
+	"""Return one line per configuration, best mean CTE RMS first."""
+
+	lines = []
+	for i in numpy.unique(results['config']):
+		runs = results[results['config'] == i]
+		lines.append((runs['cte_rms'].mean(), '{0}: cte_rms={1:.1f} '
+					  'exited={2}/{3} collided={4} effort={5:.2f}'.format(
+						  Config(*[runs[0][name] for name in Config._fields]),
+						  runs['cte_rms'].mean(),
+						  numpy.isfinite(runs['exit_time']).sum(), len(runs),
+						  runs['collided'].sum(),
+						  runs['steering_effort'].mean())))
+
+	return [line for _, line in sorted(lines)]
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Run CorridorState in simulated corridors.')
+	for name in Config._fields:
+		parser.add_argument('--' + name.replace('_', '-'),
+							type=lambda s: [float(v) for v in s.split(',')],
+							default=[getattr(DEFAULTS, name)],
+							help='comma-separated values (default {0})'
+							.format(getattr(DEFAULTS, name)))
+	parser.add_argument('--runs', type=int, default=10,
+						help='runs of each configuration')
+	parser.add_argument('--processes', type=int, default=None,
+						help='worker processes (default one per core)')
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('-o', '--output', default='results.npz',
+						help='the results file to write')
+	args = parser.parse_args()
+
+	configs = grid(**dict((name, getattr(args, name))
+						  for name in Config._fields))
+	results = run_batch(configs, runs=args.runs, processes=args.processes,
+						seed=args.seed)
+	save(args.output, results)
+
+	for line in summarize(results):
+		print line
+	print 'Wrote {0} runs to {1}'.format(len(results), args.output)
+
+
+if __name__ == '__main__':
+	main()
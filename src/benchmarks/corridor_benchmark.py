@@ -0,0 +1,58 @@
+"""Measure the time to drive a corridor, stopping to orient or on the move.
+
+Run from the src directory with: python -m benchmarks.corridor_benchmark
+
+The simulated robot starts near the closed end of a straight corridor, off
+center and turned a little, and follows it with CorridorState, once
+stopping to orient itself first, and once in continuous mode.  Times are
+the mean simulated seconds until the robot is within a half width of the
+open end, over the runs that didn't collide with a wall.
+"""
+
+import numpy
+
+import simdriver
+import state
+
+RUNS = 20				# Runs of each mode
+WIDTH = 60				# Cm between the walls of the corridor
+LENGTH = 300			# Cm from the closed end to the open end
+OFFSETS = [-5, 0, 5]	# Cm of the start from the center, to the left
+HEADINGS = [-0.2, -0.1, 0, 0.1, 0.2]	# Radians of the start off the corridor
+SENSOR_NOISE = 1.0
+MOTION_NOISE = 0.02
+
+
+def drive(seed, continuous):
+	"""Return the simulated secs to reach the end, or None on a collision."""
+
+	numpy.random.seed(seed)		# CorridorState samples its sensing directions
+	r = simdriver.build_robot(
+		maze=simdriver.corridor(width=WIDTH, length=LENGTH),
+		pose=(20, WIDTH / 2.0 + OFFSETS[seed % len(OFFSETS)],
+			  HEADINGS[seed % len(HEADINGS)]),
+		sensor_noise=SENSOR_NOISE, motion_noise=MOTION_NOISE, seed=seed,
+		time_limit=120)
+	state.CorridorState(r, continuous=continuous).run()
+
+	world = simdriver.world
+	t, x, y, theta = numpy.array(world.trajectory).T
+	end = numpy.flatnonzero(x >= LENGTH - WIDTH / 2.0)
+	if world.collided or not len(end):
+		return None
+	return t[end[0]]
+
+
+def main():
+	print '{0:>12} {1:>8} {2:>8} {3:>9}'.format('mode', 'secs', 'std',
+											   'collided')
+	for name, continuous in (('stop', False), ('continuous', True)):
+		times = [drive(seed, continuous) for seed in range(RUNS)]
+		finished = [t for t in times if t is not None]
+		print '{0:>12} {1:>8.1f} {2:>8.2f} {3:>9}'.format(
+			name, numpy.mean(finished), numpy.std(finished),
+			len(times) - len(finished))
+
+
+if __name__ == '__main__':
+	main()
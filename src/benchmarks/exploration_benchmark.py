@@ -0,0 +1,103 @@
+"""Measure the time to replan each tick of exploration, as the map grows.
+
+Run from the src directory with: python -m benchmarks.exploration_benchmark
+
+The simulated robot explores random mazes of 40 cm cells.  Replanning is
+updating the frontiers and path costs with the cells touched by a sweep, and
+finding the next waypoint.  After each maze's table, how many of its cell
+centres were mapped free, and whether the robot hit a wall.
+"""
+
+from timeit import default_timer
+
+import numpy
+
+from exploration import FrontierExplorer
+from maze import MazeGrid
+import simdriver
+import state
+
+SIZES = [4, 6, 8]	# Cells along each side of the mazes
+BINS = 4			# Rows of the table for each maze, by size of the map
+
+
+def random_maze(size, random):
+	"""Return a MazeGrid of size x size cells, with one path between any two.
+
+	The maze is carved by a depth-first search from the top left cell.
+	"""
+
+	h_walls = numpy.ones((size + 1, size), dtype=bool)
+	v_walls = numpy.ones((size, size + 1), dtype=bool)
+	visited = {(0, 0)}
+	stack = [(0, 0)]
+	while stack:
+		row, col = stack[-1]
+		unvisited = [(row + dr, col + dc)
+					 for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1))
+					 if 0 <= row + dr < size and 0 <= col + dc < size and
+					 (row + dr, col + dc) not in visited]
+		if not unvisited:
+			stack.pop()
+			continue
+		next_row, next_col = unvisited[random.randint(len(unvisited))]
+		if next_row != row:
+			h_walls[max(row, next_row), col] = False
+		else:
+			v_walls[row, max(col, next_col)] = False
+		visited.add((next_row, next_col))
+		stack.append((next_row, next_col))
+	return MazeGrid(h_walls, v_walls)
+
+
+class TimedExplorer(FrontierExplorer):
+	"""A FrontierExplorer that records the time of each replan."""
+
+	def __init__(self, *args, **kwargs):
+		super(TimedExplorer, self).__init__(*args, **kwargs)
+		self.ticks = []		# (cells known, traversable cells, seconds)
+		self._began = None
+
+	def update(self, ix, iy):
+		self._began = default_timer()
+		return super(TimedExplorer, self).update(ix, iy)
+
+	def next_waypoint(self, x, y, *args, **kwargs):
+		result = super(TimedExplorer, self).next_waypoint(x, y, *args,
+														  **kwargs)
+		if self._began is not None:
+			self.ticks.append((len(self.known), len(self.traversable),
+							   default_timer() - self._began))
+			self._began = None
+		return result
+
+
+def main():
+	random = numpy.random.RandomState(0)
+	print '{0:>6} {1:>10} {2:>11} {3:>8} {4:>10} {5:>10}'.format(
+		'maze', 'known', 'traversable', 'ticks', 'mean ms', 'max ms')
+	for size in SIZES:
+		grid = random_maze(size, random)
+		x, y = grid.cell_center(size - 1, 0)
+		r = simdriver.build_robot(maze=grid.to_maze(), pose=(x, y, 0),
+								  time_limit=3600)
+		explore = state.ExplorationState(r, pose=(x, y, 0))
+		explore.explorer = TimedExplorer(explore.grid)
+		explored = explore.run()
+
+		ticks = numpy.array(explore.explorer.ticks)
+		for rows in numpy.array_split(numpy.arange(len(ticks)), BINS):
+			known, traversable, seconds = ticks[rows].T
+			print '{0:>6} {1:>10} {2:>11} {3:>8} {4:>10.2f} {5:>10.2f}'.format(
+				'{0}x{0}'.format(size), '{0:.0f}'.format(known.max()),
+				'{0:.0f}'.format(traversable.max()), len(rows),
+				seconds.mean() * 1e3, seconds.max() * 1e3)
+		mapped = sum(explored.log_odds(*grid.cell_center(row, col)) < 0
+					 for row in range(size) for col in range(size))
+		print '{0:>6} {1}/{2} cell centres mapped free{3}'.format(
+			'', mapped, size * size,
+			', collided' if simdriver.world.collided else '')
+
+
+if __name__ == '__main__':
+	main()
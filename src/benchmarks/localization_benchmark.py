@@ -0,0 +1,61 @@
+"""Time one particle filter step against the number of particles.
+
+Run from the src directory with: python -m benchmarks.localization_benchmark
+"""
+
+import math
+import os
+import shutil
+import tempfile
+import timeit
+
+import numpy
+
+from localization import ParticleFilter
+from maze import Maze
+import rangetable
+
+PARTICLE_COUNTS = [1000, 2000, 5000, 10000, 20000, 50000]
+ANGLES = [270, 0, 90]
+REPEAT = 5
+
+# A 4x4 maze of 30 cm cells: the outer box plus interior walls.
+WALLS = [
+	(0, 0, 120, 0), (120, 0, 120, 120), (120, 120, 0, 120), (0, 120, 0, 0),
+	(30, 0, 30, 60), (30, 90, 90, 90), (60, 30, 60, 90), (60, 30, 90, 30),
+	(90, 60, 120, 60), (90, 90, 90, 120), (0, 90, 30, 90),
+]
+
+
+def time_step(maze, n_particles, number):
+	"""Return the best time of one predict/update step, in milliseconds."""
+
+	pf = ParticleFilter(maze, n_particles=n_particles, seed=0)
+	distances = maze.expected_range(15, 15, math.pi / 2 -
+									numpy.radians(ANGLES)).tolist()
+
+	def step():
+		pf.step(2.0, 0.0, ANGLES, distances)
+
+	return min(timeit.repeat(step, number=number, repeat=REPEAT)) / number * 1e3
+
+
+def main(number=10):
+	maze = Maze(WALLS)
+	tmp = tempfile.mkdtemp()
+	try:
+		table = rangetable.build(maze, os.path.join(tmp, 'maze.rtbl'))
+		print '{0} walls, {1} readings per step'.format(len(WALLS),
+														len(ANGLES))
+		print '{0:>10} {1:>14} {2:>14}'.format('particles', 'ray cast ms',
+											   'range table ms')
+		for n in PARTICLE_COUNTS:
+			print '{0:>10} {1:>14.2f} {2:>14.2f}'.format(
+				n, time_step(maze, n, number), time_step(table, n, number))
+		del table
+	finally:
+		shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+	main()
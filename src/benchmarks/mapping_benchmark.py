@@ -0,0 +1,74 @@
+"""Measure the rate of integrating readings into an occupancy grid.
+
+Run from the src directory with: python -m benchmarks.mapping_benchmark
+"""
+
+import math
+import os
+import shutil
+import tempfile
+import timeit
+
+import numpy
+
+from mapping import OccupancyGrid
+from maze import Maze
+
+RESOLUTIONS = [2.0, 4.0, 8.0]
+ANGLES = [a % 360 for a in range(270, 460, 10)]	# one sweep per pose
+POSES = 100
+REPEAT = 3
+
+# The 4x4 maze of 30 cm cells of localization_benchmark, and the same walls
+# ten times larger, so readings reach the sensor's maximum range.
+WALLS = [
+	(0, 0, 120, 0), (120, 0, 120, 120), (120, 120, 0, 120), (0, 120, 0, 0),
+	(30, 0, 30, 60), (30, 90, 90, 90), (60, 30, 60, 90), (60, 30, 90, 30),
+	(90, 60, 120, 60), (90, 90, 90, 120), (0, 90, 30, 90),
+]
+
+
+def sweeps(maze, scale, n):
+	"""Return n (pose, distances) pairs at random poses in the maze."""
+
+	random = numpy.random.RandomState(0)
+	result = []
+	for i in range(n):
+		pose = (random.uniform(5, 115) * scale, random.uniform(5, 115) * scale,
+				random.uniform(-math.pi, math.pi))
+		distances = maze.expected_range(pose[0], pose[1],
+										pose[2] - numpy.radians(ANGLES))
+		result.append((pose, distances))
+	return result
+
+
+def main():
+	tmp = tempfile.mkdtemp()
+	try:
+		print '{0} readings per sweep, {1} sweeps'.format(len(ANGLES), POSES)
+		print '{0:>6} {1:>6} {2:>12} {3:>8} {4:>12} {5:>12}'.format(
+			'scale', 'cm', 'readings/s', 'tiles', 'memory KB', 'snapshot KB')
+		for scale in [1, 10]:
+			maze = Maze([[c * scale for c in wall] for wall in WALLS])
+			data = sweeps(maze, scale, POSES)
+			for resolution in RESOLUTIONS:
+				def run():
+					grid = OccupancyGrid(resolution=resolution)
+					for pose, distances in data:
+						grid.integrate(pose, ANGLES, distances)
+					return grid
+
+				seconds = min(timeit.repeat(run, number=1, repeat=REPEAT))
+				grid = run()
+				path = os.path.join(tmp, 'map.rmap')
+				grid.save(path)
+				print ('{0:>6} {1:>6} {2:>12.0f} {3:>8} {4:>12.0f} {5:>12.0f}'
+					   .format(scale, resolution, POSES * len(ANGLES) / seconds,
+							   len(grid.tiles), grid.nbytes / 1024.0,
+							   os.path.getsize(path) / 1024.0))
+	finally:
+		shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,59 @@
+"""Compare matrix.matrix with npmatrix.matrix on small square matrices.
+
+Run from the src directory with: python -m benchmarks.matrix_benchmark
+"""
+
+import random
+import timeit
+
+import matrix
+import npmatrix
+
+
+SIZES = range(2, 13)
+REPEAT = 3
+
+
+def spd_values(n):
+	"""Return an n*n symmetric positive-definite matrix as nested lists."""
+
+	a = [[random.uniform(-1, 1) for j in range(n)] for i in range(n)]
+	return [[sum(a[i][k] * a[j][k] for k in range(n)) + (n if i == j else 0)
+			 for j in range(n)] for i in range(n)]
+
+
+def best_time(fnc, number):
+	"""Return the best time per call of fnc, in microseconds."""
+
+	return min(timeit.repeat(fnc, number=number, repeat=REPEAT)) / number * 1e6
+
+
+def bench(n, number):
+	values = spd_values(n)
+	ref_a, ref_b = matrix.matrix(values), matrix.matrix(values)
+	np_a, np_b = npmatrix.matrix(values), npmatrix.matrix(values)
+	out = npmatrix.matrix(values)
+
+	return [
+		('mul', best_time(lambda: ref_a * ref_b, number),
+		 best_time(lambda: np_a * np_b, number)),
+		('imul_into', best_time(lambda: ref_a * ref_b, number),
+		 best_time(lambda: np_a.imul_into(np_b, out), number)),
+		('transpose', best_time(ref_a.transpose, number),
+		 best_time(np_a.transpose, number)),
+		('inverse', best_time(ref_a.inverse, number),
+		 best_time(np_a.inverse, number)),
+	]
+
+
+def main(number=2000):
+	print '{0:>4} {1:>10} {2:>12} {3:>12} {4:>8}'.format(
+		'size', 'operation', 'matrix (us)', 'numpy (us)', 'speedup')
+	for n in SIZES:
+		for name, ref_time, np_time in bench(n, number):
+			print '{0:>4} {1:>10} {2:>12.2f} {3:>12.2f} {4:>7.1f}x'.format(
+				n, name, ref_time, np_time, ref_time / np_time)
+
+
+if __name__ == '__main__':
+	main()
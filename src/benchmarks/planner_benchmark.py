@@ -0,0 +1,112 @@
+"""Measure the time to plan and replan routes through mazes.
+
+Run from the src directory with: python -m benchmarks.planner_benchmark
+
+Each maze is a random maze with a tenth of its inner walls knocked out, so
+that there are detours around a blocked passage.  For each maze, A* plans
+routes between random cells, first with an empty cache and then from the
+cache.  Then a Replanner follows a route, and at each of several steps a
+wall is added across the route a few cells ahead of it, as the sensors
+would find it, where there is a detour.  Its replanning is compared with A*
+from scratch.
+"""
+
+from timeit import default_timer
+
+import numpy
+
+from benchmarks.exploration_benchmark import random_maze
+import planner
+
+SIZES = [10, 50, 100, 250, 500]	# Cells along each side of the mazes
+LOOPS = 0.1			# Fraction of the inner walls knocked out
+QUERIES = 10		# Routes between random cells
+CHANGES = 10		# Walls found across the route
+AHEAD = 3			# Cells from the robot to the wall found
+
+
+def knock_out(grid, fraction, random):
+	"""Remove a fraction of the inner walls of a MazeGrid."""
+
+	h_inner = grid.h_walls[1:-1]
+	h_inner[random.rand(*h_inner.shape) < fraction] = False
+	v_inner = grid.v_walls[:, 1:-1]
+	v_inner[random.rand(*v_inner.shape) < fraction] = False
+
+
+def side(a, b):
+	"""Return the side of cell a that cell b is on."""
+
+	for name, (bit, d_row, d_col) in planner.SIDES.items():
+		if (a[0] + d_row, a[1] + d_col) == b:
+			return name
+
+
+def block(p, route, ahead):
+	"""Add a wall across a route, ahead cells or more from its start.
+
+	The wall is added where there is a detour around it.  Returns the time
+	for A* to find the detour, in ms, or None if every passage along the
+	route from there is a bridge.
+	"""
+
+	for a, b in zip(route[ahead:], route[ahead + 1:]):
+		p.set_wall(a[0], a[1], side(a, b))
+		p.clear()
+		detour, ms = timed(p.route, route[0], route[-1])
+		if detour is not None:
+			return ms
+		p.set_wall(a[0], a[1], side(a, b), wall=False)
+	return None
+
+
+def timed(function, *args):
+	start = default_timer()
+	result = function(*args)
+	return result, (default_timer() - start) * 1e3
+
+
+def main():
+	random = numpy.random.RandomState(0)
+	print '{0:>8} {1:>31} | {2:>31}'.format(
+		'', 'routes between random cells', 'corner to corner, blocked')
+	print '{0:>8} {1:>9} {2:>9} {3:>10} | {4:>9} {5:>10} {6:>10}'.format(
+		'maze', 'cells', 'A* ms', 'cached us', 'D* ms', 'replan ms', 'A* ms')
+	for size in SIZES:
+		grid = random_maze(size, random)
+		knock_out(grid, LOOPS, random)
+		p = planner.Planner(grid)
+
+		pairs = [tuple(map(tuple, random.randint(size, size=(2, 2))))
+				 for i in range(QUERIES)]
+		lengths, astar = zip(*[timed(p.route, start, goal)
+							   for start, goal in pairs])
+		cached = [timed(p.route, start, goal)[1] for start, goal in pairs]
+
+		# Follow a route from corner to corner, finding walls across it:
+		start, goal = (0, 0), (size - 1, size - 1)
+		replanner = p.replanner(start, goal)
+		route, initial = timed(replanner.route)
+		replan, scratch = [], []
+		for i in range(CHANGES):
+			if len(route) <= AHEAD + 1:
+				break
+			replanner.move_to(route[1])
+			route = replanner.route()
+			ms = block(p, route, AHEAD)
+			if ms is None:
+				break
+			scratch.append(ms)
+			route, ms = timed(replanner.route)
+			replan.append(ms)
+
+		print ('{0:>8} {1:>9.0f} {2:>9.2f} {3:>10.1f} | {4:>9.2f} {5:>10.2f} '
+			   '{6:>10.2f}'.format(
+				   '{0}x{0}'.format(size),
+				   numpy.mean([len(r) for r in lengths if r]),
+				   numpy.mean(astar), numpy.mean(cached) * 1e3, initial,
+				   numpy.mean(replan), numpy.mean(scratch)))
+
+
+if __name__ == '__main__':
+	main()
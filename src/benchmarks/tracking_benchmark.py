@@ -0,0 +1,61 @@
+"""Measure the update rate of the cross-track error trackers.
+
+Run from the src directory with: python -m benchmarks.tracking_benchmark
+"""
+
+import random
+import timeit
+
+from matrix import matrix
+import npmatrix
+import tracking
+
+REPEAT = 3
+
+
+def readings(n):
+	"""Return n (cte, dt) pairs of a drifting robot."""
+
+	t = 0
+	result = []
+	for i in range(n):
+		dt = random.uniform(0.3, 0.8)
+		t += dt
+		result.append((2.0 * t + random.gauss(0, 3), dt))
+	return result
+
+
+def run_matrix(matrix_class, data):
+	kf = tracking.KalmanFilter(x=matrix_class([[0.0], [0.0]]),
+							   P=matrix_class([[9.0, 0.0], [0.0, 100.0]]),
+							   H=matrix_class([[1.0, 0.0]]),
+							   R=matrix_class([[9.0]]))
+	for cte, dt in data:
+		F, Q = tracking.constant_velocity(dt, tracking.CTE_PROCESS_NOISE)
+		kf.predict(matrix_class(F.value), matrix_class(Q.value))
+		kf.update(matrix_class([[cte]]))
+
+
+def run_closed_form(data):
+	f = tracking.CrossTrackFilter()
+	for cte, dt in data:
+		f.step(cte, dt)
+
+
+def main(n=10000):
+	data = readings(n)
+	trackers = [
+		('KalmanFilter (matrix)', lambda: run_matrix(matrix, data)),
+		('KalmanFilter (npmatrix)', lambda: run_matrix(npmatrix.matrix, data)),
+		('CrossTrackFilter', lambda: run_closed_form(data)),
+	]
+
+	print '{0:>24} {1:>14} {2:>10}'.format('tracker', 'updates/sec', 'us/update')
+	for name, fnc in trackers:
+		seconds = min(timeit.repeat(fnc, number=1, repeat=REPEAT))
+		print '{0:>24} {1:>14,.0f} {2:>10.2f}'.format(
+			name, n / seconds, seconds / n * 1e6)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,211 @@
+"""Measure the time to drive routes, stopping at corners or steering round.
+
+Run from the src directory with: python -m benchmarks.trajectory_benchmark
+
+The simulated robot drives the shortest route through random mazes by
+following a smoothed trajectory with RouteState, and in two baselines that
+stop to rotate in place at the corners:
+
+	corners - sensing nothing, as RouteState does, and steering along each
+		straight leg from the odometry.
+	cells - stopping at every cell too, to sweep the walls and correct the
+		odometry against them.
+
+Each baseline's mean simulated seconds are compared with steering's over the
+runs that neither collided with a wall on.  A rotation in place can be off by
+tens of degrees, which the odometry doesn't see, so the corners baseline
+collides on most runs.  The time to smooth each route is in ms of
+computation.
+"""
+
+import math
+from timeit import default_timer
+
+import numpy
+
+from benchmarks.exploration_benchmark import random_maze
+from benchmarks.planner_benchmark import knock_out
+from planner import Planner
+from robot import ROTATING_DEGREES_PER_TICK
+from sensor import UltrasonicSensor
+import simdriver
+import state
+import trajectory
+
+SIZES = [4, 6, 8]	# Cells along each side of the mazes
+MAZES = 20			# Mazes of each size
+LOOPS = 0.1			# Fraction of the inner walls knocked out
+MOTION_NOISE = 0.02
+MAX_RANGE = UltrasonicSensor.MAX_RANGE
+COLUMNS = ('{0:>6} {1:>6} {2:>10} | {3:>5} {4:>8} {5:>9} {6:>9} | '
+		   '{7:>5} {8:>8} {9:>9} {10:>9} | {11:>9}')
+ROW = ('{0:>6} {1:>6.1f} {2:>10.1f} | {3:>5} {4:>8.1f} {5:>9.1f} {6:>9} | '
+	   '{7:>5} {8:>8.1f} {9:>9.1f} {10:>9} | {11:>9}')
+
+
+def whole_ticks(degrees):
+	"""Round a rotation to whole encoder ticks, as Robot.rotate() turns."""
+
+	return round(degrees / ROTATING_DEGREES_PER_TICK) * ROTATING_DEGREES_PER_TICK
+
+
+class StopAtCornersState(state.RouteState):
+	"""Drive a route of cells, rotating in place at each corner.
+
+	Like RouteState, the robot senses nothing, and steers from its odometry,
+	but along each straight leg of the route in turn.  At the end of each leg
+	it stops, and rotates towards the next.
+	"""
+
+	MIN_TURN = 10  # degrees off the next leg to rotate towards it
+
+	def __init__(self, robot, grid, route, pose):
+		super(StopAtCornersState, self).__init__(robot, grid, route[-1], pose)
+		self.route = route
+
+	def legs(self):
+		"""Return the straight legs of the route, each from corner to corner."""
+
+		route = self.route
+		corners = [i for i in range(1, len(route) - 1)
+				   if (route[i][0] - route[i - 1][0],
+					   route[i][1] - route[i - 1][1]) !=
+				   (route[i + 1][0] - route[i][0],
+					route[i + 1][1] - route[i][1])]
+		ends = [0] + corners + [len(route) - 1]
+		return [route[a:b + 1] for a, b in zip(ends, ends[1:])]
+
+	def run(self):
+		for leg in self.legs():
+			follower = trajectory.Follower(trajectory.Trajectory(
+				trajectory.route_path(self.grid, leg)))
+			theta = self.odometry.pose[2]
+			bearing = math.degrees(follower.trajectory.heading[0] - theta)
+			bearing = (bearing + 180) % 360 - 180
+			if abs(bearing) >= self.MIN_TURN:
+				self._rotate(whole_ticks(bearing))
+			self._follow(follower)
+
+
+class StopAtCellsState(state.OdometryState):
+	"""Drive a route of cells, stopping at each, and rotating at the corners.
+
+	The robot drives one cell at a time.  Before each cell it sweeps the
+	walls, squares up the odometry's heading to them as ExplorationState
+	does, and corrects its position against the known walls of the cell, so
+	that the errors of each move don't add up.
+	"""
+
+	SWEEP_ANGLES = state.ExplorationState.SWEEP_ANGLES
+	MIN_TURN = 10  # degrees off the next cell to rotate towards it
+	MAX_OFF_WALL = 10  # degrees off perpendicular to a wall to range it
+	MAX_SQUARING = 30  # degrees of heading error corrected against a wall
+
+	def __init__(self, robot, grid, route, pose):
+		super(StopAtCellsState, self).__init__(robot, pose)
+		self.grid = grid
+		self.route = route
+
+	def _recenter(self, sweep):
+		"""Correct the odometry's position against the walls of its cell."""
+
+		x, y, theta = self.odometry.pose
+		grid, size = self.grid, self.grid.cell_size
+		row, col = grid.cell_at(x, y)
+		left, bottom = col * size, (grid.rows - row - 1) * size
+		walls = []	# (world direction, axis, coordinate) of each wall
+		if grid.v_walls[row, col + 1]:
+			walls.append((0, 0, left + size))
+		if grid.h_walls[row, col]:
+			walls.append((90, 1, bottom + size))
+		if grid.v_walls[row, col]:
+			walls.append((180, 0, left))
+		if grid.h_walls[row + 1, col]:
+			walls.append((270, 1, bottom))
+
+		position = [x, y]
+		for direction, axis, wall in walls:
+			angle = math.degrees(theta) - direction
+			off = numpy.abs((sweep['angle'] - angle + 180) % 360 - 180)
+			i = numpy.argmin(off)
+			distance = sweep['distance'][i]
+			if off[i] > self.MAX_OFF_WALL or distance >= MAX_RANGE:
+				continue
+			heading = theta - math.radians(sweep['angle'][i])
+			along = math.cos(heading) if axis == 0 else math.sin(heading)
+			position[axis] = wall - distance * along
+		self.odometry.pose = (position[0], position[1], theta)
+
+	def run(self):
+		self.robot.encoder_deltas()
+		for cell in self.route[1:]:
+			sweep = self.robot.sweep(self.SWEEP_ANGLES)
+			self._square_up(sweep)
+			self._recenter(sweep)
+			x, y = self.grid.cell_center(*cell)
+			pose = self.odometry.pose
+			dx, dy = x - pose[0], y - pose[1]
+			bearing = math.degrees(math.atan2(dy, dx) - pose[2])
+			bearing = (bearing + 180) % 360 - 180
+			if abs(bearing) >= self.MIN_TURN:
+				self._rotate(whole_ticks(bearing))
+			self.robot.forward(math.hypot(dx, dy))
+			self._wait_until_stopped()
+			self.odometry.update(*self.robot.encoder_deltas())
+
+
+def drive(grid, route, state_class, *args):
+	"""Return the simulated secs to drive a route, and whether it collided."""
+
+	x, y = grid.cell_center(*route[0])
+	theta = math.atan2(route[0][0] - route[1][0], route[1][1] - route[0][1])
+	r = simdriver.build_robot(maze=grid.to_maze(), pose=(x, y, theta),
+							  motion_noise=MOTION_NOISE, seed=0, time_limit=600)
+	start = simdriver.world.time
+	state_class(r, grid, *args + ((x, y, theta),)).run()
+	return simdriver.world.time - start, simdriver.world.collided
+
+
+def main():
+	random = numpy.random.RandomState(0)
+	print COLUMNS.format('', '', '', '', 'corners', '', '', '', 'cells', '',
+						 '', 'steering')
+	print COLUMNS.format('maze', 'cells', 'smooth ms', 'runs', 'secs',
+						 'steering', 'collided', 'runs', 'secs', 'steering',
+						 'collided', 'collided')
+	baselines = (StopAtCornersState, StopAtCellsState)
+	for size in SIZES:
+		cells, smooth, results = [], [], []
+		for i in range(MAZES):
+			grid = random_maze(size, random)
+			knock_out(grid, LOOPS, random)
+			goal = (0, size - 1)
+			route = Planner(grid).route((size - 1, 0), goal)
+			cells.append(len(route))
+			start = default_timer()
+			trajectory.Trajectory(trajectory.route_path(grid, route))
+			smooth.append((default_timer() - start) * 1e3)
+
+			result = dict((mode, drive(grid, route, mode, route))
+						  for mode in baselines)
+			result[state.RouteState] = drive(grid, route, state.RouteState,
+											 goal)
+			results.append(result)
+
+		# Compare each baseline's times with steering's, over the runs that
+		# neither collided on:
+		columns = []
+		for mode in baselines:
+			pairs = [(result[mode][0], result[state.RouteState][0])
+					 for result in results if not result[mode][1] and
+					 not result[state.RouteState][1]]
+			means = numpy.mean(pairs, axis=0) if pairs else [float('nan')] * 2
+			columns += [len(pairs), means[0], means[1],
+						sum(result[mode][1] for result in results)]
+		columns.append(sum(result[state.RouteState][1] for result in results))
+		print ROW.format('{0}x{0}'.format(size), numpy.mean(cells),
+						 numpy.mean(smooth), *columns)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,86 @@
+"""A cache of recent distance measurements."""
+
+import time
+
+DEFAULT_TTL = 0.5			# Secs a measurement stays valid
+DEFAULT_MAX_TICKS = 2		# Encoder ticks of movement a measurement survives
+DEFAULT_RESOLUTION = 5		# Degrees of mount angle that share an entry
+
+
+class MeasurementCache(object):
+	"""Recent measurements, keyed by quantized mount angle.
+
+	An entry is evicted once it is older than ttl seconds, or once the robot
+	has moved more than max_ticks encoder ticks since it was captured.
+	"""
+
+	def __init__(self, ttl=DEFAULT_TTL, max_ticks=DEFAULT_MAX_TICKS,
+				 resolution=DEFAULT_RESOLUTION):
+		"""Create a MeasurementCache.
+
+		Args:
+		ttl - the maximum age of a cached measurement, in seconds.
+		max_ticks - the maximum number of encoder ticks the robot may move
+			before a cached measurement is discarded.
+		resolution - angles are rounded to a multiple of this many degrees
+			before lookup, so nearby angles share a measurement.
+		"""
+
+		self.ttl = ttl
+		self.max_ticks = max_ticks
+		self.resolution = resolution
+		self.entries = {}
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def _key(self, angle):
+		return int(round(angle / float(self.resolution))) * self.resolution % 360
+
+	def get(self, angle, ticks, now=None):
+		"""Return the cached measurement for angle, or None on a miss.
+
+		Args:
+		angle - the mount angle, in degrees.
+		ticks - the current encoder odometer reading.
+		now - the current time (default time.time()).
+		"""
+
+		key = self._key(angle)
+		entry = self.entries.get(key)
+		if entry is None:
+			self.misses += 1
+			return None
+
+		measurement, timestamp, captured_ticks = entry
+		if now is None:
+			now = time.time()
+		if (now - timestamp > self.ttl or
+				abs(ticks - captured_ticks) > self.max_ticks):
+			del self.entries[key]
+			self.evictions += 1
+			self.misses += 1
+			return None
+
+		self.hits += 1
+		return measurement
+
+	def put(self, angle, measurement, ticks, now=None):
+		"""Cache a measurement taken at angle with the given odometer reading."""
+
+		if now is None:
+			now = time.time()
+		self.entries[self._key(angle)] = (measurement, now, ticks)
+
+	def clear(self):
+		self.entries.clear()
+
+	@property
+	def stats(self):
+		"""A dict of the hit, miss and eviction counters."""
+
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'evictions': self.evictions
+		}
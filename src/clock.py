@@ -0,0 +1,54 @@
+"""Clocks for timing and waiting on the hardware."""
+
+import time
+
+SLEW_SECONDS_PER_DEGREE = 0.2 / 90	# Servo travel time (0.2 secs per 90 deg)
+SERVO_SETTLE_TIME = 0.05			# Time for the servo to settle after travel
+
+
+class RealClock(object):
+	"""Wall-clock time, and a model of how long the servo takes to move."""
+
+	def __init__(self, slew_seconds_per_degree=SLEW_SECONDS_PER_DEGREE,
+				 settle_time=SERVO_SETTLE_TIME):
+		"""Create a RealClock.
+
+		Args:
+		slew_seconds_per_degree - the time the servo takes per degree of
+			travel, from its rated speed.
+		settle_time - the time the servo takes to settle once it arrives.
+		"""
+
+		self.slew_seconds_per_degree = slew_seconds_per_degree
+		self.settle_time = settle_time
+
+	def time(self):
+		"""Return the current time, in seconds."""
+
+		return time.time()
+
+	def sleep(self, seconds):
+		"""Wait for the given number of seconds."""
+
+		if seconds > 0:
+			time.sleep(seconds)
+
+	def servo_delay(self, degrees):
+		"""Return the time for the servo to travel degrees and settle."""
+
+		return self.settle_time + abs(degrees) * self.slew_seconds_per_degree
+
+
+class SimulatedClock(RealClock):
+	"""Time that passes instantly when slept through."""
+
+	def __init__(self, start=0.0, **kwargs):
+		super(SimulatedClock, self).__init__(**kwargs)
+		self.now = start
+
+	def time(self):
+		return self.now
+
+	def sleep(self, seconds):
+		if seconds > 0:
+			self.now += seconds
@@ -0,0 +1,541 @@
+"""Frontier-based exploration of a maze that is not known in advance.
+
+A frontier is a free cell of a mapping.OccupancyGrid next to a cell that has
+never been sensed.  Driving to the nearest frontier and sweeping the sensor
+there grows the map, until no frontier can be reached:
+
+	explorer = exploration.FrontierExplorer(grid)
+	...
+	explorer.update(*grid.integrate(pose, sweep['angle'], sweep['distance']))
+	waypoint = explorer.next_waypoint(pose[0], pose[1])
+
+Everything is updated incrementally from the cells touched by the latest
+readings, so the work of a tick grows with what changed rather than with the
+size of the map.  Path costs come from a distance transform of the
+traversable cells, measured from the frontiers, kept by a lifelong search
+in the manner of D* Lite.  When cells change, only their own costs are
+marked out of date.  Costs are settled in order from the frontiers, as in
+Dijkstra's algorithm, when a waypoint is asked for, and only as far as the
+robot's cell.  Costs further out wait in a queue until they are needed, so
+a frontier that is explored near the robot doesn't re-cost the whole map.
+"""
+
+import heapq
+import math
+
+import numpy
+
+FREE_LOG_ODDS = -0.3		# Cells with log-odds below this are free
+OCCUPIED_LOG_ODDS = 1.0		# Cells with log-odds at or above this are occupied
+CLEARANCE = 10.0			# Cm from a path to the nearest occupied cell
+MARGIN = 14.0				# Cm from occupied cells that paths keep where they can
+MARGIN_COST = 4.0			# Cost of a step within the margin, per step outside
+FOOTPRINT = 10.0			# Cm around a path that must all be known and clear
+LOOKAHEAD = 20.0			# Cm along the path to the next waypoint
+INFINITY = float('inf')
+
+SIDES = ((1, 0), (-1, 0), (0, 1), (0, -1))
+NEIGHBORS = tuple((dx, dy, math.hypot(dx, dy))
+				  for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy)
+# Bits of a cell's status, as last updated:
+KNOWN, FREE, CLEAR, OCCUPIED = 1, 2, 4, 8
+
+
+class FrontierExplorer(object):
+	"""Frontiers of an occupancy grid, and the shortest paths to them.
+
+	Cells are (ix, iy) index pairs, as returned by OccupancyGrid.integrate().
+	A cell is traversable if every cell within the footprint has been sensed
+	and is not occupied, and no occupied cell is within the clearance.
+	Paths are 8-connected through traversable cells, with costs in cells.
+	Steps within the margin of an occupied cell cost MARGIN_COST times as
+	much, so paths keep to the middle of a corridor that is wide enough, but
+	still pass where it narrows.
+	"""
+
+	def __init__(self, grid, clearance=CLEARANCE, footprint=FOOTPRINT,
+				 margin=MARGIN):
+		"""Create a FrontierExplorer.
+
+		Args:
+		grid - the mapping.OccupancyGrid to explore.
+		clearance - the distance to keep from occupied cells, in cm.
+		footprint - the distance around a path that must be sensed and not
+			occupied, in cm.  The ends of walls are hard to sense, and may be
+			unknown rather than occupied.  The edges of the sensor's cone
+			leave cells in front of walls uncertain, rather than free.
+		margin - the distance from occupied cells that paths keep to where
+			they can, in cm.
+		"""
+
+		self.grid = grid
+		self.known = set()		# cells that have been sensed
+		self.free = set()
+		self.occupied = set()
+		self.frontier = set()
+		self.traversable = set()
+		self.goals = set()		# traversable cells within the clearance of a
+								# frontier
+		self.status = {}		# bits of each cell's status, in tiles like
+								# the grid's
+		# Counts of cells nearby, in tiles like the grid's:
+		self.inflation = {}		# occupied cells within the clearance
+		self.clear_nearby = {}	# clear cells within the footprint
+		self.crowding = {}		# occupied cells within the margin
+		self.frontier_nearby = {}	# frontier cells within the clearance
+		self._weight = {}		# traversable cell -> cost of a step into it
+		self._cost = {}			# cell -> path cost to the nearest frontier,
+								# as last settled
+		self._best = {}			# cell -> path cost through its best neighbor
+		self._open = []			# heap of (key, cost, cell) of cells whose
+								# costs are out of date
+		self._queued = {}		# cell -> the cost it is queued at, the least
+								# of its entries
+		self._robot = (0, 0)	# the cell the settling is directed towards
+		self._moved = 0.0		# how far, in cells, it has been redirected
+		# Cells whose centers are within the clearance plus half a cell's
+		# diagonal of an occupied cell's center may be within the clearance
+		# of some part of it:
+		self._disk = numpy.array(
+			_disk(clearance / grid.resolution + math.sqrt(0.5)))
+		self._footprint = numpy.array(
+			_disk(footprint / grid.resolution + math.sqrt(0.5)))
+		self._margin = numpy.array(
+			_disk(margin / grid.resolution + math.sqrt(0.5)))
+		self._search = _disk(2 * clearance / grid.resolution)
+
+	def is_traversable(self, cell):
+		return cell in self.traversable
+
+	@property
+	def cost(self):
+		"""The path cost of every cell to the nearest frontier, in cells.
+
+		Every cost is settled first, so this is for tests and inspection;
+		path() and next_waypoint() settle only what they need.
+		"""
+
+		self._settle()
+		return self._cost
+
+	def update(self, ix, iy):
+		"""Update the frontiers and path costs after the grid has changed.
+
+		Args:
+		ix, iy - the cells whose log-odds changed, as returned by
+			OccupancyGrid.integrate().
+
+		Returns the set of cells that became traversable or not, or goals or
+		not.
+		"""
+
+		ix, iy = numpy.asarray(ix), numpy.asarray(iy)
+		log_odds = self.grid.cell_log_odds(ix, iy)
+		old = self.counts_at(self.status, ix, iy)
+		new = (old & KNOWN) | (
+			KNOWN * (log_odds != 0) | FREE * (log_odds < FREE_LOG_ODDS) |
+			CLEAR * ((log_odds != 0) & (log_odds < OCCUPIED_LOG_ODDS)) |
+			OCCUPIED * (log_odds >= OCCUPIED_LOG_ODDS))
+		# Most touched cells only become more certain of what they were:
+		flipped = old != new
+		ix, iy, old, new = ix[flipped], iy[flipped], old[flipped], new[flipped]
+		self._store(self.status, ix, iy, new)
+
+		def became(bit, on=True):
+			mask = ((new if on else old) & ~(old if on else new) & bit) != 0
+			return zip(ix[mask].tolist(), iy[mask].tolist())
+
+		newly_known = became(KNOWN)
+		self.known.update(newly_known)
+		became_free, became_unfree = became(FREE), became(FREE, False)
+		self.free.update(became_free)
+		self.free.difference_update(became_unfree)
+		became_occupied = became(OCCUPIED)
+		became_unoccupied = became(OCCUPIED, False)
+		self.occupied.update(became_occupied)
+		self.occupied.difference_update(became_unoccupied)
+		crossed = set()
+		self._count([(self.clear_nearby, self._footprint,
+					  len(self._footprint))],
+					became(CLEAR), became(CLEAR, False), crossed)
+		self._count([(self.inflation, self._disk, 1),
+					 (self.crowding, self._margin, 1)],
+					became_occupied, became_unoccupied, crossed)
+
+		# A cell's frontier status depends on it being free, and on whether
+		# its sides are known:
+		candidates = set(became_free)
+		candidates.update(became_unfree)
+		for x, y in newly_known:
+			candidates.update((x + dx, y + dy) for dx, dy in SIDES)
+		known = self.known
+		added, removed = [], []
+		for cell in candidates:
+			x, y = cell
+			is_frontier = cell in self.free and any(
+				(x + dx, y + dy) not in known for dx, dy in SIDES)
+			if is_frontier != (cell in self.frontier):
+				(added if is_frontier else removed).append(cell)
+		self.frontier.update(added)
+		self.frontier.difference_update(removed)
+		self._count([(self.frontier_nearby, self._disk, 1)], added, removed,
+					crossed)
+
+		changed = self._classify(crossed)
+		self._repair(changed)
+		return changed
+
+	def _count(self, tables, added, removed, crossed):
+		"""Count the added cells, less the removed, around each cell.
+
+		Args:
+		tables - a (counts, offsets, threshold) tuple for each tiled count of
+			the same cells.  The offsets are each from _disk(), so the
+			smaller are the first of the larger, and the cells around are
+			found and grouped by tile once for all the tables.
+		added, removed - lists of cells.
+		crossed - a set, to which cells are added whose count in any of the
+			tables rises to its threshold, or falls below it.
+		"""
+
+		size = self.grid.tile_size
+		offsets = max((offsets for _, offsets, _ in tables), key=len)
+		lengths = [len(offsets) for _, offsets, _ in tables]
+		for cells, sign in ((added, 1), (removed, -1)):
+			if not cells:
+				continue
+			ix, iy, totals = _totals(cells, offsets, lengths)
+			for key, positions, i, j in self.grid._by_tile(ix, iy):
+				for (counts, _, threshold), total in zip(tables, totals):
+					tile = counts.get(key)
+					if tile is None:
+						tile = counts[key] = numpy.zeros((size, size),
+														 dtype=numpy.int32)
+					old = tile[i, j]
+					new = old + sign * total[positions]
+					tile[i, j] = new
+					hit = positions[(numpy.minimum(old, new) < threshold) &
+									(numpy.maximum(old, new) >= threshold)]
+					crossed.update(zip(ix[hit].tolist(), iy[hit].tolist()))
+
+	def _store(self, tiles, ix, iy, values):
+		"""Set values at cells, in tiles like the grid's."""
+
+		size = self.grid.tile_size
+		for key, positions, i, j in self.grid._by_tile(ix, iy):
+			tile = tiles.get(key)
+			if tile is None:
+				tile = tiles[key] = numpy.zeros((size, size),
+												dtype=numpy.int32)
+			tile[i, j] = values[positions]
+
+	def counts_at(self, counts, ix, iy):
+		"""Return the counts at cells, from one of the tiled counts."""
+
+		ix = numpy.asarray(ix, dtype=numpy.int64)
+		iy = numpy.asarray(iy, dtype=numpy.int64)
+		result = numpy.zeros(len(ix), dtype=numpy.int32)
+		for key, positions, i, j in self.grid._by_tile(ix, iy):
+			tile = counts.get(key)
+			if tile is not None:
+				result[positions] = tile[i, j]
+		return result
+
+	def _classify(self, cells):
+		"""Update whether cells are traversable and goals, from the counts.
+
+		Returns the set of those cells whose status changed, or whose steps
+		cost more or less.
+		"""
+
+		if not cells:
+			return set()
+		cells = list(cells)
+		ix, iy = numpy.array(cells, dtype=numpy.int64).T
+		traversable = (
+			(self.counts_at(self.clear_nearby, ix, iy) ==
+			 len(self._footprint)) &
+			(self.counts_at(self.inflation, ix, iy) == 0))
+		goal = traversable & (self.counts_at(self.frontier_nearby, ix, iy) > 0)
+		crowded = self.counts_at(self.crowding, ix, iy) > 0
+		weights = self._weight
+		changed = set()
+		for cell, is_traversable, is_goal, is_crowded in zip(
+				cells, traversable.tolist(), goal.tolist(), crowded.tolist()):
+			weight = weights.get(cell)
+			if not is_traversable:
+				if weight is not None:
+					del weights[cell]
+					self.traversable.discard(cell)
+					changed.add(cell)
+			elif weight != (MARGIN_COST if is_crowded else 1.0):
+				weights[cell] = MARGIN_COST if is_crowded else 1.0
+				self.traversable.add(cell)
+				changed.add(cell)
+			if is_goal != (cell in self.goals):
+				(self.goals.add if is_goal else self.goals.discard)(cell)
+				changed.add(cell)
+		return changed
+
+	def _repair(self, changed):
+		"""Mark the path costs of changed cells out of date.
+
+		Their costs, and the costs that depend on them, are settled later by
+		_settle(), as far as they are needed.
+		"""
+
+		for cell in changed:
+			self._update_best(cell)
+		# Entries superseded by lower ones are skipped when they are popped,
+		# but those far from the robot may never be:
+		if len(self._open) > 2 * len(self._queued) + 1024:
+			queued = self._queued
+			self._open, self._queued = [], {}
+			for cell, c in queued.iteritems():
+				self._queue(cell, c)
+
+	def _update_best(self, cell):
+		"""Find the path cost of a cell through its best neighbor, and queue
+		the cell if its cost is out of date."""
+
+		cost = self._cost
+		if cell in self.goals:
+			best = 0.0
+		else:
+			best = INFINITY
+			weight = self._weight.get(cell)
+			if weight is not None:
+				get = cost.get
+				x, y = cell
+				for dx, dy, step in NEIGHBORS:
+					c = get((x + dx, y + dy), INFINITY) + step * weight
+					if c < best:
+						best = c
+		if best < INFINITY:
+			self._best[cell] = best
+		else:
+			self._best.pop(cell, None)
+		c = cost.get(cell, INFINITY)
+		if c != best:
+			self._queue(cell, min(c, best))
+
+	def _queue(self, cell, c):
+		"""Queue a cell whose cost is out of date, where c is the lesser of
+		its settled cost and its cost through its best neighbor.
+
+		Cells are settled in order of c plus their distance from the robot,
+		which no path from the robot through them can be shorter than.  A
+		cell already queued at a lower cost isn't queued again; if its cost
+		has risen by the time it is popped, it is requeued then.
+		"""
+
+		if c < self._queued.get(cell, INFINITY):
+			self._queued[cell] = c
+			rx, ry = self._robot
+			heapq.heappush(self._open, (c + math.hypot(cell[0] - rx,
+													   cell[1] - ry) +
+										self._moved, c, cell))
+
+	def _aim(self, cell):
+		"""Direct the settling of costs towards the robot's cell.
+
+		The keys of queued cells are distances from where the robot was, so
+		they are only lowered by how far it has moved.  Rather than requeue
+		them, that is added to every key from now on, and keys that turn out
+		too low are raised as they are popped.
+		"""
+
+		rx, ry = self._robot
+		self._moved += math.hypot(cell[0] - rx, cell[1] - ry)
+		self._robot = cell
+
+	def _settle(self, target=None):
+		"""Settle the path costs out of date, in order of their keys.
+
+		If a target cell is given, the robot's, settle only until its cost,
+		and the costs of every cell along its path, are up to date.
+		"""
+
+		cost, best, weights, goals = (self._cost, self._best, self._weight,
+									  self.goals)
+		heap, queued, moved = self._open, self._queued, self._moved
+		heappop, heappush, hypot = heapq.heappop, heapq.heappush, math.hypot
+		rx, ry = self._robot
+		while heap:
+			if target is not None:
+				c = cost.get(target, INFINITY)
+				if c == best.get(target, INFINITY) and \
+						heap[0][:2] >= (c + moved, c):
+					break
+			key, lesser, cell = heappop(heap)
+			if queued.get(cell) != lesser:
+				continue		# superseded by a lower entry
+			del queued[cell]
+			old, new = cost.get(cell, INFINITY), best.get(cell, INFINITY)
+			if old == new:
+				continue		# settled since it was queued
+			lesser = min(old, new)
+			x, y = cell
+			current = lesser + hypot(x - rx, y - ry) + moved
+			if key < current:
+				queued[cell] = lesser
+				heappush(heap, (current, lesser, cell))
+				continue
+			if new < old:
+				# The cost fell, so it may lower its neighbors':
+				cost[cell] = new
+				for dx, dy, step in NEIGHBORS:
+					near = (x + dx, y + dy)
+					weight = weights.get(near)
+					if weight is None or near in goals:
+						continue
+					c = new + step * weight
+					if c < best.get(near, INFINITY):
+						best[near] = c
+						c = min(c, cost.get(near, INFINITY))
+						if c < queued.get(near, INFINITY):
+							queued[near] = c
+							heappush(heap, (c + hypot(x + dx - rx, y + dy - ry) +
+											moved, c, near))
+			else:
+				# The cost rose, so the neighbors whose best paths ran through
+				# the cell look again:
+				del cost[cell]
+				self._update_best(cell)
+				for dx, dy, step in NEIGHBORS:
+					near = (x + dx, y + dy)
+					weight = weights.get(near)
+					if weight is not None and near not in goals and \
+							best.get(near) == old + step * weight:
+						self._update_best(near)
+
+	def _next(self, cell):
+		"""Return the next cell along the shortest path from a cell, or None
+		at the end of the path."""
+
+		if cell in self.goals:
+			return None
+		cost, weight = self._cost, self._weight[cell]
+		best, via = INFINITY, None
+		x, y = cell
+		for dx, dy, step in NEIGHBORS:
+			near = (x + dx, y + dy)
+			c = cost.get(near)
+			if c is not None and c + step * weight < best:
+				best, via = c + step * weight, near
+		return via
+
+	def _cell(self, x, y):
+		resolution = self.grid.resolution
+		return (int(math.floor(x / resolution)),
+				int(math.floor(y / resolution)))
+
+	def _center(self, cell):
+		resolution = self.grid.resolution
+		return ((cell[0] + 0.5) * resolution, (cell[1] + 0.5) * resolution)
+
+	def _start(self, x, y):
+		"""Return the cell with a path cost nearest (x, y), or None.
+
+		The robot may stand within the clearance of a wall, so cells up to
+		twice the clearance away are searched.  The costs are settled as far
+		as the cell, so its path can be followed.
+		"""
+
+		if not self.goals:
+			return None		# no cost is finite, so none need settling
+		x, y = self._cell(x, y)
+		for dx, dy in self._search:
+			cell = (x + dx, y + dy)
+			if cell in self._weight:
+				self._aim(cell)
+				self._settle(cell)
+				if cell in self._cost:
+					return cell
+		return None
+
+	def path(self, x, y):
+		"""Return the shortest path from (x, y) to a frontier.
+
+		Returns a list of the (x, y) centers of the cells along the path,
+		ending at a frontier, or None if no frontier can be reached.
+		"""
+
+		cell = self._start(x, y)
+		if cell is None:
+			return None
+		path = [self._center(cell)]
+		cell = self._next(cell)
+		while cell is not None:
+			path.append(self._center(cell))
+			cell = self._next(cell)
+		return path
+
+	def next_waypoint(self, x, y, lookahead=LOOKAHEAD):
+		"""Return the next point to drive to from (x, y), or None.
+
+		The waypoint is the point on the shortest path to a frontier
+		lookahead cm from (x, y), or the end of the path if it is nearer, or
+		the last point that can be driven to straight through traversable
+		cells, so that the robot doesn't cut a corner of the path.  If (x, y)
+		is off the paths, within the clearance of a wall, it is the nearest
+		point on one.  None is returned if no frontier can be reached, when
+		exploration is done.
+		"""
+
+		start = cell = self._start(x, y)
+		if cell is None:
+			return None
+		if cell != self._cell(x, y):
+			return self._center(cell)
+		limit = lookahead / self.grid.resolution
+		after = self._next(cell)
+		while after is not None:
+			limit -= math.hypot(after[0] - cell[0], after[1] - cell[1])
+			if limit < 0 or not self._in_sight(start, after):
+				break
+			cell, after = after, self._next(after)
+		return self._center(cell)
+
+	def _in_sight(self, start, end):
+		"""Whether the straight line between two cells is traversable."""
+
+		steps = 2 * max(abs(end[0] - start[0]), abs(end[1] - start[1]))
+		for i in range(1, steps):
+			t = i / float(steps)
+			cell = (int(round(start[0] + t * (end[0] - start[0]))),
+					int(round(start[1] + t * (end[1] - start[1]))))
+			if cell not in self.traversable:
+				return False
+		return True
+
+
+def _totals(cells, offsets, lengths):
+	"""Return the cells at offsets from cells, and how many times each is.
+
+	The totals are counted once for each of lengths, over that many of the
+	first offsets.  Returns a tuple (ix, iy, totals), where totals is a list
+	of arrays.
+	"""
+
+	cells = numpy.array(cells, dtype=numpy.int64)
+	near = (cells[:, numpy.newaxis, :] + offsets).reshape(-1, 2)
+	low = near.min(axis=0)
+	height = near[:, 1].max() - low[1] + 1
+	keys = (near[:, 0] - low[0]) * height + near[:, 1] - low[1]
+	totals = numpy.bincount(keys)
+	index = numpy.flatnonzero(totals)
+	totals = [totals[index] if length == len(offsets) else
+			  numpy.bincount(keys.reshape(len(cells), -1)[:, :length].ravel(),
+							 minlength=len(totals))[index]
+			  for length in lengths]
+	return index // height + low[0], index % height + low[1], totals
+
+
+def _disk(radius):
+	"""Return the (dx, dy) offsets within radius cells, nearest first."""
+
+	n = int(math.ceil(radius))
+	offsets = [(dx, dy) for dx in range(-n, n + 1) for dy in range(-n, n + 1)
+			   if math.hypot(dx, dy) <= radius]
+	return sorted(offsets, key=lambda offset: math.hypot(*offset))
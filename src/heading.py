@@ -0,0 +1,214 @@
+"""A histogram filter for the direction of travel relative to the robot."""
+
+import math
+
+import numpy
+
+
+class Distribution(object):
+	"""A discrete probability distribution, sampled by Walker's alias method.
+
+	Building the alias table takes O(n) time, once.  Each sample then takes
+	one uniform random number and one comparison.
+	"""
+
+	def __init__(self, p, random=None):
+		"""Create a Distribution.
+
+		Args:
+		p - the probability of each outcome.  Normalized if it doesn't sum
+			to 1.
+		random - a numpy RandomState to sample with.  Default is the global
+			numpy.random, so numpy.random.seed() makes sampling repeatable.
+		"""
+
+		p = numpy.asarray(p, dtype=float)
+		total = p.sum()
+		if p.ndim != 1 or not len(p) or (p < 0).any() or total <= 0:
+			raise ValueError('p must be non-negative with a positive sum')
+
+		self.p = p / total
+		self.random = random or numpy.random
+		self.n = len(p)
+
+		# Vose's method: split each outcome's scaled probability between
+		# itself and one alias, so every column of the table sums to 1:
+		scaled = (self.p * self.n).tolist()
+		prob = [1.0] * self.n
+		alias = range(self.n)
+		small = [i for i, q in enumerate(scaled) if q < 1.0]
+		large = [i for i, q in enumerate(scaled) if q >= 1.0]
+		while small and large:
+			less, more = small.pop(), large.pop()
+			prob[less] = scaled[less]
+			alias[less] = more
+			scaled[more] -= 1.0 - scaled[less]
+			if scaled[more] < 1.0:
+				small.append(more)
+			else:
+				large.append(more)
+		self._prob = prob
+		self._alias = alias
+
+	def sample(self):
+		"""Return the index of a random outcome."""
+
+		x = self.random.random_sample() * self.n
+		i = int(x)
+		if x - i < self._prob[i]:
+			return i
+		return self._alias[i]
+
+	def map(self):
+		"""Return the index of the most probable outcome."""
+
+		return int(numpy.argmax(self.p))
+
+	def expected(self, values):
+		"""Return the expected value of a sequence of values, one per outcome."""
+
+		return float(numpy.dot(self.p, values))
+
+
+class HeadingFilter(object):
+	"""A circular histogram belief over headings.
+
+	The belief covers 360 degrees in bins of equal width.  Rotating the belief
+	by a positive number of degrees moves probability mass towards higher bin
+	indices.
+	"""
+
+	def __init__(self, resolution=10, belief=None, seed=None):
+		"""Create a HeadingFilter.
+
+		Args:
+		resolution - the width of each bin in degrees.  Must divide 360
+			evenly.  Smaller bins are more accurate but cost more CPU.
+		belief - the initial belief.  If None, the belief is uniform.
+		seed - if given, the distribution is sampled with its own RandomState
+			seeded with this, rather than the global numpy.random.
+		"""
+
+		if resolution <= 0 or 360 % resolution:
+			raise ValueError('resolution must divide 360 evenly')
+
+		self.resolution = resolution
+		self.n_bins = int(360 / resolution)
+		self.random = None if seed is None else numpy.random.RandomState(seed)
+		self._distribution = None
+		if belief is None:
+			self.reset()
+		else:
+			self.belief = belief
+
+	@property
+	def belief(self):
+		"""The probability of each heading bin, as a numpy array."""
+
+		return self._belief
+
+	@belief.setter
+	def belief(self, belief):
+		belief = numpy.array(belief, dtype=float)
+		if belief.shape != (self.n_bins,):
+			raise ValueError('belief must have {0} bins'.format(self.n_bins))
+		self._belief = belief
+		self._distribution = None
+
+	@property
+	def distribution(self):
+		"""The belief as a Distribution, rebuilt only when the belief changes."""
+
+		if self._distribution is None:
+			self._distribution = Distribution(self._belief, self.random)
+		return self._distribution
+
+	def reset(self):
+		"""Reset the belief to a uniform distribution (heading unknown)."""
+
+		self._belief = numpy.full(self.n_bins, 1.0 / self.n_bins)
+		self._distribution = None
+
+	def predict(self, turn_degrees=0, motion_noise_kernel=None):
+		"""Shift the belief after a turn, and blur it by the motion noise.
+
+		Args:
+		turn_degrees - the magnitude of the shift.  Rotations that are not a
+			multiple of the bin width spread the mass linearly between the two
+			nearest bins.
+		motion_noise_kernel - an odd-length sequence of weights, centered on
+			zero shift, that is circularly convolved with the belief.  If
+			None, the belief is not blurred.
+
+		Returns the new belief.  If there is no turn and no noise, the belief
+		is unchanged.
+		"""
+
+		shift = turn_degrees / float(self.resolution)
+		steps = int(math.floor(shift))
+		fraction = shift - steps
+		if not steps % self.n_bins and not fraction and \
+				motion_noise_kernel is None:
+			return self._belief
+
+		belief = numpy.roll(self._belief, steps)
+		if fraction:
+			belief *= 1.0 - fraction
+			belief += fraction * numpy.roll(self._belief, steps + 1)
+
+		if motion_noise_kernel is not None:
+			belief = self._convolve(belief, motion_noise_kernel)
+
+		self._belief = belief
+		self._distribution = None
+		return belief
+
+	def _convolve(self, belief, kernel):
+		"""Return the circular convolution of belief with a normalized kernel."""
+
+		kernel = numpy.asarray(kernel, dtype=float)
+		if kernel.ndim != 1 or not len(kernel) % 2 or len(kernel) > self.n_bins:
+			raise ValueError('kernel must have an odd length of at most {0}'
+							 .format(self.n_bins))
+		kernel = kernel / kernel.sum()
+
+		half = len(kernel) // 2
+		if not half:
+			return belief
+		padded = numpy.concatenate((belief[-half:], belief, belief[:half]))
+		return numpy.convolve(padded, kernel, mode='valid')
+
+	def gaussian_likelihood(self, center, sigma):
+		"""Return the likelihood of a heading measured with normal error.
+
+		Args:
+		center - the measured heading, in bins.  May be fractional.
+		sigma - the std dev of the measurement error, in bins.
+
+		Returns an array with the likelihood of each heading bin, wrapping
+		around the circle.
+		"""
+
+		offsets = numpy.arange(self.n_bins) - center
+		offsets = (offsets + self.n_bins / 2.0) % self.n_bins - self.n_bins / 2.0
+		return numpy.exp(-0.5 * (offsets / float(sigma)) ** 2)
+
+	def update(self, measurement_likelihood):
+		"""Weight the belief by a measurement and normalize.
+
+		Args:
+		measurement_likelihood - the likelihood of the measurement for each
+			heading bin.
+
+		Returns the new belief.
+		"""
+
+		belief = self._belief * measurement_likelihood
+		total = belief.sum()
+		if total <= 0:
+			raise ValueError('measurement is impossible under every heading')
+		belief /= total
+
+		self._belief = belief
+		self._distribution = None
+		return belief
@@ -0,0 +1,148 @@
+"""Particle filter localization in a known maze."""
+
+import math
+
+import numpy
+
+from robot import DISTANCE_PER_TICK, TURNING_DEGREES_PER_TICK
+
+DEFAULT_PARTICLES = 10000
+DISTANCE_NOISE = 0.1	# Std dev of travel, as a fraction of the travel
+DISTANCE_NOISE_MIN = 0.5	# Minimum std dev of travel, in cm
+TURN_NOISE = 0.05		# Std dev of each turn, in radians
+SENSOR_NOISE = 5.0		# Std dev of a distance reading, in cm
+OUTLIER_WEIGHT = 0.01	# Likelihood floor for readings that fit no particle
+RESAMPLE_THRESHOLD = 0.5	# Resample below this fraction of effective particles
+
+
+def motion_from_encoders(diff_left, diff_right):
+	"""Convert encoder tick deltas into robot motion.
+
+	Args:
+	diff_left, diff_right - the ticks counted by each wheel, as returned by
+		Robot.encoder_deltas().
+
+	Returns a tuple (distance, turn), where distance is the travel of the
+	robot's center in cm, and turn is the change in heading in radians,
+	counter-clockwise (to the left) positive.
+	"""
+
+	distance = (diff_left + diff_right) / 2.0 * DISTANCE_PER_TICK
+	turn = math.radians((diff_right - diff_left) * TURNING_DEGREES_PER_TICK)
+
+	return distance, turn
+
+
+class ParticleFilter(object):
+	"""Estimate the pose (x, y, theta) of the robot in a known maze.
+
+	Poses use the conventions of maze.Maze: x and y in cm, and theta in
+	radians counter-clockwise from the x axis.  Sensor directions are mount
+	angles, in degrees clockwise from straight ahead.
+	"""
+
+	def __init__(self, maze, n_particles=DEFAULT_PARTICLES, seed=None):
+		"""Create a ParticleFilter with particles scattered over the maze.
+
+		Args:
+		maze - the map.  Any object with an expected_range(x, y, theta)
+			method that accepts arrays will do.
+		n_particles - the number of particles.
+		seed - a seed for the random number generator, for repeatable runs.
+		"""
+
+		self.maze = maze
+		self.n_particles = n_particles
+		self.random = numpy.random.RandomState(seed)
+		self.particles = numpy.empty((n_particles, 3))
+		self.weights = numpy.empty(n_particles)
+		self.scatter()
+
+	def scatter(self, bounds=None):
+		"""Scatter the particles uniformly (position unknown).
+
+		Args:
+		bounds - the box (x_min, y_min, x_max, y_max) to scatter over.  The
+			default is the bounding box of the maze.
+		"""
+
+		x_min, y_min, x_max, y_max = bounds or self.maze.bounds
+		n = self.n_particles
+		self.particles[:, 0] = self.random.uniform(x_min, x_max, n)
+		self.particles[:, 1] = self.random.uniform(y_min, y_max, n)
+		self.particles[:, 2] = self.random.uniform(-math.pi, math.pi, n)
+		self.weights.fill(1.0 / n)
+
+	def predict(self, distance, turn):
+		"""Move every particle by a noisy copy of the robot's motion.
+
+		Args:
+		distance - the travel in cm.
+		turn - the change in heading in radians, counter-clockwise positive.
+		"""
+
+		n = self.n_particles
+		noise = self.random.standard_normal((2, n))
+		distance_noise = max(DISTANCE_NOISE * abs(distance), DISTANCE_NOISE_MIN)
+
+		theta = self.particles[:, 2]
+		theta += turn + TURN_NOISE * noise[1]
+		travel = distance + distance_noise * noise[0]
+		self.particles[:, 0] += travel * numpy.cos(theta)
+		self.particles[:, 1] += travel * numpy.sin(theta)
+
+	def update(self, angles, distances):
+		"""Weight the particles by how well they explain distance readings.
+
+		Args:
+		angles - the mount angle of each reading, in degrees.
+		distances - the distance of each reading, in cm.
+		"""
+
+		x, y, theta = self.particles.T
+		likelihood = numpy.ones(self.n_particles)
+		for angle, distance in zip(angles, distances):
+			expected = self.maze.expected_range(x, y,
+												theta - math.radians(angle))
+			error = (distance - expected) / SENSOR_NOISE
+			likelihood *= numpy.exp(-0.5 * error * error) + OUTLIER_WEIGHT
+
+		self.weights *= likelihood
+		self.weights /= self.weights.sum()
+
+		if self.n_effective < RESAMPLE_THRESHOLD * self.n_particles:
+			self.resample()
+
+	@property
+	def n_effective(self):
+		"""The effective number of particles carrying the weight."""
+
+		return 1.0 / numpy.dot(self.weights, self.weights)
+
+	def resample(self):
+		"""Draw a new set of particles with low-variance resampling."""
+
+		n = self.n_particles
+		positions = (self.random.random_sample() + numpy.arange(n)) / n
+		cumulative = numpy.cumsum(self.weights)
+		cumulative[-1] = 1.0
+		indexes = numpy.searchsorted(cumulative, positions)
+
+		self.particles = self.particles[indexes]
+		self.weights.fill(1.0 / n)
+
+	def step(self, distance, turn, angles, distances):
+		"""Apply one motion update followed by one sensor update."""
+
+		self.predict(distance, turn)
+		self.update(angles, distances)
+
+	def estimate(self):
+		"""Return the weighted mean pose (x, y, theta) of the particles."""
+
+		x, y, theta = self.particles.T
+		heading = math.atan2(numpy.dot(self.weights, numpy.sin(theta)),
+							 numpy.dot(self.weights, numpy.cos(theta)))
+
+		return (numpy.dot(self.weights, x), numpy.dot(self.weights, y),
+				heading)
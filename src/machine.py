@@ -0,0 +1,115 @@
+"""Run the robot through a maze as a machine of states and transitions.
+
+Each state's run() returns a transition from the state module, saying what
+the robot found: the corridor ended, opened to one side, or led to a dead
+end.  A table maps each state and transition to the state to run next:
+
+	r.state = machine.maze_machine(r)
+	r.run()
+
+The states are created once, and the table is resolved to them when the
+machine is created, so a switch is a single dict lookup.  What the robot
+knows, such as its heading belief, is kept on the robot rather than on the
+states, so that it carries over from one state to the next.
+"""
+
+import logging
+
+from state import (CORRIDOR_ENDED, DEAD_END, OPENING_AHEAD, OPENING_LEFT,
+				   OPENING_RIGHT, TURNED, BaseState, CorridorState,
+				   DeadEndState, JunctionState, TurnState)
+
+logger = logging.getLogger(__name__)
+
+# The way through a maze of corridors, keeping to the left-hand wall:
+MAZE_TABLE = {
+	('corridor', CORRIDOR_ENDED): 'junction',
+	('corridor', OPENING_LEFT): 'junction',
+	('corridor', OPENING_RIGHT): 'junction',
+	('junction', OPENING_LEFT): 'turn',
+	('junction', OPENING_RIGHT): 'turn',
+	('junction', OPENING_AHEAD): 'turn',
+	('junction', DEAD_END): 'dead end',
+	('turn', TURNED): 'corridor',
+	('dead end', TURNED): 'corridor',
+}
+
+
+class StateMachine(BaseState):
+	"""A state that runs other states in turn, switching on their transitions.
+
+	Each state's run() is passed the transition that led to it, or None for
+	the first state.
+	"""
+
+	def __init__(self, robot, states, table, start, max_transitions=None):
+		"""Create a StateMachine.
+
+		Args:
+		robot - the Robot.
+		states - a dict of names to states.
+		table - a dict of (state name, transition) to the name of the next
+			state, or to None to stop.
+		start - the name of the first state.
+		max_transitions - if given, stop after this many transitions.
+
+		Raises ValueError if the table or start names a state not in states.
+		"""
+
+		super(StateMachine, self).__init__(robot)
+		unknown = set([start] + [name for name, transition in table] +
+					  [name for name in table.values() if name is not None])
+		unknown.difference_update(states)
+		if unknown:
+			raise ValueError('unknown states: {0}'.format(sorted(unknown)))
+
+		self.states = states
+		self.start = start
+		self.max_transitions = max_transitions
+		self.history = []	# (state name, transition) of every state run
+		self._names = dict((state, name) for name, state in states.items())
+		self._next = dict(((states[name], transition), states.get(next_name))
+						  for (name, transition), next_name in table.items())
+
+	def run(self, *args, **kwargs):
+		"""Run states until one returns a transition to None.
+
+		Returns the last transition.
+
+		Raises ValueError if a state returns a transition not in the table.
+		"""
+
+		logger.info('Running StateMachine')
+		state, transition = self.states[self.start], None
+		while (self.max_transitions is None or
+			   len(self.history) < self.max_transitions):
+			transition = state.run(transition)
+			name = self._names[state]
+			self.history.append((name, transition))
+			try:
+				state = self._next[state, transition]
+			except KeyError:
+				raise ValueError('no transition from {0} on {1}'.format(
+					name, transition))
+			if state is None:
+				break
+			logger.info('%s -> %s on %s', name, self._names[state], transition)
+		return transition
+
+
+def maze_machine(robot, max_transitions=None, continuous=False):
+	"""Return a StateMachine that follows the corridors of a maze.
+
+	The robot keeps to the left-hand wall, turning at junctions and back
+	from dead ends.  If continuous is True, it senses each corridor on the
+	move, as CorridorState does in continuous mode.
+	"""
+
+	states = {
+		'corridor': CorridorState(robot, continuous=continuous),
+		'junction': JunctionState(robot),
+		'turn': TurnState(robot),
+		'dead end': DeadEndState(robot),
+	}
+	return StateMachine(robot, states, MAZE_TABLE, 'corridor',
+						max_transitions=max_transitions)
@@ -0,0 +1,344 @@
+"""An occupancy grid map of an unknown maze, built as the robot explores.
+
+The grid holds the log-odds that each square cell is occupied, where 0 is
+unknown.  It is stored in square tiles that are allocated as readings reach
+them, so memory grows with the explored area.  Coordinates follow maze.Maze:
+x and y in cm, and theta in radians counter-clockwise from the x axis.
+
+Readings are integrated with an inverse sensor model of the ultrasonic
+sensor's cone: cells nearer than the reading are more likely free, and cells
+at the reading's range are more likely occupied.  Poses come from Odometry:
+
+	odometry = mapping.Odometry()
+	grid = mapping.OccupancyGrid()
+	...
+	pose = odometry.update(*robot.encoder_deltas())
+	sweep = robot.sweep(angles)
+	grid.integrate(pose, sweep['angle'], sweep['distance'])
+"""
+
+import math
+import struct
+
+import numpy
+
+from localization import motion_from_encoders
+from robot import ROTATING_DEGREES_PER_TICK
+from sensor import UltrasonicSensor
+
+DEFAULT_RESOLUTION = 4.0	# Width of a grid cell, in cm
+TILE_SIZE = 64				# Cells along each side of a tile
+BEAM_WIDTH = 15.0			# Width of the sensor's cone, in degrees
+WALL_THICKNESS = 4.0		# Depth of the cells marked occupied by a reading, in cm
+LOG_ODDS_OCCUPIED = 0.9		# Log-odds added to a cell at the range of a reading
+LOG_ODDS_FREE = -0.4		# Log-odds added to a cell short of the range
+LOG_ODDS_LIMIT = 5.0		# Log-odds are clamped to +/- this
+
+MAGIC = 'RMAP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHfI')	# magic, version, tile size, resolution,
+									# number of tiles
+LOG_ODDS_SCALE = 127 / LOG_ODDS_LIMIT	# Stored units per unit of log-odds
+
+
+class Odometry(object):
+	"""Dead reckoning of the robot's pose from its wheel encoders."""
+
+	def __init__(self, pose=(0.0, 0.0, 0.0)):
+		"""Create an Odometry.
+
+		Args:
+		pose - the starting pose (x, y, theta).
+		"""
+
+		self.pose = tuple(float(p) for p in pose)
+
+	def update(self, diff_left, diff_right):
+		"""Move the pose by the ticks counted by each wheel.
+
+		The robot is taken to travel along an arc, approximated by a straight
+		line in the direction halfway through the turn.  Pass the result of
+		Robot.encoder_deltas(), which shares its baseline with
+		Robot.degrees_turned.
+
+		Returns the new pose (x, y, theta).
+		"""
+
+		distance, turn = motion_from_encoders(diff_left, diff_right)
+		x, y, theta = self.pose
+		heading = theta + turn / 2.0
+		self.pose = (x + distance * math.cos(heading),
+					 y + distance * math.sin(heading),
+					 (theta + turn + math.pi) % (2 * math.pi) - math.pi)
+		return self.pose
+
+	def rotate(self, degrees):
+		"""Turn the pose by an in-place rotation, as Robot.rotate() commands.
+
+		The encoders count ticks in either direction, each of
+		ROTATING_DEGREES_PER_TICK, which is too coarse to measure a rotation.
+		Rotations stop on an encoder target, so the commanded rotation, in
+		whole ticks, is used instead.  Positive degrees are a left rotation.
+
+		Returns the new pose (x, y, theta).
+		"""
+
+		ticks = int(degrees / ROTATING_DEGREES_PER_TICK)
+		x, y, theta = self.pose
+		theta += math.radians(ticks * ROTATING_DEGREES_PER_TICK)
+		self.pose = (x, y, (theta + math.pi) % (2 * math.pi) - math.pi)
+		return self.pose
+
+
+class OccupancyGrid(object):
+	"""A log-odds occupancy grid, stored in lazily allocated tiles."""
+
+	def __init__(self, resolution=DEFAULT_RESOLUTION, tile_size=TILE_SIZE,
+				 beam_width=BEAM_WIDTH, max_range=UltrasonicSensor.MAX_RANGE):
+		"""Create an empty OccupancyGrid.
+
+		Args:
+		resolution - the width of each square cell, in cm.
+		tile_size - the cells along each side of a tile.
+		beam_width - the width of the sensor's cone, in degrees.
+		max_range - readings at or beyond this distance found no obstacle.
+		"""
+
+		self.resolution = float(resolution)
+		self.tile_size = tile_size
+		self.max_range = max_range
+		self.tiles = {}		# (tile x, tile y) -> tile_size^2 array of log-odds
+		self._template = _cone_template(math.radians(beam_width), max_range,
+										self.resolution)
+
+	def _cells(self, pose, angles, distances):
+		"""Return the cells seen by readings, and the log-odds to add to each.
+
+		Returns a tuple (ix, iy, log_odds) of arrays, with one entry for each
+		distinct cell.
+		"""
+
+		radii, offsets = self._template
+		x, y, theta = pose
+		distances = numpy.minimum(numpy.asarray(distances, dtype=float),
+								  self.max_range)
+		hit = distances < self.max_range
+		limits = numpy.where(hit, distances + WALL_THICKNESS / 2,
+							 distances - WALL_THICKNESS / 2)
+
+		# The points of the template nearer than each reading's limit:
+		counts = numpy.searchsorted(radii, limits, side='right')
+		reading = numpy.repeat(numpy.arange(len(counts)), counts)
+		point = numpy.arange(counts.sum()) - numpy.repeat(
+			numpy.cumsum(counts) - counts, counts)
+		r = radii[point]
+
+		directions = theta - numpy.radians(numpy.asarray(angles, dtype=float))
+		direction = directions[reading] + offsets[point]
+		ix = numpy.floor((x + r * numpy.cos(direction)) /
+						 self.resolution).astype(numpy.int64)
+		iy = numpy.floor((y + r * numpy.sin(direction)) /
+						 self.resolution).astype(numpy.int64)
+		occupied = hit[reading] & (r >= distances[reading] - WALL_THICKNESS / 2)
+
+		# Each reading counts once per cell, as occupied if any of its points
+		# in the cell are.  Number the cells of the batch from its corner:
+		x0, y0 = ix.min(), iy.min()
+		width, height = ix.max() - x0 + 1, iy.max() - y0 + 1
+		cell = (ix - x0) * height + (iy - y0)
+		keys, index = numpy.unique(reading * (width * height) + cell,
+								   return_inverse=True)
+		cell_occupied = numpy.zeros(len(keys), dtype=bool)
+		cell_occupied[index[occupied]] = True
+		log_odds = numpy.where(cell_occupied, LOG_ODDS_OCCUPIED, LOG_ODDS_FREE)
+
+		# Sum over readings:
+		cells, index = numpy.unique(keys % (width * height),
+									return_inverse=True)
+		total = numpy.bincount(index, weights=log_odds)
+		return x0 + cells // height, y0 + cells % height, total
+
+	def _by_tile(self, ix, iy):
+		"""Group cells by tile.
+
+		Yields a tuple (key, positions, i, j) for each tile, where positions
+		index the cells in the tile, at (i, j) within it.
+		"""
+
+		if not len(ix):
+			return
+		size = self.tile_size
+		tx, ty = ix // size, iy // size
+		tx0, ty0 = tx.min(), ty.min()
+		tile_index = (tx - tx0) * (ty.max() - ty0 + 1) + (ty - ty0)
+		order = numpy.argsort(tile_index, kind='mergesort')
+		starts = numpy.flatnonzero(numpy.diff(tile_index[order])) + 1
+		for positions in numpy.split(order, starts):
+			key = (int(tx[positions[0]]), int(ty[positions[0]]))
+			yield (key, positions, ix[positions] - key[0] * size,
+				   iy[positions] - key[1] * size)
+
+	def integrate(self, pose, angles, distances):
+		"""Update the grid with distance readings taken at one pose.
+
+		Args:
+		pose - the robot's pose (x, y, theta).
+		angles - the mount angle of each reading, in degrees clockwise from
+			straight ahead.
+		distances - the distance of each reading, in cm.
+
+		Returns a tuple (ix, iy) of arrays, with the index of each cell
+		updated.  Cell (ix, iy) has its lower left corner at
+		(ix * resolution, iy * resolution).
+		"""
+
+		if not len(angles):
+			return numpy.zeros(0, dtype=numpy.int64), \
+				numpy.zeros(0, dtype=numpy.int64)
+		ix, iy, log_odds = self._cells(pose, angles, distances)
+
+		size = self.tile_size
+		for key, positions, i, j in self._by_tile(ix, iy):
+			tile = self.tiles.get(key)
+			if tile is None:
+				tile = self.tiles[key] = numpy.zeros((size, size),
+													 dtype=numpy.float32)
+			tile[i, j] = numpy.clip(tile[i, j] + log_odds[positions],
+									-LOG_ODDS_LIMIT, LOG_ODDS_LIMIT)
+
+		return ix, iy
+
+	def cell_log_odds(self, ix, iy):
+		"""Return the log-odds of occupancy of cells, 0 where unknown.
+
+		Args:
+		ix, iy - the indexes of the cells, as returned by integrate().
+			Scalars and arrays are broadcast together.
+		"""
+
+		ix, iy = numpy.broadcast_arrays(numpy.asarray(ix, dtype=numpy.int64),
+										numpy.asarray(iy, dtype=numpy.int64))
+		result = numpy.zeros(ix.shape)
+		flat = result.reshape(-1)
+		for key, positions, i, j in self._by_tile(ix.reshape(-1),
+												  iy.reshape(-1)):
+			tile = self.tiles.get(key)
+			if tile is not None:
+				flat[positions] = tile[i, j]
+		return result
+
+	def log_odds(self, x, y):
+		"""Return the log-odds of occupancy at points, 0 where unknown.
+
+		Args:
+		x, y - the coordinates of the points.  Scalars and arrays are
+			broadcast together.
+		"""
+
+		return self.cell_log_odds(
+			numpy.floor(numpy.asarray(x, dtype=float) / self.resolution),
+			numpy.floor(numpy.asarray(y, dtype=float) / self.resolution))
+
+	def probability(self, x, y):
+		"""Return the probability of occupancy at points, 0.5 where unknown."""
+
+		return 1.0 - 1.0 / (1.0 + numpy.exp(self.log_odds(x, y)))
+
+	@property
+	def bounds(self):
+		"""The box (x_min, y_min, x_max, y_max) of the allocated tiles."""
+
+		if not self.tiles:
+			return None
+		keys = numpy.array(list(self.tiles))
+		width = self.tile_size * self.resolution
+		(x0, y0), (x1, y1) = keys.min(axis=0), keys.max(axis=0) + 1
+		return x0 * width, y0 * width, x1 * width, y1 * width
+
+	def to_array(self):
+		"""Return the allocated tiles as one array.
+
+		Returns a tuple (log_odds, (x0, y0)), where log_odds[i, j] is the cell
+		whose lower left corner is (x0 + i * resolution, y0 + j * resolution).
+		Cells of unallocated tiles within the bounds are 0.
+		"""
+
+		if not self.tiles:
+			return numpy.zeros((0, 0), dtype=numpy.float32), (0.0, 0.0)
+		keys = numpy.array(list(self.tiles))
+		origin = keys.min(axis=0)
+		shape = (keys.max(axis=0) - origin + 1) * self.tile_size
+		result = numpy.zeros(shape, dtype=numpy.float32)
+		size = self.tile_size
+		for (key_x, key_y), tile in self.tiles.items():
+			i, j = (key_x - origin[0]) * size, (key_y - origin[1]) * size
+			result[i:i + size, j:j + size] = tile
+		width = size * self.resolution
+		return result, (origin[0] * width, origin[1] * width)
+
+	@property
+	def nbytes(self):
+		"""The memory used by the tiles, in bytes."""
+
+		return sum(tile.nbytes for tile in self.tiles.values())
+
+	def save(self, path):
+		"""Write a snapshot of the grid to a file.
+
+		Only allocated tiles are written, with each log-odds quantized to one
+		byte.
+		"""
+
+		keys = sorted(self.tiles)
+		with open(path, 'wb') as f:
+			f.write(HEADER.pack(MAGIC, VERSION, self.tile_size,
+								self.resolution, len(keys)))
+			f.write(numpy.array(keys, dtype='<i4').reshape(-1, 2).tobytes())
+			for key in keys:
+				f.write(numpy.rint(self.tiles[key] * LOG_ODDS_SCALE)
+						.astype(numpy.int8).tobytes())
+
+	@classmethod
+	def load(cls, path, **kwargs):
+		"""Read a grid from a snapshot.
+
+		Keyword arguments are passed to OccupancyGrid, for the sensor model.
+		"""
+
+		with open(path, 'rb') as f:
+			magic, version, tile_size, resolution, n_tiles = HEADER.unpack(
+				f.read(HEADER.size))
+			if magic != MAGIC or version != VERSION:
+				raise ValueError('{0} is not a map snapshot'.format(path))
+			keys = numpy.frombuffer(f.read(8 * n_tiles), dtype='<i4')
+			data = numpy.frombuffer(f.read(n_tiles * tile_size ** 2),
+									dtype=numpy.int8)
+		if len(data) != n_tiles * tile_size ** 2:
+			raise ValueError('{0} is truncated'.format(path))
+
+		grid = cls(resolution=resolution, tile_size=tile_size, **kwargs)
+		tiles = data.reshape(n_tiles, tile_size, tile_size)
+		for key, tile in zip(keys.reshape(-1, 2), tiles):
+			grid.tiles[(int(key[0]), int(key[1]))] = (
+				tile.astype(numpy.float32) / LOG_ODDS_SCALE)
+		return grid
+
+
+def _cone_template(beam, max_range, resolution):
+	"""Return points covering the sensor's cone, in order of distance.
+
+	The points are on arcs half a cell apart, and half a cell apart along
+	each arc, so every cell in the cone holds at least one.
+
+	Returns a tuple (radii, offsets) of arrays, with the distance of each
+	point and its angle from the center of the cone, in radians.
+	"""
+
+	step = resolution / 2.0
+	radii, offsets = [], []
+	for r in numpy.arange(0.0, max_range + WALL_THICKNESS + step, step):
+		n = int(math.ceil(beam * r / step)) + 1
+		radii.append(numpy.full(n, r))
+		offsets.append(numpy.linspace(-beam / 2, beam / 2, n) if n > 1
+					   else numpy.zeros(1))
+	return numpy.concatenate(radii), numpy.concatenate(offsets)
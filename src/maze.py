@@ -0,0 +1,194 @@
+"""Maps of a maze, for sensor models and planning.
+
+A maze file is a grid of square cells drawn in text, with '+' at each cell
+corner, '--' for a wall along the top or bottom of a cell, and '|' for a wall
+along its side.  Openings are spaces.  For example, a 3x2 maze with an
+opening on the left of the top row:
+
+	+--+--+--+
+	      |  |
+	+  +  +  +
+	|  |     |
+	+--+--+--+
+"""
+
+import numpy
+
+from sensor import UltrasonicSensor
+
+DEFAULT_CELL_SIZE = 40	# Width of a maze cell, in cm
+
+
+class Maze(object):
+	"""A map of a maze as a set of straight wall segments.
+
+	Coordinates are in cm, with x to the right and y up.  Directions are in
+	radians, counter-clockwise from the x axis.
+	"""
+
+	def __init__(self, walls):
+		"""Create a Maze.
+
+		Args:
+		walls - a sequence of wall segments (x1, y1, x2, y2).
+		"""
+
+		self.walls = numpy.array(walls, dtype=float).reshape(-1, 4)
+		if not len(self.walls):
+			raise ValueError('a maze needs at least one wall')
+		self._start = self.walls[:, :2]
+		self._vector = self.walls[:, 2:] - self.walls[:, :2]
+
+	@property
+	def bounds(self):
+		"""The bounding box (x_min, y_min, x_max, y_max) of the walls."""
+
+		xs = self.walls[:, [0, 2]]
+		ys = self.walls[:, [1, 3]]
+		return xs.min(), ys.min(), xs.max(), ys.max()
+
+	def ray_cast(self, x, y, theta):
+		"""Return the distance to the nearest wall along each ray.
+
+		Args:
+		x, y, theta - the origin and direction of each ray.  Scalars and
+			arrays are broadcast against each other.
+
+		Returns an array of distances in cm, which is inf for rays that
+		hit no wall.
+		"""
+
+		x, y, theta = numpy.broadcast_arrays(numpy.asarray(x, dtype=float),
+											 numpy.asarray(y, dtype=float),
+											 numpy.asarray(theta, dtype=float))
+		shape = x.shape
+		dx = numpy.cos(theta).reshape(-1, 1)
+		dy = numpy.sin(theta).reshape(-1, 1)
+		ax = self._start[:, 0] - x.reshape(-1, 1)
+		ay = self._start[:, 1] - y.reshape(-1, 1)
+		ex = self._vector[:, 0]
+		ey = self._vector[:, 1]
+
+		# Solve origin + t * direction = start + u * vector for every pair of
+		# ray and wall, using 2-D cross products:
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			denom = dx * ey - dy * ex
+			t = (ax * ey - ay * ex) / denom
+			u = (ax * dy - ay * dx) / denom
+			miss = ~((t >= 0) & (u >= 0) & (u <= 1))
+		t[miss] = numpy.inf
+
+		return t.min(axis=1).reshape(shape)
+
+	def expected_range(self, x, y, theta):
+		"""Return the range the distance sensor should read along each ray."""
+
+		return numpy.minimum(self.ray_cast(x, y, theta),
+							 UltrasonicSensor.MAX_RANGE)
+
+
+class MazeGrid(object):
+	"""A maze of square cells, with or without a wall on each cell edge.
+
+	Row 0 is the top row of the drawing, and column 0 the left column.  The
+	bottom-left corner of the maze is at (0, 0) in Maze coordinates.
+	"""
+
+	def __init__(self, h_walls, v_walls, cell_size=DEFAULT_CELL_SIZE):
+		"""Create a MazeGrid.
+
+		Args:
+		h_walls - a (rows + 1) x cols boolean array, True where there is a
+			wall along the top of cell (row, col).  The last row is the bottom
+			edge of the maze.
+		v_walls - a rows x (cols + 1) boolean array, True where there is a
+			wall along the left of cell (row, col).  The last column is the
+			right edge of the maze.
+		cell_size - the width of a cell, in cm.
+		"""
+
+		self.h_walls = numpy.array(h_walls, dtype=bool)
+		self.v_walls = numpy.array(v_walls, dtype=bool)
+		self.rows, self.cols = self.v_walls.shape[0], self.h_walls.shape[1]
+		if (self.h_walls.shape != (self.rows + 1, self.cols) or
+				self.v_walls.shape != (self.rows, self.cols + 1)):
+			raise ValueError('wall arrays do not describe one grid')
+		self.cell_size = cell_size
+
+	@classmethod
+	def parse(cls, text, cell_size=DEFAULT_CELL_SIZE):
+		"""Create a MazeGrid from its text drawing."""
+
+		lines = [line.rstrip() for line in text.strip('\n').splitlines()]
+		if len(lines) < 3 or not len(lines) % 2 or not lines[0].startswith('+'):
+			raise ValueError('maze drawing must start and end with a row of +')
+		rows = (len(lines) - 1) // 2
+		cols = (len(lines[0]) - 1) // 3
+		lines = [line.ljust(3 * cols + 1) for line in lines]
+
+		h_walls = [[lines[2 * r][3 * c + 1] == '-' for c in range(cols)]
+				   for r in range(rows + 1)]
+		v_walls = [[lines[2 * r + 1][3 * c] == '|' for c in range(cols + 1)]
+				   for r in range(rows)]
+
+		return cls(h_walls, v_walls, cell_size)
+
+	@classmethod
+	def load(cls, path, cell_size=DEFAULT_CELL_SIZE):
+		"""Read a MazeGrid from a maze file."""
+
+		with open(path) as f:
+			return cls.parse(f.read(), cell_size)
+
+	def format(self):
+		"""Return the text drawing of this maze."""
+
+		lines = []
+		for r in range(self.rows + 1):
+			lines.append('+' + ''.join(
+				('--' if wall else '  ') + '+' for wall in self.h_walls[r]))
+			if r < self.rows:
+				lines.append('  '.join(
+					'|' if wall else ' ' for wall in self.v_walls[r]).rstrip())
+		return '\n'.join(lines) + '\n'
+
+	def cell_center(self, row, col):
+		"""Return the (x, y) center of a cell, in cm."""
+
+		return ((col + 0.5) * self.cell_size,
+				(self.rows - row - 0.5) * self.cell_size)
+
+	def cell_at(self, x, y):
+		"""Return the (row, col) of the cell containing point (x, y)."""
+
+		return (int(self.rows - y // self.cell_size - 1),
+				int(x // self.cell_size))
+
+	def to_maze(self):
+		"""Return the Maze of wall segments for this grid.
+
+		Walls that continue along a line are merged into one segment, which
+		keeps ray casting cheap.
+		"""
+
+		size = self.cell_size
+		walls = []
+		for r, row in enumerate(self.h_walls):
+			y = (self.rows - r) * size
+			for start, end in _runs(row):
+				walls.append((start * size, y, end * size, y))
+		for c, column in enumerate(self.v_walls.T):
+			x = c * size
+			for start, end in _runs(column):
+				walls.append((x, (self.rows - start) * size,
+							  x, (self.rows - end) * size))
+
+		return Maze(walls)
+
+
+def _runs(flags):
+	"""Return (start, end) index pairs of each run of True values."""
+
+	padded = numpy.concatenate(([False], flags, [False])).astype(int)
+	edges = numpy.flatnonzero(numpy.diff(padded))
+	return zip(edges[::2], edges[1::2])
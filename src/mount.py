@@ -1,6 +1,16 @@
 """Implementation for a movable mount."""
 
-import time
+from collections import namedtuple
+
+from clock import RealClock
+import profiling
+
+# The order to visit the angles needed at once:
+#	order - the distinct angles, in the order to visit them.
+#	slew_time - the secs the mount will wait to visit them in order.
+#	naive_slew_time - the secs it would wait to visit them in the order
+#		requested.
+Plan = namedtuple('Plan', ['order', 'slew_time', 'naive_slew_time'])
 
 
 class SwivelMount(object):
@@ -19,8 +29,19 @@ class SwivelMount(object):
 		else:
 			return (angle >= self.max_left) or (angle <= self.max_right)
 
+	def _sweep_position(self, angle):
+		"""Return the degrees of travel from max_left to angle."""
+
+		return (angle - self.max_left) % 360
+
+	def _travel(self, angle):
+		"""Return the degrees of travel from the current angle to angle."""
+
+		return abs(self._sweep_position(self.current_angle) -
+				   self._sweep_position(angle))
+
 	def __init__(self, driver=None, center=0, servo_center=90,
-				 clockwise_servo=False, arc=180):
+				 clockwise_servo=False, arc=180, clock=None):
 		"""Create an instance of a SwivelMount.
 
 		Args:
@@ -34,6 +55,8 @@ class SwivelMount(object):
 		arc - the allowable travel of the mount, in degrees
 		swivel_plane - the plane through which the mount can swivel.  'x' is
 			horizontal, 'y' is vertical.
+		clock - the clock used to wait for the mount to move (default
+			RealClock()).
 		"""
 
 		if (not self._is_valid_angle(center) or
@@ -42,12 +65,15 @@ class SwivelMount(object):
 				raise ValueError('all angle values must be in range 0-359.')
 
 		self.driver = driver
+		self.clock = clock or RealClock()
 		self.mount_center = center
 		self.servo_center = servo_center
 		self.clockwise_servo = clockwise_servo
 		self.max_right = center + (arc / 2) % 360
 		self.max_left = 360 - abs(center - (arc / 2))
 		self.current_angle = center
+		self.planned_slew_time = 0.0	# total of Plan.slew_time
+		self.naive_slew_time = 0.0		# total of Plan.naive_slew_time
 
 		self.center()
 
@@ -62,6 +88,9 @@ class SwivelMount(object):
 	def move(self, x=0, y=0):
 		"""Swivel the mount to the specified direction.
 
+		The mount waits as long as the clock's servo model takes for the
+		actual travel, so short steps between adjacent angles are quick.
+
 		Args:
 		x - the desired horizontal direction
 		y - not supported for SwivelMount
@@ -76,13 +105,87 @@ class SwivelMount(object):
 			raise ValueError('vertical angle not supported on SwivelMount')
 
 		x_prime = self._mount_angle_to_servo_angle(x)
-		self.driver.servo(x_prime)
+		with profiling.phase('actuate'):
+			self.driver.servo(x_prime)
 
 		# Allow sufficient time to complete the movement before returning:
-		delay_times = [0.2, 0.4, 0.6, 0.8]  # 0.2 secs per 90 degrees of travel
-		time.sleep(delay_times[abs(self.current_angle - x) / 90])
+		with profiling.phase('settle'):
+			self.clock.sleep(self.clock.servo_delay(self._travel(x)))
 		self.current_angle = x
 
+	def sweep_order(self, angles):
+		"""Order angles into a single monotonic pass of the mount.
+
+		Args:
+		angles - the directions to visit.  Duplicates are visited once.
+
+		Returns a list of the distinct angles, ordered from whichever end of
+		the pass is closer to the current angle.
+		"""
+
+		for angle in angles:
+			if not (self._is_valid_angle(angle) and
+					self._is_allowable_angle(angle)):
+				raise ValueError('angle must be in range {0}-{1}'.format(
+						self.max_left, self.max_right
+					)
+				)
+
+		order = sorted(set(angles), key=self._sweep_position)
+		if order and self._travel(order[-1]) < self._travel(order[0]):
+			order.reverse()
+
+		return order
+
+	def slew_time(self, angles):
+		"""Return the secs the mount waits to visit angles in order."""
+
+		time = 0.0
+		current_angle = self.current_angle
+		for angle in angles:
+			travel = abs(self._sweep_position(current_angle) -
+						 self._sweep_position(angle))
+			time += self.clock.servo_delay(travel)
+			current_angle = angle
+
+		return time
+
+	def plan(self, angles):
+		"""Plan the visits to the angles needed at once.
+
+		The angles are visited in a single pass (see sweep_order), which is
+		the least travel from the current angle.  The pass ends at one end of
+		the angles, so the next plan starts from there.  The slew times of
+		every plan are added to planned_slew_time and naive_slew_time.
+
+		Args:
+		angles - the directions to visit.  Duplicates are visited once.
+
+		Returns a Plan.
+		"""
+
+		order = self.sweep_order(angles)
+		requested = []
+		for angle in angles:
+			if angle not in requested:
+				requested.append(angle)
+		plan = Plan(order, self.slew_time(order), self.slew_time(requested))
+
+		self.planned_slew_time += plan.slew_time
+		self.naive_slew_time += plan.naive_slew_time
+
+		return plan
+
+	def clamp(self, angle):
+		"""Return the allowable angle nearest to angle."""
+
+		angle %= 360
+		if self._is_allowable_angle(angle):
+			return angle
+		if (angle - self.max_right) % 360 <= (self.max_left - angle) % 360:
+			return self.max_right
+		return self.max_left
+
 	def center(self):
 		"""Center the mount."""
 
@@ -0,0 +1,160 @@
+"""A NumPy-backed drop-in replacement for matrix.matrix.
+
+The class keeps the API of the course matrix class (value, dimx, dimy, zero,
+identity, show, arithmetic, Cholesky, CholeskyInverse and inverse), but stores
+its values in a contiguous float array.  The in-place variants (iadd, isub,
+imul_into, transpose_into, assign) write into existing storage, so a filter
+loop that preallocates its matrices allocates nothing per step.
+"""
+
+import numpy
+
+
+class matrix(object):
+
+	def __init__(self, value):
+		self.value = value
+
+	@property
+	def value(self):
+		"""The underlying 2-D array, indexable as value[i][j]."""
+
+		return self._a
+
+	@value.setter
+	def value(self, value):
+		a = numpy.array(value, dtype=float, order='C')	# usable as out=
+		if a.size == 0:
+			a = numpy.zeros((0, 0))
+		elif a.ndim != 2:
+			raise ValueError('matrix value must be 2-dimensional')
+		self._a = a
+
+	@property
+	def dimx(self):
+		return self._a.shape[0]
+
+	@property
+	def dimy(self):
+		return self._a.shape[1]
+
+	def zero(self, dimx, dimy):
+		"""Set all values to zero, reusing storage if the size is unchanged."""
+
+		if dimx < 1 or dimy < 1:
+			raise ValueError('Invalid size of matrix')
+		if self._a.shape == (dimx, dimy):
+			self._a.fill(0.0)
+		else:
+			self._a = numpy.zeros((dimx, dimy))
+
+	def identity(self, dim):
+		if dim < 1:
+			raise ValueError('Invalid size of matrix')
+		self.zero(dim, dim)
+		self._a.flat[::dim + 1] = 1.0
+
+	def show(self):
+		for row in self._a.tolist():
+			print row
+		print ' '
+
+	def _check_same_size(self, other, action):
+		if self._a.shape != other._a.shape:
+			raise ValueError(
+				'Matrices must be of equal dimensions to {0}'.format(action))
+
+	def _check_product(self, other):
+		if self.dimy != other.dimx:
+			raise ValueError('Matrices must be m*n and n*p to multiply')
+
+	def __add__(self, other):
+		self._check_same_size(other, 'add')
+		return matrix(self._a + other._a)
+
+	def __sub__(self, other):
+		self._check_same_size(other, 'subtract')
+		return matrix(self._a - other._a)
+
+	def __mul__(self, other):
+		self._check_product(other)
+		return matrix(numpy.dot(self._a, other._a))
+
+	def iadd(self, other):
+		"""Add other to this matrix in place and return self."""
+
+		self._check_same_size(other, 'add')
+		numpy.add(self._a, other._a, out=self._a)
+		return self
+
+	def isub(self, other):
+		"""Subtract other from this matrix in place and return self."""
+
+		self._check_same_size(other, 'subtract')
+		numpy.subtract(self._a, other._a, out=self._a)
+		return self
+
+	__iadd__ = iadd
+	__isub__ = isub
+
+	def imul_into(self, other, out):
+		"""Write the product self * other into out and return out.
+
+		Args:
+		other - the right-hand operand.
+		out - a matrix of size self.dimx * other.dimy.  It must not be self or
+			other, since the product cannot be computed over its own inputs.
+		"""
+
+		self._check_product(other)
+		if out._a.shape != (self.dimx, other.dimy):
+			raise ValueError('output matrix has the wrong dimensions')
+		if out is self or out is other:
+			raise ValueError('output matrix must not be an operand')
+		numpy.dot(self._a, other._a, out=out._a)
+		return out
+
+	def transpose(self):
+		return matrix(self._a.T)
+
+	def transpose_into(self, out):
+		"""Write the transpose of this matrix into out and return out."""
+
+		if out._a.shape != (self.dimy, self.dimx):
+			raise ValueError('output matrix has the wrong dimensions')
+		numpy.copyto(out._a, self._a.T)
+		return out
+
+	def assign(self, other):
+		"""Copy the values of other into this matrix and return self."""
+
+		self._check_same_size(other, 'assign')
+		numpy.copyto(self._a, other._a)
+		return self
+
+	def Cholesky(self, ztol=1.0e-5):
+		"""Return the upper triangular Cholesky factor of this matrix.
+
+		ztol is accepted for compatibility with matrix.matrix; LAPACK decides
+		positive-definiteness here.
+		"""
+
+		try:
+			lower = numpy.linalg.cholesky(self._a)
+		except numpy.linalg.LinAlgError:
+			raise ValueError('Matrix not positive-definite')
+		return matrix(lower.T)
+
+	def CholeskyInverse(self):
+		"""Return the inverse of U^T * U, where this matrix is U."""
+
+		u_inv = numpy.linalg.inv(self._a)
+		return matrix(numpy.dot(u_inv, u_inv.T))
+
+	def inverse(self):
+		"""Return the inverse of this positive-definite matrix."""
+
+		return self.Cholesky().CholeskyInverse()
+
+	def __repr__(self):
+		return repr(self._a.tolist())
@@ -0,0 +1,345 @@
+"""Routes between the cells of a known maze.
+
+Cells are (row, col) pairs of a maze.MazeGrid, and a route moves between
+cells that share a side with no wall on it, at a cost of 1 per move.  A
+Planner finds shortest routes with A*, and caches them:
+
+	planner = planner.Planner(maze.MazeGrid.load('maze.txt'))
+	route = planner.route((0, 0), (4, 4))
+
+When the sensors find that the map is wrong, set_wall() corrects it, and
+drops the cached routes it may have changed.  A robot following a route
+replans with a Replanner instead, which keeps the search from the goal
+between changes (D* Lite), so that only the part affected by a change is
+searched again:
+
+	replanner = planner.replanner((0, 0), (4, 4))
+	route = replanner.route()
+	...
+	replanner.move_to(route[1])
+	planner.set_wall(1, 0, 'right')
+	route = replanner.route()
+
+Searches work on flat cell indexes, row * cols + col, with the open passages
+of every cell packed in one byte, and their scores in typed arrays, so
+memory grows by a few tens of bytes per cell.
+"""
+
+from array import array
+import heapq
+import weakref
+
+import numpy
+
+INFINITY = float('inf')
+
+# Open passage bits, and the (row, col) step through each side:
+TOP, BOTTOM, LEFT, RIGHT = 1, 2, 4, 8
+SIDES = {
+	'top': (TOP, -1, 0),
+	'bottom': (BOTTOM, 1, 0),
+	'left': (LEFT, 0, -1),
+	'right': (RIGHT, 0, 1),
+}
+OPPOSITE = {TOP: BOTTOM, BOTTOM: TOP, LEFT: RIGHT, RIGHT: LEFT}
+
+
+class Planner(object):
+	"""Shortest routes through a MazeGrid, cached per (start, goal) pair.
+
+	A cached route is dropped when a wall is added across it, and every
+	cached route is dropped when a wall is removed, because a new opening
+	may shorten any of them.
+	"""
+
+	def __init__(self, grid):
+		"""Create a Planner.
+
+		Args:
+		grid - the maze.MazeGrid to plan through.  Change its walls with
+			set_wall(), so that cached routes are kept up to date.
+		"""
+
+		self.grid = grid
+		self.rows, self.cols = grid.rows, grid.cols
+		self.passages = _passages(grid)
+		self.routes = {}		# (start, goal) -> route, or None if unreachable
+		self._through = {}		# cell -> keys of the routes that pass through it
+		self._replanners = weakref.WeakSet()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def route(self, start, goal):
+		"""Return a shortest route from start to goal.
+
+		Returns a tuple of the (row, col) cells along the route, including
+		start and goal, or None if goal can't be reached from start.
+		"""
+
+		key = (tuple(start), tuple(goal))
+		if key in self.routes:
+			self.hits += 1
+			return self.routes[key]
+
+		self.misses += 1
+		result = self._astar(self._index(start), self._index(goal))
+		self.routes[key] = result
+		for cell in result or ():
+			self._through.setdefault(cell, set()).add(key)
+		return result
+
+	def replanner(self, start, goal):
+		"""Return a Replanner from start to goal, that follows set_wall()."""
+
+		return Replanner(self, start, goal)
+
+	def set_wall(self, row, col, side, wall=True):
+		"""Add or remove the wall on one side of a cell.
+
+		Args:
+		row, col - the cell.
+		side - 'top', 'bottom', 'left' or 'right'.
+		wall - True to add the wall, or False to remove it.
+
+		Returns True if a passage between two cells opened or closed.
+		"""
+
+		bit, d_row, d_col = SIDES[side]
+		if side in ('top', 'bottom'):
+			self.grid.h_walls[row + (side == 'bottom'), col] = wall
+		else:
+			self.grid.v_walls[row, col + (side == 'right')] = wall
+
+		# The outer edges of the maze are never open:
+		index = self._index((row, col))
+		other = (row + d_row, col + d_col)
+		if not (0 <= other[0] < self.rows and 0 <= other[1] < self.cols):
+			return False
+		if bool(self.passages[index] & bit) != wall:
+			return False
+
+		near = self._index(other)
+		if wall:
+			self.passages[index] &= ~bit
+			self.passages[near] &= ~OPPOSITE[bit]
+			self._drop(self._through.get((row, col), set()) &
+					   self._through.get(other, set()))
+		else:
+			self.passages[index] |= bit
+			self.passages[near] |= OPPOSITE[bit]
+			self._drop(list(self.routes))
+		for replanner in list(self._replanners):
+			replanner._edge_changed(index, near)
+		return True
+
+	def clear(self):
+		"""Drop every cached route."""
+
+		self._drop(list(self.routes))
+
+	@property
+	def stats(self):
+		"""A dict of the cache's hit, miss and eviction counters."""
+
+		return {'hits': self.hits, 'misses': self.misses,
+				'evictions': self.evictions}
+
+	def _drop(self, keys):
+		for key in keys:
+			for cell in self.routes.pop(key) or ():
+				through = self._through[cell]
+				through.discard(key)
+				if not through:
+					del self._through[cell]
+			self.evictions += 1
+
+	def _index(self, cell):
+		row, col = cell
+		if not (0 <= row < self.rows and 0 <= col < self.cols):
+			raise ValueError('cell {0} is outside the maze'.format(cell))
+		return row * self.cols + col
+
+	def _cell(self, index):
+		return divmod(index, self.cols)
+
+	def _neighbors(self, index):
+		"""Return the indexes of the cells open to a cell."""
+
+		passages, cols = self.passages[index], self.cols
+		result = []
+		if passages & TOP:
+			result.append(index - cols)
+		if passages & BOTTOM:
+			result.append(index + cols)
+		if passages & LEFT:
+			result.append(index - 1)
+		if passages & RIGHT:
+			result.append(index + 1)
+		return result
+
+	def _astar(self, start, goal):
+		"""Return the route from start to goal indexes by A*, or None.
+
+		The heuristic is the Manhattan distance.  Ties are broken towards
+		the larger cost so far, which follows one of several equal routes
+		to the end rather than widening over all of them.
+		"""
+
+		cols = self.cols
+		goal_row, goal_col = divmod(goal, cols)
+		cost = array('d', [INFINITY]) * len(self.passages)
+		parent = array('i', [-1]) * len(self.passages)
+		closed = bytearray(len(self.passages))
+		cost[start] = 0
+		heap = [(0, 0, start)]
+		neighbors = self._neighbors
+		while heap:
+			_, c, index = heapq.heappop(heap)
+			if closed[index]:
+				continue
+			if index == goal:
+				route = []
+				while index != -1:
+					route.append(divmod(index, cols))
+					index = parent[index]
+				return tuple(reversed(route))
+			closed[index] = 1
+			c = -c + 1
+			for near in neighbors(index):
+				if c < cost[near]:
+					cost[near] = c
+					parent[near] = index
+					row, col = divmod(near, cols)
+					heapq.heappush(heap, (c + abs(row - goal_row) +
+										  abs(col - goal_col), -c, near))
+		return None
+
+
+class Replanner(object):
+	"""A shortest route to a goal that is repaired as the map changes.
+
+	This is D* Lite (Koenig and Likhachev, 2002).  Costs are searched from
+	the goal, so as the robot moves towards it and walls change near the
+	robot, most of the search remains valid.  Create one with
+	Planner.replanner(), which reports its wall changes to it.
+	"""
+
+	def __init__(self, planner, start, goal):
+		self.planner = planner
+		self.start = planner._index(start)
+		self.goal = planner._index(goal)
+		size = len(planner.passages)
+		self.g = array('d', [INFINITY]) * size
+		self.rhs = array('d', [INFINITY]) * size
+		self.rhs[self.goal] = 0
+		self._km = 0
+		self._last = self.start
+		self._heap = [(self._heuristic(self.goal), 0, self.goal)]
+		planner._replanners.add(self)
+
+	def route(self):
+		"""Return a shortest route from the current start to the goal.
+
+		Returns a tuple of (row, col) cells, as Planner.route() does, or
+		None if the goal can't be reached.
+		"""
+
+		self._compute()
+		g, index = self.g, self.start
+		if self.rhs[index] == INFINITY:
+			return None
+		route = [self.planner._cell(index)]
+		while index != self.goal:
+			index = min(self.planner._neighbors(index), key=g.__getitem__)
+			route.append(self.planner._cell(index))
+		return tuple(route)
+
+	def move_to(self, cell):
+		"""Set the start of the route, once the robot has moved to cell."""
+
+		self.start = self.planner._index(cell)
+
+	def _heuristic(self, index):
+		cols = self.planner.cols
+		row, col = divmod(index, cols)
+		start_row, start_col = divmod(self.start, cols)
+		return abs(row - start_row) + abs(col - start_col)
+
+	def _key(self, index):
+		best = min(self.g[index], self.rhs[index])
+		return (best + self._heuristic(index) + self._km, best)
+
+	def _update(self, index):
+		"""Recompute the rhs of a cell from its neighbors, and queue it."""
+
+		if index != self.goal:
+			g = self.g
+			self.rhs[index] = min([g[near] + 1 for near in
+								   self.planner._neighbors(index)] or
+								  [INFINITY])
+		if self.g[index] != self.rhs[index]:
+			heapq.heappush(self._heap, self._key(index) + (index,))
+
+	def _edge_changed(self, a, b):
+		self._km += self._heuristic(self._last)
+		self._last = self.start
+		self._update(a)
+		self._update(b)
+
+	def _compute(self):
+		"""Expand the queued cells until the start's cost is settled.
+
+		The queue may hold several entries for a cell, and entries for cells
+		that have since become consistent, which are skipped.
+		"""
+
+		g, rhs, heap, start, goal = (self.g, self.rhs, self._heap, self.start,
+									 self.goal)
+		neighbors = self.planner._neighbors
+		cols, km = self.planner.cols, self._km
+		start_row, start_col = divmod(start, cols)
+
+		def key(index):
+			best = min(g[index], rhs[index])
+			row, col = divmod(index, cols)
+			return (best + abs(row - start_row) + abs(col - start_col) + km,
+					best)
+
+		start_key = key(start)
+		while heap and (heap[0][:2] < start_key or rhs[start] > g[start]):
+			k1, k2, index = heapq.heappop(heap)
+			if g[index] == rhs[index]:
+				continue
+			new_key = key(index)
+			if (k1, k2) < new_key:
+				heapq.heappush(heap, new_key + (index,))
+				continue
+			nearby = neighbors(index)
+			if g[index] > rhs[index]:
+				g[index] = rhs[index]
+				for near in nearby:
+					if near != goal and rhs[index] + 1 < rhs[near]:
+						rhs[near] = rhs[index] + 1
+						if g[near] != rhs[near]:
+							heapq.heappush(heap, key(near) + (near,))
+			else:
+				g[index] = INFINITY
+				self._update(index)
+				for near in nearby:
+					self._update(near)
+			if index == start or start in nearby:
+				start_key = key(start)
+
+
+def _passages(grid):
+	"""Return a bytearray of the open passage bits of each cell of a grid."""
+
+	passages = ((~grid.h_walls[:-1] * TOP) | (~grid.h_walls[1:] * BOTTOM) |
+				(~grid.v_walls[:, :-1] * LEFT) | (~grid.v_walls[:, 1:] * RIGHT))
+	# The outer edges of the maze are never open:
+	passages[0] &= ~TOP
+	passages[-1] &= ~BOTTOM
+	passages[:, 0] &= ~LEFT
+	passages[:, -1] &= ~RIGHT
+	return bytearray(passages.astype(numpy.uint8).tobytes())
@@ -0,0 +1,202 @@
+"""Latency histograms of the phases of the control loop.
+
+Profiling is off unless the ROBOT_PROFILE environment variable is set, or
+enable() is called.  Time a phase with:
+
+	with profiling.phase('sense'):
+		...
+
+The phases timed by the robot are:
+	sense - sonar pings and encoder reads.
+	settle - waiting for the mount to move.
+	compute - deciding where to look and how to steer.
+	actuate - commands to the motors and servo.
+
+While profiling is off, phase() returns a shared context that does nothing,
+so the cost is one function call.  The histograms are logged by dump(),
+which Robot.shutdown() calls at the end of a run, and on SIGUSR1.
+
+Look up phase() on the module each time, as above, rather than importing it,
+so that enable() and disable() take effect.
+"""
+
+import logging
+import os
+import signal
+from timeit import default_timer
+
+logger = logging.getLogger(__name__)
+
+SUB_BUCKET_BITS = 7			# Histogram precision: 2 ** -7, under 1%
+MAX_EXPONENT = 32			# Largest latency recorded is 2 ** 40 us
+MAX_VALUE = (1 << (MAX_EXPONENT + SUB_BUCKET_BITS + 1)) - 1
+PERCENTILES = (50, 90, 99)	# Percentiles in the summary
+
+
+class Histogram(object):
+	"""A histogram of latencies in microseconds, in the style of HdrHistogram.
+
+	Values below 2 * 2 ** SUB_BUCKET_BITS are counted exactly.  Above that,
+	each power of two is split into 2 ** SUB_BUCKET_BITS buckets, so every
+	value is counted with a relative error below 2 ** -SUB_BUCKET_BITS.
+	Recording a value is a few integer operations, with no allocation.
+	"""
+
+	def __init__(self):
+		self.sub_buckets = 1 << SUB_BUCKET_BITS
+		self.counts = [0] * (self.sub_buckets * (MAX_EXPONENT + 2))
+		self.count = 0
+		self.total = 0
+		self.min = None
+		self.max = None
+
+	def _index(self, value):
+		exponent = max(0, value.bit_length() - SUB_BUCKET_BITS - 1)
+		return self.sub_buckets * exponent + (value >> exponent)
+
+	def _value(self, index):
+		"""Return the highest value counted in a bucket."""
+
+		exponent = max(0, index // self.sub_buckets - 1)
+		return ((index - self.sub_buckets * exponent + 1) << exponent) - 1
+
+	def record(self, value):
+		"""Count a latency, in microseconds."""
+
+		value = min(max(int(value), 0), MAX_VALUE)
+		self.counts[self._index(value)] += 1
+		self.count += 1
+		self.total += value
+		if self.min is None or value < self.min:
+			self.min = value
+		if self.max is None or value > self.max:
+			self.max = value
+
+	@property
+	def mean(self):
+		return float(self.total) / self.count if self.count else 0.0
+
+	def percentile(self, percent):
+		"""Return the value at or below which percent of the values fall."""
+
+		if not self.count:
+			return 0
+		target = max(1, int(round(self.count * percent / 100.0)))
+		seen = 0
+		for index, count in enumerate(self.counts):
+			seen += count
+			if seen >= target:
+				return min(self._value(index), self.max)
+		return self.max
+
+
+class _Timer(object):
+	"""A context that records its duration in a Histogram."""
+
+	__slots__ = ('histogram', 'start')
+
+	def __init__(self, histogram):
+		self.histogram = histogram
+
+	def __enter__(self):
+		self.start = default_timer()
+		return self
+
+	def __exit__(self, *exc_info):
+		self.histogram.record((default_timer() - self.start) * 1e6)
+
+
+class _NullTimer(object):
+	"""A context that does nothing."""
+
+	__slots__ = ()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler(object):
+	"""A Histogram for each phase."""
+
+	def __init__(self):
+		self.histograms = {}
+
+	def phase(self, name):
+		"""Return a context that times a phase."""
+
+		histogram = self.histograms.get(name)
+		if histogram is None:
+			histogram = self.histograms.setdefault(name, Histogram())
+		return _Timer(histogram)
+
+	def summary(self):
+		"""Return a table of the histograms, in milliseconds."""
+
+		lines = ['{0:<10}{1:>8}{2:>10}'.format('phase', 'count', 'mean') +
+				 ''.join('{0:>10}'.format('p{0}'.format(p))
+						 for p in PERCENTILES) +
+				 '{0:>10}{1:>10}'.format('max', 'total')]
+		for name in sorted(self.histograms):
+			h = self.histograms[name]
+			lines.append(
+				'{0:<10}{1:>8}{2:>10.3f}'.format(name, h.count, h.mean / 1e3) +
+				''.join('{0:>10.3f}'.format(h.percentile(p) / 1e3)
+						for p in PERCENTILES) +
+				'{0:>10.3f}{1:>10.1f}'.format((h.max or 0) / 1e3,
+											   h.total / 1e3))
+		return '\n'.join(lines)
+
+
+profiler = None
+
+
+def phase(name):
+	"""Return a context that times a phase, if profiling is enabled."""
+
+	return _NULL_TIMER
+
+
+def _phase(name):
+	return profiler.phase(name)
+
+
+def enable():
+	"""Start profiling, and dump the histograms on SIGUSR1."""
+
+	global profiler, phase
+	if profiler is None:
+		profiler = Profiler()
+	phase = _phase
+	if hasattr(signal, 'SIGUSR1'):
+		try:
+			signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
+		except ValueError:
+			pass	# not in the main thread
+
+
+def disable():
+	"""Stop profiling, and discard the histograms."""
+
+	global profiler, phase
+	profiler = None
+	phase = _null_phase
+
+
+_null_phase = phase
+
+
+def dump():
+	"""Log the histograms of each phase, if profiling is enabled."""
+
+	if profiler is not None:
+		logger.info('Phase latencies (ms):\n%s', profiler.summary())
+
+
+if os.environ.get('ROBOT_PROFILE'):
+	enable()
@@ -0,0 +1,145 @@
+"""Precomputed expected sensor ranges for a maze.
+
+Ray casting against every wall for every particle is too slow on the robot.
+A RangeTable holds the expected range from the center of each cell of a
+fine grid over the maze, in each of a set of directions, quantized to one
+byte per entry.  The table is built offline:
+
+	python rangetable.py maze.txt maze.rtbl
+
+and memory-mapped at run time, so loading it is cheap and only the pages
+that are used are read.
+"""
+
+import argparse
+import math
+import struct
+
+import numpy
+
+from maze import DEFAULT_CELL_SIZE, MazeGrid
+from sensor import UltrasonicSensor
+
+MAGIC = 'RTBL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHffff')
+HEADER_SIZE = 64			# Bytes reserved for the header
+DEFAULT_RESOLUTION = 2.0	# Width of a table cell, in cm
+DEFAULT_ANGLES = 72			# Number of directions (5 degrees apart)
+DEFAULT_RANGE_STEP = 2.0	# Cm per unit of a table entry
+ROWS_PER_CHUNK = 8			# Table rows ray cast at once while building
+
+
+def build(maze, path, resolution=DEFAULT_RESOLUTION,
+		  n_angles=DEFAULT_ANGLES, range_step=DEFAULT_RANGE_STEP):
+	"""Compute the range table for a maze and write it to a file.
+
+	Args:
+	maze - a maze.Maze.
+	path - the file to write.
+	resolution - the width of each square table cell, in cm.
+	n_angles - the number of directions, evenly spread around the circle.
+	range_step - the cm per unit of a stored range.  Ranges are clipped at
+		UltrasonicSensor.MAX_RANGE, which must fit in one byte.
+
+	Returns the RangeTable.
+	"""
+
+	if UltrasonicSensor.MAX_RANGE / range_step > 255:
+		raise ValueError('range_step too small to store the maximum range')
+
+	x0, y0, x1, y1 = maze.bounds
+	nx = int(math.ceil((x1 - x0) / resolution))
+	ny = int(math.ceil((y1 - y0) / resolution))
+
+	with open(path, 'wb') as f:
+		header = HEADER.pack(MAGIC, VERSION, nx, ny, n_angles,
+							 x0, y0, resolution, range_step)
+		f.write(header.ljust(HEADER_SIZE, '\0'))
+
+	table = numpy.memmap(path, dtype=numpy.uint8, mode='r+',
+						 offset=HEADER_SIZE, shape=(nx, ny, n_angles))
+	ys = y0 + (numpy.arange(ny) + 0.5) * resolution
+	thetas = numpy.arange(n_angles) * (2 * math.pi / n_angles)
+	for start in range(0, nx, ROWS_PER_CHUNK):
+		xs = x0 + (numpy.arange(start, min(start + ROWS_PER_CHUNK, nx)) +
+				   0.5) * resolution
+		x, y, theta = numpy.meshgrid(xs, ys, thetas, indexing='ij')
+		ranges = maze.expected_range(x, y, theta)
+		table[start:start + len(xs)] = numpy.rint(ranges / range_step)
+	table.flush()
+	del table
+
+	return RangeTable(path)
+
+
+class RangeTable(object):
+	"""A memory-mapped table of expected sensor ranges.
+
+	It has the same expected_range() and bounds as maze.Maze, so it can
+	stand in for the maze in a localization.ParticleFilter.
+	"""
+
+	def __init__(self, path):
+		"""Open the range table stored at path."""
+
+		with open(path, 'rb') as f:
+			header = f.read(HEADER.size)
+		(magic, version, nx, ny, n_angles, self.x0, self.y0,
+		 self.resolution, self.range_step) = HEADER.unpack(header)
+		if magic != MAGIC or version != VERSION:
+			raise ValueError('{0} is not a range table'.format(path))
+
+		self.table = numpy.memmap(path, dtype=numpy.uint8, mode='r',
+								  offset=HEADER_SIZE, shape=(nx, ny, n_angles))
+		self._angle_step = 2 * math.pi / n_angles
+
+	@property
+	def bounds(self):
+		nx, ny = self.table.shape[:2]
+		return (self.x0, self.y0, self.x0 + nx * self.resolution,
+				self.y0 + ny * self.resolution)
+
+	def expected_range(self, x, y, theta):
+		"""Look up the range the distance sensor should read along each ray.
+
+		Args:
+		x, y, theta - the origin and direction of each ray, as in
+			Maze.ray_cast.  Scalars and arrays are broadcast together.  Origins
+			outside the table use the nearest table cell.
+
+		Returns an array of ranges in cm.
+		"""
+
+		nx, ny, n_angles = self.table.shape
+		ix = numpy.clip(((numpy.asarray(x) - self.x0) / self.resolution)
+						.astype(int), 0, nx - 1)
+		iy = numpy.clip(((numpy.asarray(y) - self.y0) / self.resolution)
+						.astype(int), 0, ny - 1)
+		ia = numpy.rint(numpy.asarray(theta) / self._angle_step).astype(int)
+		ia %= n_angles
+
+		return self.table[ix, iy, ia] * self.range_step
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Build a range table.')
+	parser.add_argument('maze', help='the maze file')
+	parser.add_argument('table', help='the range table file to write')
+	parser.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE,
+						help='width of a maze cell, in cm')
+	parser.add_argument('--resolution', type=float,
+						default=DEFAULT_RESOLUTION,
+						help='width of a table cell, in cm')
+	parser.add_argument('--angles', type=int, default=DEFAULT_ANGLES,
+						help='number of directions')
+	args = parser.parse_args()
+
+	maze = MazeGrid.load(args.maze, cell_size=args.cell_size).to_maze()
+	table = build(maze, args.table, resolution=args.resolution,
+				  n_angles=args.angles)
+	print 'Wrote {0} entries to {1}'.format(table.table.size, args.table)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,244 @@
+"""A driver module that replays a recorded telemetry log.
+
+	import replay
+	replay.load('run.tlm')
+	r = robot.Robot(driver_module='replay')
+
+Sensor and encoder queries return the recorded results in order, separately
+for each function and arguments, so us_dist(15) returns the next recorded
+us_dist(15).  Commands to the motors and servo are compared with the
+recorded commands, and the first one that differs is kept as the
+divergence.  Time only passes on the module's clock, which follows the
+recorded timestamps, so a replay runs as fast as the code allows.
+
+To re-run a recorded session of run.py, with the random seed and mode
+stored in its log:
+
+	python replay.py run.tlm
+"""
+
+import argparse
+from collections import deque
+import logging
+import sys
+
+import numpy
+
+from clock import SimulatedClock
+import run
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+# The functions whose results are replayed, and the types of their results:
+QUERIES = {'enc_read': int, 'us_dist': int, 'volt': float}
+
+session = None
+
+
+class ReplayExhausted(Exception):
+	"""A query was made beyond the end of the recording."""
+
+
+class ReplayDivergence(Exception):
+	"""A command differs from the recording."""
+
+
+class Session(object):
+	"""The recorded calls of a telemetry log, and the progress of a replay."""
+
+	def __init__(self, path, strict=False):
+		"""Create a Session.
+
+		Args:
+		path - the telemetry log to replay.
+		strict - if True, raise ReplayDivergence at the first command that
+			differs from the recording.
+		"""
+
+		self.names, records = telemetry.read(path)
+		self.strict = strict
+		self.now = float(records['time'][0]) if len(records) else 0.0
+
+		self.queries = {}
+		self.commands = []
+		for record in records:
+			name = self.names[record['function']]
+			args = _args(record)
+			if name in QUERIES:
+				self.queries.setdefault((name, args), deque()).append(
+					(float(record['time']), QUERIES[name](record['result'])))
+			else:
+				self.commands.append((name, args))
+		self.command_index = 0
+		self.divergence = None	# (index, recorded, replayed) of the first
+		self.mismatches = 0
+
+	def query(self, name, args):
+		"""Return the next recorded result of a query."""
+
+		try:
+			timestamp, result = self.queries[(name, _numbers(args))].popleft()
+		except (KeyError, IndexError):
+			raise ReplayExhausted('no more recorded {0}{1}'.format(name, args))
+		self.now = max(self.now, timestamp)
+		return result
+
+	def command(self, name, args):
+		"""Compare a command with the next recorded one."""
+
+		call = (name, _numbers(args))
+		index = self.command_index
+		recorded = self.commands[index] if index < len(self.commands) else None
+		self.command_index += 1
+		if call == recorded:
+			return
+
+		self.mismatches += 1
+		if self.divergence is None:
+			self.divergence = (index, recorded, call)
+			logger.warning('Command %s: replayed %s, recorded %s',
+						   index, call, recorded)
+		if self.strict:
+			raise ReplayDivergence('command {0}: replayed {1}, recorded {2}'
+								   .format(index, call, recorded))
+
+	@property
+	def remaining(self):
+		"""The number of recorded queries not yet replayed."""
+
+		return sum(len(results) for results in self.queries.values())
+
+
+def _numbers(args):
+	return tuple(float(arg) for arg in args[:telemetry.MAX_ARGS])
+
+
+def _args(record):
+	return tuple(float(arg) for arg in record['args'][:record['nargs']])
+
+
+def load(path, strict=False):
+	"""Start replaying a telemetry log.  Returns the new Session."""
+
+	global session
+	session = Session(path, strict)
+	return session
+
+
+def _session():
+	if session is None:
+		raise ReplayExhausted('no telemetry log loaded')
+	return session
+
+
+class ReplayClock(SimulatedClock):
+	"""The clock of the current session."""
+
+	def time(self):
+		return _session().now
+
+	def sleep(self, seconds):
+		if seconds > 0:
+			_session().now += seconds
+
+
+clock = ReplayClock()
+
+
+# The gopigo driver functions used by the robot:
+
+def servo(angle):
+	_session().command('servo', (angle,))
+
+def set_speed(speed):
+	_session().command('set_speed', (speed,))
+
+def set_left_speed(speed):
+	_session().command('set_left_speed', (speed,))
+
+def set_right_speed(speed):
+	_session().command('set_right_speed', (speed,))
+
+def stop():
+	_session().command('stop', ())
+
+def fwd():
+	_session().command('fwd', ())
+
+def enc_tgt(m1, m2, target):
+	_session().command('enc_tgt', (m1, m2, target))
+
+def right_rot():
+	_session().command('right_rot', ())
+
+def left_rot():
+	_session().command('left_rot', ())
+
+def trim_write(trim):
+	_session().command('trim_write', (trim,))
+
+def enc_read(motor):
+	return _session().query('enc_read', (motor,))
+
+def us_dist(pin):
+	return _session().query('us_dist', (pin,))
+
+def volt():
+	return _session().query('volt', ())
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Re-run a recorded session of run.py.')
+	parser.add_argument('log', help='the telemetry log to replay')
+	parser.add_argument('--seed', type=int,
+						help='the random seed of the recorded run, if the '
+						'log has none')
+	parser.add_argument('--explore', action='store_true',
+						help='the recorded run explored a maze, if the log '
+						'doesn\'t say')
+	parser.add_argument('--solve', action='store_true',
+						help='the recorded run solved a maze, if the log '
+						'doesn\'t say')
+	parser.add_argument('--continuous', action='store_true',
+						help='the recorded run sensed corridors on the move, '
+						'if the log doesn\'t say')
+	parser.add_argument('--strict', action='store_true',
+						help='stop at the first command that differs')
+	parser.add_argument('-v', '--verbose', action='store_true',
+						help='log every reading and steering adjustment')
+	args = parser.parse_args()
+	logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+						format='%(name)s: %(message)s')
+
+	info = telemetry.read_info(args.log)
+	seed = info.get('seed')
+	if seed is None:
+		seed = args.seed
+	if seed is None:
+		parser.error('the log has no random seed; give it with --seed')
+
+	s = load(args.log, strict=args.strict)
+	numpy.random.seed(seed)
+	r = run.build_robot(driver_module=__name__,
+						explore=info.get('explore', args.explore),
+						solve=info.get('solve', args.solve),
+						continuous=info.get('continuous', args.continuous))
+	try:
+		r.run()
+	except ReplayExhausted as e:
+		logger.info('Recording ended: %s', e)
+
+	if s.divergence is None:
+		print 'Replayed {0} commands with no divergence'.format(
+			s.command_index)
+		return 0
+	print 'Diverged at command {0}: replayed {2}, recorded {1}'.format(
+		*s.divergence)
+	print '{0} of {1} commands differ'.format(s.mismatches, s.command_index)
+	return 1
+
+
+if __name__ == '__main__':
+	sys.exit(main())
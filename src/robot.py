@@ -1,10 +1,19 @@
 """An implementation of a state-driven autonomous robot."""
 
 from importlib import import_module
+import math
 import time
 
+import numpy
+
+from acquisition import AcquisitionService
+from clock import RealClock
+from heading import HeadingFilter
 import mount
+import profiling
 import sensor
+from sensor import SWEEP_DTYPE
+from telemetry import Recorder
 
 
 MIN_VOLTAGE = 7.0		# Minimum allowable voltage for consistent behavior
@@ -12,10 +21,15 @@ MOTOR_LEFT = 0			# Index of the left motor
 MOTOR_RIGHT = 1			# Index of the right motor
 TRIM_STRAIGHT = -10		# Trim setting for straight movement
 DEFAULT_SPEED = 70  	# Slowest speed without stall (60/120 for batt/cable)
+SWEEP_SPEED = 60		# Speed while sweeping on the move, slowest on battery
 TURN_SPEED = 10			# Added speed for the outside wheel when turning
 MAX_TURN_RATIO = 1.2	# Max ratio of outside wheel to inside wheel speeds
 ROTATING_DEGREES_PER_TICK = 10	# Degrees of robot rotation in one encoder tick
 TURNING_DEGREES_PER_TICK = 5	# Degrees of robot turn in one encoder tick
+DISTANCE_PER_TICK = 1.13		# Cm of wheel travel in one encoder tick
+WHEEL_BASE = DISTANCE_PER_TICK / math.radians(TURNING_DEGREES_PER_TICK)
+								# Cm between the wheels
+HEADING_RESOLUTION = 10			# Degrees per bin of the heading belief
 
 
 class LowVoltageError(Exception):
@@ -30,7 +44,8 @@ class Robot(object):
 	unrecoverable exception occurs.  Or until you step on it.
 	"""
 
-	def __init__(self, driver_module='gopigo'):
+	def __init__(self, driver_module='gopigo', clock=None, telemetry=None,
+				 telemetry_info=None):
 		"""Initialize the robot attributes.
 
 		Args:
@@ -40,13 +55,35 @@ class Robot(object):
 			substituted for testing purposes.  This delayed import allows for
 			development and testing without having to install all of the gopigo
 			dependencies.
+		clock - the clock for timing and waiting.  Default is the driver
+			module's clock, if it has one (as a simulation does), or else a
+			RealClock.
+		telemetry - if given, the file to record every driver call to.  See
+			the telemetry module.
+		telemetry_info - a dict of facts about the run, such as its random
+			seed, to store in the telemetry log.
 
 		"""
 
 		self.driver = import_module(driver_module)
+		self.clock = clock or getattr(self.driver, 'clock', None) or RealClock()
+		self.telemetry = None
+		if telemetry:
+			self.telemetry = Recorder(self.driver, telemetry, clock=self.clock,
+									  info=telemetry_info)
+			self.driver = self.telemetry
 		self.distance_sensor = None
+		self.dist_cache = None	# Optional cache.MeasurementCache for dist()
+		self.acquisition = None
 		self.state = None
 
+		# The direction of travel relative to the robot.  It belongs to the
+		# robot rather than to a state, so that it carries over from one
+		# state to the next:
+		self.heading = HeadingFilter(resolution=HEADING_RESOLUTION)
+		self.is_oriented = False
+		self.corridor_width = None	# cm, of the corridors, once fitted
+
 		volt = self.volt
 		if volt < MIN_VOLTAGE:
 			raise LowVoltageError('{0}V is below min voltage'.format(volt))
@@ -86,32 +123,165 @@ class Robot(object):
 		indicate a net left turn.
 		"""
 
-		left_encoder = self.driver.enc_read(MOTOR_LEFT)
-		right_encoder = self.driver.enc_read(MOTOR_RIGHT)
+		diff_left, diff_right = self.encoder_deltas()
+
+		return (diff_left - diff_right) * TURNING_DEGREES_PER_TICK
+
+	def encoder_deltas(self):
+		"""Return the encoder ticks (left, right) since last accessed.
+
+		This shares its baseline with degrees_turned.
+		"""
+
+		with profiling.phase('sense'):
+			left_encoder = self.driver.enc_read(MOTOR_LEFT)
+			right_encoder = self.driver.enc_read(MOTOR_RIGHT)
 		diff_left = left_encoder - self.left_encoder
 		diff_right = right_encoder - self.right_encoder
-		degrees = (diff_left - diff_right) * TURNING_DEGREES_PER_TICK
 
 		self.left_encoder = left_encoder
 		self.right_encoder = right_encoder
 
-		return degrees
+		return diff_left, diff_right
+
+	def _check_sensor_available(self):
+		if not self.distance_sensor:
+			raise ValueError('no sensor configured')
+		if self.acquisition and self.acquisition.running:
+			raise ValueError('sensor is in use by the acquisition service')
+
+	@property
+	def odometer(self):
+		"""Return the total encoder ticks travelled by both wheels."""
+
+		with profiling.phase('sense'):
+			return (self.driver.enc_read(MOTOR_LEFT) +
+					self.driver.enc_read(MOTOR_RIGHT))
 
 	def dist(self, angle=0):
-		"""Take an return a distance sensor reading in the direction given."""
+		"""Take an return a distance sensor reading in the direction given.
+
+		If dist_cache is set, a recent reading in (nearly) the same direction
+		is returned without moving the sensor, unless the robot has moved
+		since it was taken.
+		"""
+
+		self._check_sensor_available()
+
+		if self.dist_cache is None:
+			return self.distance_sensor.sense(angle)
+
+		ticks = self.odometer
+		measurement = self.dist_cache.get(angle, ticks, now=self.clock.time())
+		if measurement is None:
+			measurement = self.distance_sensor.sense(angle)
+			self.dist_cache.put(angle, measurement, ticks,
+								now=self.clock.time())
+
+		return measurement
+
+	def sweep(self, angles):
+		"""Take distance sensor readings in several directions in one pass.
+
+		Returns a numpy array of sensor.SWEEP_DTYPE, one row per angle.
+		"""
+
+		self._check_sensor_available()
+
+		sweep = self.distance_sensor.sense_sweep(angles)
+		if self.dist_cache is not None:
+			ticks = self.odometer
+			for angle, distance, timestamp in sweep:
+				self.dist_cache.put(angle, int(distance), ticks, now=timestamp)
+
+		return sweep
+
+	def sweep_in_motion(self, angles):
+		"""Take distance readings in several directions without stopping.
+
+		The encoders are read as each reading completes, so that each
+		reading can be placed at the pose it was taken from.  See
+		walls.compensate_motion.
+
+		Returns a tuple (sweep, ticks), where:
+			sweep is a numpy array of sensor.SWEEP_DTYPE, one row per
+				distinct angle, in the order the readings were taken.
+			ticks is an N x 2 array of the encoder ticks (left, right) of
+				each reading since the one before, or for the first since
+				encoder_deltas() was last called.
+		"""
+
+		self._check_sensor_available()
+
+		readings, ticks = [], []
+		for reading in self.distance_sensor.iter_sweep(angles):
+			readings.append(reading)
+			ticks.append(self.encoder_deltas())
+
+		return (numpy.array(readings, dtype=SWEEP_DTYPE),
+				numpy.array(ticks, dtype=int).reshape(-1, 2))
+
+	def start_acquisition(self, angles):
+		"""Start sensing the given directions continuously in the background.
+
+		While acquisition is running, read distances with latest_dist()
+		instead of dist() or sweep().  Acquisition is stopped by stop().
+		"""
 
 		if not self.distance_sensor:
 			raise ValueError('no sensor configured')
-		
-		return self.distance_sensor.sense(angle)
+		if self.acquisition:
+			self.acquisition.stop()
+		self.acquisition = AcquisitionService(self.distance_sensor, angles,
+											  clock=self.clock)
+		self.acquisition.start()
+
+	def latest_dist(self, angle, max_age=None):
+		"""Return the latest background distance reading in a direction.
+
+		Returns the distance in cm, or None if there is no reading newer than
+		max_age seconds.
+		"""
+
+		if not self.acquisition:
+			raise ValueError('acquisition not started')
+
+		reading = self.acquisition.latest(angle, max_age=max_age)
+		return reading[0] if reading else None
 
 	def stop(self):
+		"""Stop the robot."""
+
+		if self.acquisition:
+			self.acquisition.stop()
 		self.distance_sensor.center()  # Because OCD is a thing
-		self.driver.stop()
+		with profiling.phase('actuate'):
+			self.driver.stop()
 
-	def fwd(self):
-		self.driver.set_speed(DEFAULT_SPEED)
-		self.driver.fwd()
+	def shutdown(self):
+		"""End a run: stop, log the profile and close the telemetry log."""
+
+		self.stop()
+		profiling.dump()
+		if self.telemetry:
+			self.telemetry.close()
+
+	def fwd(self, speed=DEFAULT_SPEED):
+		"""Drive straight ahead until stopped, at the given motor speed."""
+
+		with profiling.phase('actuate'):
+			self.driver.set_speed(speed)
+			self.driver.fwd()
+		self.speed = [speed, speed]
+
+	def forward(self, distance):
+		"""Drive straight ahead the given distance in cm, then stop."""
+
+		with profiling.phase('actuate'):
+			self.driver.stop()
+			self.driver.set_speed(DEFAULT_SPEED)
+			self.driver.enc_tgt(1, 1, int(round(distance / DISTANCE_PER_TICK)))
+			self.driver.fwd()
 		self.speed = [DEFAULT_SPEED, DEFAULT_SPEED]
 
 	def rotate(self, degrees=0):
@@ -123,26 +293,30 @@ class Robot(object):
 			a right-hand rotation.
 		"""
 
-		self.driver.stop()
-		if degrees < 0:
-			self.driver.enc_tgt(1, 0, abs(int(degrees / ROTATING_DEGREES_PER_TICK)))
-			self.driver.right_rot()
-		else:
-			self.driver.enc_tgt(0, 1, int(degrees / ROTATING_DEGREES_PER_TICK))
-			self.driver.left_rot()
+		with profiling.phase('actuate'):
+			self.driver.stop()
+			if degrees < 0:
+				self.driver.enc_tgt(1, 0, abs(int(degrees / ROTATING_DEGREES_PER_TICK)))
+				self.driver.right_rot()
+			else:
+				self.driver.enc_tgt(0, 1, int(degrees / ROTATING_DEGREES_PER_TICK))
+				self.driver.left_rot()
 
-	def steer(self, steering_factor):
+	def steer(self, steering_factor, max_turn_ratio=MAX_TURN_RATIO):
 		"""Adjust wheel speeds to adjust turning rate.
 
 		Args:
 		steering_factor - a multiple to scale TURN_SPEED, which computes the
 			new speed of the outside wheel of the turn.  Postive values result
 			in a left turn, and negative values in a right turn.
+		max_turn_ratio - the max ratio of outside wheel to inside wheel
+			speeds.  Following a corridor needs no more than MAX_TURN_RATIO,
+			but turning a corner does.
 		"""
 
 		turn_wheel_speed = min([
 			int(DEFAULT_SPEED + abs(steering_factor) * TURN_SPEED),
-			int(DEFAULT_SPEED * MAX_TURN_RATIO)
+			int(DEFAULT_SPEED * max_turn_ratio)
 		])
 
 		if steering_factor > 0:
@@ -151,5 +325,6 @@ class Robot(object):
 			self.speed = [turn_wheel_speed, DEFAULT_SPEED]
 		else:
 			self.speed = [DEFAULT_SPEED, DEFAULT_SPEED]
-		self.driver.set_left_speed(self.speed[0])
-		self.driver.set_right_speed(self.speed[1])
+		with profiling.phase('actuate'):
+			self.driver.set_left_speed(self.speed[0])
+			self.driver.set_right_speed(self.speed[1])
@@ -1,8 +1,14 @@
 """Top-level script for letting the robot run."""
 
+import argparse
+import logging
+import random
 import sys
-import time
 
+import numpy
+
+import cache
+import machine
 import mount
 import robot
 import sensor
@@ -14,26 +20,97 @@ def sensor_error(raw_sensor_value):
 	return (raw_sensor_value + 2.5) / 1.32
 
 
-def go():
-	r = robot.Robot()
-	m = mount.SwivelMount(driver=r.driver, servo_center=93)
+def build_robot(driver_module='gopigo', telemetry=None, explore=False,
+				solve=False, continuous=False, seed=None):
+	"""Return the robot, equipped with its sensor and corridor state.
+
+	If explore is True, the robot explores an unknown maze instead of
+	following a corridor.  If solve is True, it follows the corridors of a
+	maze, turning at junctions and back from dead ends.  If continuous is
+	True, it senses each corridor on the move rather than stopping first.
+	The random seed, if given, and the mode are stored in the telemetry log
+	for replay.
+	"""
+
+	info = {'seed': seed, 'explore': explore, 'solve': solve,
+			'continuous': continuous}
+	r = robot.Robot(driver_module=driver_module, telemetry=telemetry,
+					telemetry_info=info)
+	m = mount.SwivelMount(driver=r.driver, servo_center=93, clock=r.clock)
 	s = sensor.UltrasonicSensor(driver=r.driver,
 								mount=m,
-								error_fnc=sensor_error)
-	cs = state.CorridorState(robot=r)
+								error_fnc=sensor_error,
+								clock=r.clock,
+								adaptive=True)
+	if explore:
+		st = state.ExplorationState(robot=r)
+	elif solve:
+		st = machine.maze_machine(r, continuous=continuous)
+	else:
+		st = state.CorridorState(robot=r, continuous=continuous)
 
 	r.distance_sensor = s
-	r.state = cs
+	r.dist_cache = cache.MeasurementCache()
+	r.state = st
+
+	return r
+
 
-	print 'Voltage: {0}'.format(r.volt)
-	print 'Starting in 3 seconds...'
-	time.sleep(3)
+def go(telemetry=None, seed=None, explore=False, map_path=None, solve=False,
+	   continuous=False):
+	if seed is None:
+		seed = random.randint(0, 2 ** 31)
+	logging.info('Random seed: %s', seed)	# to replay the run
+	numpy.random.seed(seed)
+	r = build_robot(telemetry=telemetry, explore=explore, solve=solve,
+					continuous=continuous, seed=seed)
+
+	logging.info('Voltage: %s', r.volt)
+	logging.info('Starting in 3 seconds...')
+	r.clock.sleep(3)
 	try:
-		r.run()
+		result = r.run()
+		if explore and map_path:
+			result.save(map_path)
 	except KeyboardInterrupt:
-		r.stop()
 		sys.exit()
+	finally:
+		r.shutdown()
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Let the robot run.')
+	parser.add_argument('-v', '--verbose', action='store_true',
+						help='log every reading and steering adjustment')
+	parser.add_argument('-q', '--quiet', action='store_true',
+						help='log only warnings and errors')
+	parser.add_argument('--telemetry', metavar='PATH',
+						help='record every driver call to a telemetry log')
+	parser.add_argument('--seed', type=int,
+						help='seed for the random choices of the robot')
+	parser.add_argument('--explore', action='store_true',
+						help='explore an unknown maze instead of a corridor')
+	parser.add_argument('--map', metavar='PATH',
+						help='with --explore, save the map to a snapshot')
+	parser.add_argument('--solve', action='store_true',
+						help='follow the corridors of a maze, turning at '
+						'junctions')
+	parser.add_argument('--continuous', action='store_true',
+						help='sense each corridor on the move, without '
+						'stopping to orient')
+	args = parser.parse_args()
+
+	level = logging.INFO
+	if args.verbose:
+		level = logging.DEBUG
+	elif args.quiet:
+		level = logging.WARNING
+	logging.basicConfig(level=level,
+						format='%(asctime)s %(name)s: %(message)s')
+
+	go(telemetry=args.telemetry, seed=args.seed, explore=args.explore,
+	   map_path=args.map, solve=args.solve, continuous=args.continuous)
 
 
 if __name__ == '__main__':
-	go()
+	main()
@@ -0,0 +1,122 @@
+"""Features of a sweep of distance measurements."""
+
+from collections import namedtuple
+import math
+
+import numpy
+
+FIT_WINDOW = 45		# Degrees either side of the dip used to fit a wall
+
+# The direction perpendicular to a wall in a sweep:
+#	index - the index of the measurement closest to perpendicular.
+#	offset - the fraction of a step from index to the perpendicular, if it
+#		was fitted, or else 0.
+#	sigma - the std dev of index + offset, in steps.
+#	confidence - from 0 to 1, how clearly the sweep dips towards the wall.  0
+#		means no dip was found, and the index is only a guess.
+Perpendicular = namedtuple('Perpendicular',
+						   ['index', 'offset', 'sigma', 'confidence'])
+
+
+def find_perpendicular(distances, step=None, window=FIT_WINDOW):
+	"""Find the measurement perpendicular to a wall in a sweep.
+
+	The perpendicular is the center of the lowest "dip" in the sweep: a run of
+	equal measurements with larger ones on both sides.  A dip at either end of
+	the sweep must be at least two measurements wide, because a single
+	reading at an end may be the start of a slope.  The center of a dip with
+	an even width is taken on the side away from the nearest end.  If there is
+	no dip, the last index is returned with a confidence of 0.
+
+	Args:
+	distances - a sequence of distances measured across a continuous arc in
+		equal steps.
+	step - the angle between measurements, in degrees.  If given, the
+		perpendicular is refined to a fraction of a step by fitting the
+		distances to a flat wall, whose distance is D / cos(angle).
+	window - the degrees either side of the dip used in the fit.
+
+	Returns a Perpendicular.
+	"""
+
+	distances = numpy.asarray(distances, dtype=float)
+	n = len(distances)
+	if not n:
+		raise ValueError('no distances')
+
+	# Split the sweep into runs of equal values:
+	starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(distances))
+								+ 1))
+	ends = numpy.concatenate((starts[1:], [n])) - 1
+	values = distances[starts]
+
+	# A run is a dip if its neighbors on both sides are larger:
+	falls = values[:-1] > values[1:]
+	is_dip = numpy.concatenate(([True], falls)) & \
+		numpy.concatenate((~falls, [True]))
+	is_dip &= ~(((starts == 0) | (ends == n - 1)) & (starts == ends))
+	if not is_dip.any():
+		# The sweep slopes down to its end, so the wall is at or beyond it:
+		return Perpendicular(n - 1, 0.0, 1.0, 0.0)
+
+	run = numpy.argmin(numpy.where(is_dip, values, numpy.inf))
+	start, end, value = starts[run], ends[run], values[run]
+	if start == 0:
+		index = (start + end + 1) // 2
+	else:
+		index = (start + end) // 2
+	width = end - start + 1
+	sigma = width / math.sqrt(12)	# std dev of a uniform error over the run
+
+	# The depth of the dip, relative to the lower of its two sides:
+	sides = [distances[:start].max() if start else None,
+			 distances[end + 1:].max() if end < n - 1 else None]
+	sides = [side for side in sides if side is not None]
+	confidence = 1.0 - value / min(sides) if sides and min(sides) > 0 else 0.0
+
+	perpendicular = Perpendicular(int(index), 0.0, sigma, confidence)
+	if step:
+		perpendicular = _fit_wall(distances, perpendicular, step, window)
+
+	return perpendicular
+
+
+def _fit_wall(distances, perpendicular, step, window):
+	"""Refine a perpendicular by least squares on the flat wall model.
+
+	For a wall at distance D, perpendicular at angle p, the reciprocal of the
+	distance at angle a is cos(a - p) / D = A cos(a) + B sin(a), which is
+	linear in A and B.  Returns the original perpendicular if the fit fails or
+	falls outside the window.
+	"""
+
+	half = int(window // step)
+	lo = max(0, perpendicular.index - half)
+	hi = min(len(distances), perpendicular.index + half + 1)
+	segment = distances[lo:hi]
+	valid = segment > 0
+	if valid.sum() < 4:
+		return perpendicular
+
+	angles = numpy.radians((numpy.arange(lo, hi) - perpendicular.index) *
+						   float(step))[valid]
+	X = numpy.column_stack((numpy.cos(angles), numpy.sin(angles)))
+	y = 1.0 / segment[valid]
+	(a, b), residuals, rank, _ = numpy.linalg.lstsq(X, y, rcond=None)
+	if rank < 2 or a <= 0:
+		return perpendicular
+
+	fitted = perpendicular.index + math.degrees(math.atan2(b, a)) / step
+	if not lo <= fitted <= hi - 1:
+		return perpendicular	# the wall is not where the dip is
+	index = int(round(fitted))
+
+	# Propagate the covariance of (A, B) to the angle atan2(B, A):
+	dof = len(y) - 2
+	variance = residuals[0] / dof if len(residuals) and dof else 0.0
+	covariance = variance * numpy.linalg.inv(X.T.dot(X))
+	gradient = numpy.array([-b, a]) / (a * a + b * b)
+	sigma = math.degrees(math.sqrt(gradient.dot(covariance).dot(gradient)))
+
+	return perpendicular._replace(index=index, offset=fitted - index,
+								  sigma=sigma / step)
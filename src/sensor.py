@@ -1,22 +1,104 @@
 """Implementations for available sensors."""
 
+from collections import namedtuple
+import logging
+
+import numpy
+
+from clock import RealClock
+import profiling
+
+logger = logging.getLogger(__name__)
+
 DEFAULT_PIN = 15
+PINGS = 3			# Pings per reading
+AGREEMENT = 2		# Cm within which two pings agree, in adaptive mode
+MAX_PINGS = 5		# Most pings per reading, in adaptive mode
+
+# Mean range of n normal samples, in std devs, for estimating the dispersion
+# of a few pings from their range:
+RANGE_FACTORS = {2: 1.128, 3: 1.693, 4: 2.059, 5: 2.326}
+
+# A batch of readings, one per row:
+SWEEP_DTYPE = numpy.dtype([
+	('angle', int),			# mount angle of the reading, in degrees
+	('distance', int),		# distance sensed, in cm
+	('timestamp', float)	# clock time the reading completed, in secs
+])
+
+# One distance reading:
+#	distance - the median of the pings, corrected for error, in cm.
+#	dispersion - the estimated std dev of a single ping, corrected for
+#		error, in cm.
+#	pings - the number of pings taken.
+Reading = namedtuple('Reading', ['distance', 'dispersion', 'pings'])
 
 
 def median(x):
-	"""Return the median of a list of values."""
+	"""Return the median of a list of values.
 
-	m, r = divmod(len(x), 2)
+	Up to five values are compared in place, without sorting a copy.
+	"""
+
+	n = len(x)
+	if n == 1:
+		return x[0]
+	if n == 2:
+		return (x[0] + x[1]) / 2
+	if n == 3:
+		return _median3(x[0], x[1], x[2])
+	if n == 4:
+		return (x[0] + x[1] + x[2] + x[3] - min(x) - max(x)) / 2
+	if n == 5:
+		return _median5(x[0], x[1], x[2], x[3], x[4])
+
+	s = sorted(x)
+	m, r = divmod(n, 2)
 	if r:
-		return sorted(x)[m]
-	return sum(sorted(x)[m - 1:m + 1]) / 2
+		return s[m]
+	return (s[m - 1] + s[m]) / 2
+
+
+def _median3(a, b, c):
+	return max(min(a, b), min(max(a, b), c))
+
+
+def _median5(a, b, c, d, e):
+	# Twice, order two pairs and drop the lower of their minimums, which is
+	# below the median.  The median is then the least of the other three.
+	if a > b:
+		a, b = b, a
+	if c > d:
+		c, d = d, c
+	if a > c:
+		a, b, c, d = c, d, a, b
+	a = e
+	if a > b:
+		a, b = b, a
+	if a > c:
+		a, b, c, d = c, d, a, b
+	return min(b, c)
+
+
+def dispersion(x):
+	"""Return an estimate of the std dev of the values x were drawn from.
+
+	For up to five values this is their range, scaled by RANGE_FACTORS.
+	"""
+
+	n = len(x)
+	if n < 2:
+		return 0.0
+	if n in RANGE_FACTORS:
+		return (max(x) - min(x)) / RANGE_FACTORS[n]
+	return float(numpy.std(x, ddof=1))
 
 
 class BaseSensor(object):
 	"""An abstract base class for sensors."""
 
 	def __init__(self, driver=None, mount=None, pin=DEFAULT_PIN,
-				 error_fnc=lambda x: x):
+				 error_fnc=lambda x: x, clock=None):
 		"""Initialize the sensor.
 
 		Args:
@@ -26,12 +108,14 @@ class BaseSensor(object):
 		pin - the controller board pin that the sensor is connected to.
 		error_fnc - a function that corrects a sensor reading for error
 			(default no error).
+		clock - the clock used to timestamp readings (default RealClock()).
 		"""
 
 		self.driver = driver
 		self.mount = mount
 		self.pin = pin
 		self.error_fnc = error_fnc
+		self.clock = clock or RealClock()
 
 	def sense(self, *args, **kwargs):
 		raise NotImplementedError
@@ -46,6 +130,27 @@ class UltrasonicSensor(BaseSensor):
 
 	MAX_RANGE = 300
 
+	def __init__(self, adaptive=False, agreement=AGREEMENT,
+				 max_pings=MAX_PINGS, **kwargs):
+		"""Initialize the sensor.
+
+		Args:
+		adaptive - if True, each reading takes two pings, and stops there if
+			they agree within agreement cm.  Otherwise it takes max_pings.
+			If False, each reading takes PINGS pings.
+		agreement - the difference in cm within which two pings agree.
+		max_pings - the most pings in an adaptive reading.
+
+		Other keyword arguments are passed to BaseSensor.
+		"""
+
+		super(UltrasonicSensor, self).__init__(**kwargs)
+		if max_pings < 2:
+			raise ValueError('max_pings must be at least 2')
+		self.adaptive = adaptive
+		self.agreement = agreement
+		self.max_pings = max_pings
+
 	def sense(self, *args, **kwargs):
 		return self.sense_distance(args[0])
 
@@ -56,25 +161,88 @@ class UltrasonicSensor(BaseSensor):
 		angle - the direction to sense, where 0 is straight ahead.  Must be in
 			the forward arc of the robot (270 degrees clockwise to 90 degrees).
 
-		Returns distance in cm.  The sensor is commanded to take three
+		Returns distance in cm.  The sensor is commanded to take several
 		measurements, and the median measurement is returned.
 		"""
 
+		return self.sense_reading(angle).distance
+
+	def sense_reading(self, angle):
+		"""Sense the distance at a given direction, with its dispersion.
+
+		Args:
+		angle - the direction to sense, as for sense_distance.
+
+		Returns a Reading.
+		"""
+
 		if angle and not self.mount:
 			raise ValueError('direction commanded to fixed sensor')
 		else:
 			self.mount.move(x=angle)
 
-		measurements = []
-		for i in range(3):
-			measurements.append(self.driver.us_dist(self.pin))
+		reading = self._measure()
+		logger.debug('Sensed %s cm at angle %s', reading.distance, angle)
+
+		return reading
+
+	def _ping(self):
+		return min(self.driver.us_dist(self.pin), self.MAX_RANGE)
+
+	def _measure(self):
+		"""Return a Reading of several measurements in the current direction."""
+
+		with profiling.phase('sense'):
+			if self.adaptive:
+				first, second = self._ping(), self._ping()
+				measurements = [first, second]
+				if abs(first - second) > self.agreement:
+					for i in range(self.max_pings - 2):
+						measurements.append(self._ping())
+			else:
+				measurements = [self._ping() for i in range(PINGS)]
+
+		raw_measurement = median(measurements)
+		distance = self.error_fnc(raw_measurement)
+		spread = abs(self.error_fnc(raw_measurement +
+									dispersion(measurements)) - distance)
+		return Reading(int(distance), spread, len(measurements))
+
+	def iter_sweep(self, angles):
+		"""Sense the distance at several directions in one pass of the mount.
 
-		raw_measurement = min([median(measurements), self.MAX_RANGE])
-		measurement = int(self.error_fnc(raw_measurement))
+		Args:
+		angles - the directions to sense.  They are visited in a single
+			monotonic pass planned by the mount, and duplicates are sensed
+			once.
+
+		Yields a tuple (angle, distance, timestamp) for each distinct angle,
+		in the order the readings are taken.
+		"""
+
+		if not self.mount:
+			raise ValueError('sweep commanded to fixed sensor')
+
+		for angle in self.mount.plan(angles).order:
+			self.mount.move(x=angle)
+			measurement = self._measure().distance
+			logger.debug('Sensed %s cm at angle %s', measurement, angle)
+			yield angle, measurement, self.clock.time()
+
+	def sense_sweep(self, angles):
+		"""Sense the distance at several directions in one pass of the mount.
+
+		Args:
+		angles - the directions to sense, where 0 is straight ahead.
+
+		Returns a numpy array of SWEEP_DTYPE with one row per requested angle,
+		in the order requested.  Only the first move of the pass can be long;
+		each following step waits only for its own short travel.
+		"""
 
-		print 'Sensed {0} cm at angle {1}'.format(measurement, angle)
+		readings = dict((r[0], r) for r in self.iter_sweep(angles))
 
-		return measurement
+		return numpy.array([readings[a] for a in angles], dtype=SWEEP_DTYPE)
 
 	def sense_swath(self, center=0, width=0, num_measurements=1,
 					return_all_measurements=False):
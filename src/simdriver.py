@@ -0,0 +1,268 @@
+"""A simulated robot that stands in for the gopigo module.
+
+	import simdriver
+	simdriver.reset(maze=simdriver.corridor(width=60), pose=(20, 30, 0))
+	r = robot.Robot(driver_module='simdriver')
+
+The simulation holds a 2-D world of walls and the pose of the robot in it.
+Motor commands are integrated into motion, encoder ticks and servo travel
+as simulated time passes.  Simulated time only passes when the robot sleeps
+on the module's clock or pings the distance sensor, so a run costs no wall
+time beyond the computation itself.
+"""
+
+import math
+
+import numpy
+
+from clock import SimulatedClock
+from maze import Maze
+import mount
+import robot
+from robot import DISTANCE_PER_TICK, WHEEL_BASE
+import sensor
+
+CM_PER_SEC_PER_SPEED = 0.25		# Wheel speed in cm/s per unit of motor speed
+ROBOT_RADIUS = 7.0				# Cm from the robot's center to its bumper
+SERVO_DEGREES_PER_SEC = 450.0	# Servo slew rate
+PING_TIME = 0.03				# Secs taken by one ultrasonic ping
+US_MAX = 600					# Reading when no echo returns
+TIME_STEP = 0.02				# Secs per integration step
+DEFAULT_VOLTAGE = 10.0
+
+world = None
+
+
+class SimulationTimeout(Exception):
+	pass
+
+
+def corridor(width=60, length=300, closed_end=False):
+	"""Return a Maze of a straight corridor along the x axis.
+
+	The corridor runs from x=0 (closed) to x=length, between walls at y=0
+	and y=width.
+	"""
+
+	walls = [(0, 0, length, 0), (0, width, length, width), (0, 0, 0, width)]
+	if closed_end:
+		walls.append((length, 0, length, width))
+	return Maze(walls)
+
+
+class World(object):
+	"""The state of a simulated robot in a maze."""
+
+	def __init__(self, maze=None, pose=(20, 30, 0), servo_center=90,
+				 clockwise_servo=False, sensor_noise=0.0, motion_noise=0.0,
+				 seed=None, time_limit=None, voltage=DEFAULT_VOLTAGE):
+		"""Create a World.
+
+		Args:
+		maze - the walls, as a maze.Maze.  Default is corridor().
+		pose - the initial (x, y, theta) of the robot, in cm and radians,
+			counter-clockwise from the x axis.
+		servo_center, clockwise_servo - the servo geometry, as given to
+			mount.SwivelMount.
+		sensor_noise - the std dev of each ultrasonic reading, in cm.
+		motion_noise - the std dev of each wheel's speed, as a fraction of the
+			commanded speed.  Each wheel gets a fixed bias for the whole run,
+			which makes the robot drift as a real one does.
+		seed - a seed for the random number generator.
+		time_limit - if given, SimulationTimeout is raised once simulated
+			time would pass this many seconds.
+		voltage - the battery voltage reported by volt().
+		"""
+
+		self.maze = maze if maze is not None else corridor()
+		self.pose = list(pose)
+		self.servo_center = servo_center
+		self.clockwise_servo = clockwise_servo
+		self.sensor_noise = sensor_noise
+		self.random = numpy.random.RandomState(seed)
+		self.wheel_bias = 1.0 + motion_noise * self.random.standard_normal(2)
+		self.time_limit = time_limit
+		self.voltage = voltage
+
+		self.time = 0.0
+		self.speed = [0, 0]			# Commanded [left, right] motor speed
+		self.direction = [0, 0]		# +1 forward, -1 backward, 0 stopped
+		self.encoders = [0.0, 0.0]
+		self.encoder_target = None	# (motor index, encoder count to stop at)
+		self.servo_angle = servo_center
+		self.servo_position = float(servo_center)
+		self.collided = False
+		self.trajectory = [(0.0, self.pose[0], self.pose[1], self.pose[2])]
+
+	def advance(self, seconds):
+		"""Let the given number of seconds of simulated time pass."""
+
+		end = self.time + seconds
+		if self.time_limit is not None and end > self.time_limit:
+			raise SimulationTimeout('simulated time exceeded {0} secs'
+									.format(self.time_limit))
+		while self.time < end:
+			dt = min(TIME_STEP, end - self.time)
+			self._integrate(dt)
+			self.time += dt
+
+	def _integrate(self, dt):
+		error = self.servo_angle - self.servo_position
+		travel = SERVO_DEGREES_PER_SEC * dt
+		self.servo_position += max(-travel, min(travel, error))
+
+		if not any(self.direction):
+			return
+
+		wheel_travel = [
+			self.direction[i] * self.speed[i] * self.wheel_bias[i] *
+			CM_PER_SEC_PER_SPEED * dt for i in range(2)
+		]
+		for i in range(2):
+			self.encoders[i] += abs(wheel_travel[i]) / DISTANCE_PER_TICK
+
+		x, y, theta = self.pose
+		theta += (wheel_travel[1] - wheel_travel[0]) / WHEEL_BASE
+		distance = (wheel_travel[0] + wheel_travel[1]) / 2.0
+		x += distance * math.cos(theta)
+		y += distance * math.sin(theta)
+
+		if self._distance_to_walls(x, y) < ROBOT_RADIUS:
+			self.collided = True
+			self.direction = [0, 0]
+			return
+		self.pose = [x, y, theta]
+		self.trajectory.append((self.time + dt, x, y, theta))
+
+		if self.encoder_target is not None:
+			motor, target = self.encoder_target
+			if self.encoders[motor] >= target:
+				self.direction = [0, 0]
+				self.encoder_target = None
+
+	def _distance_to_walls(self, x, y):
+		"""Return the distance from (x, y) to the nearest wall."""
+
+		start = self.maze.walls[:, :2]
+		vector = self.maze.walls[:, 2:] - start
+		offset = numpy.array([x, y]) - start
+		u = numpy.clip((offset * vector).sum(axis=1) /
+					   (vector * vector).sum(axis=1), 0, 1)
+		nearest = offset - u[:, None] * vector
+		return numpy.sqrt((nearest * nearest).sum(axis=1)).min()
+
+	@property
+	def mount_angle(self):
+		"""The direction of the sensor, in degrees clockwise from ahead."""
+
+		if self.clockwise_servo:
+			return (self.servo_position - self.servo_center) % 360
+		return (self.servo_center - self.servo_position) % 360
+
+	def ping(self):
+		"""Return an ultrasonic reading in the sensor's current direction."""
+
+		self.advance(PING_TIME)
+		x, y, theta = self.pose
+		distance = float(self.maze.ray_cast(
+			x, y, theta - math.radians(self.mount_angle)))
+		if self.sensor_noise:
+			distance += self.sensor_noise * self.random.standard_normal()
+		return int(max(0, min(distance, US_MAX)))
+
+	def set_encoder_target(self, left, right, ticks):
+		motor = 0 if left else 1
+		self.encoder_target = (motor, self.encoders[motor] + ticks)
+
+
+def reset(**kwargs):
+	"""Replace the simulated world with a new one.
+
+	Keyword arguments are passed to World.  Returns the new world.
+	"""
+
+	global world
+	world = World(**kwargs)
+	return world
+
+
+def build_robot(**kwargs):
+	"""Reset the world and return a Robot driven by it.
+
+	Keyword arguments are passed to World.  The robot is equipped as in
+	run.py, with an UltrasonicSensor on a SwivelMount, all on the
+	simulated clock.
+	"""
+
+	w = reset(**kwargs)
+	r = robot.Robot(driver_module=__name__)
+	m = mount.SwivelMount(driver=r.driver, servo_center=w.servo_center,
+						  clockwise_servo=w.clockwise_servo, clock=r.clock)
+	r.distance_sensor = sensor.UltrasonicSensor(driver=r.driver, mount=m,
+												clock=r.clock)
+
+	return r
+
+
+def _world():
+	if world is None:
+		reset()
+	return world
+
+
+class WorldClock(SimulatedClock):
+	"""The simulated clock of the current world."""
+
+	def time(self):
+		return _world().time
+
+	def sleep(self, seconds):
+		if seconds > 0:
+			_world().advance(seconds)
+
+
+clock = WorldClock()
+
+
+# The gopigo driver functions used by the robot:
+
+def servo(angle):
+	_world().servo_angle = angle
+
+def set_speed(speed):
+	_world().speed = [speed, speed]
+
+def set_left_speed(speed):
+	_world().speed[0] = speed
+
+def set_right_speed(speed):
+	_world().speed[1] = speed
+
+def stop():
+	w = _world()
+	w.direction = [0, 0]
+	w.encoder_target = None
+
+def fwd():
+	_world().direction = [1, 1]
+
+def enc_tgt(m1, m2, target):
+	_world().set_encoder_target(m1, m2, target)
+
+def right_rot():
+	_world().direction = [1, -1]
+
+def left_rot():
+	_world().direction = [-1, 1]
+
+def trim_write(trim):
+	pass
+
+def enc_read(motor):
+	return int(_world().encoders[motor])
+
+def us_dist(pin):
+	return _world().ping()
+
+def volt():
+	return _world().voltage
@@ -1,43 +1,187 @@
 """Implementations of the possible states for a robot."""
 
+import logging
+import math
 import sys
 import time
 
+from exploration import FrontierExplorer
+from heading import Distribution
+from mapping import OccupancyGrid, Odometry
 from matrix import matrix
+from planner import Planner
+import profiling
+from robot import HEADING_RESOLUTION, ROTATING_DEGREES_PER_TICK, SWEEP_SPEED
+from scan import find_perpendicular
+from tracking import CrossTrackFilter
+from trajectory import CRUISE_SPEED, Follower, Trajectory, route_path
+from walls import compensate_motion, fit_corridor, fit_wall
 
-import numpy
+logger = logging.getLogger(__name__)
+
+# Transitions, returned by run() to say what the robot found:
+CORRIDOR_ENDED = 'corridor-ended'	# A wall ahead
+OPENING_LEFT = 'opening-left'		# A corridor off to the left
+OPENING_RIGHT = 'opening-right'		# A corridor off to the right
+OPENING_AHEAD = 'opening-ahead'		# The corridor goes on past a junction
+DEAD_END = 'dead-end'				# No way on but back
+TURNED = 'turned'					# Facing down a new corridor
 
 
 class BaseState(object):
 
+	POLL_INTERVAL = 0.1  # seconds between checks that a move has finished
+	STOP_DISTANCE = 15  # cm short of a wall ahead to stop
+	CLEARANCE = 12  # cm either side of the path that must be clear
+	PATH_ANGLES = [a % 360 for a in range(330, 395, 5)]  # to sense the path
+
 	def __init__(self, robot):
 		self.robot = robot
-		self.is_oriented = False  # wut?  states aren't oriented.  robots are.
+
+	@property
+	def is_oriented(self):
+		"""Whether the robot knows the direction of the corridor."""
+
+		return self.robot.is_oriented
+
+	@is_oriented.setter
+	def is_oriented(self, is_oriented):
+		self.robot.is_oriented = is_oriented
 
 	def run(self, *args, **kwargs):
 		raise NotImplementedError()
 
+	def _wait_until_stopped(self):
+		"""Wait until the wheels stop turning."""
+
+		ticks = None
+		while ticks != self.robot.odometer:
+			ticks = self.robot.odometer
+			self.robot.clock.sleep(self.POLL_INTERVAL)
+
+	def _forward(self, distance):
+		"""Drive straight ahead, and turn the heading belief with any drift."""
+
+		self.robot.forward(distance)
+		self._wait_until_stopped()
+		# degrees_turned is positive for a right turn:
+		self.robot.heading.predict(-self.robot.degrees_turned)
+
+	def _forward_clear(self, distance, margin=None):
+		"""Drive up to distance ahead, stopping short of anything in the way.
+
+		The path is swept for readings within CLEARANCE of either side of it,
+		such as a corner the robot would clip, and the robot stops margin
+		short of the nearest, or STOP_DISTANCE if margin is None.
+		"""
+
+		if distance <= 0:
+			return
+		if margin is None:
+			margin = self.STOP_DISTANCE
+
+		sweep = self.robot.sweep(self.PATH_ANGLES)
+		with profiling.phase('compute'):
+			for angle, reading in zip(sweep['angle'], sweep['distance']):
+				angle = math.radians(angle)
+				if abs(reading * math.sin(angle)) < self.CLEARANCE:
+					distance = min(distance,
+								   reading * math.cos(angle) - margin)
+		if distance > 0:
+			self._forward(distance)
+
+	def _corridor_width(self, left_dist, right_dist):
+		"""Return the width of the corridors of the maze.
+
+		Until a corridor is fitted, the width is taken as twice the distance
+		to the nearer side wall, since the robot keeps to the middle, and is
+		kept on the robot.
+		"""
+
+		if self.robot.corridor_width is None:
+			self.robot.corridor_width = 2 * min(left_dist, right_dist)
+		return self.robot.corridor_width
+
+
+def _wall_direction(corridor_direction):
+	"""Return the direction perpendicular to a wall of a corridor.
+
+	The sensor looks at the wall on the far side of the corridor from the
+	robot's heading: the right wall of a corridor that leads off to the
+	left, and the left wall of one that leads off to the right.  Behind the
+	robot, it looks straight ahead.
+	"""
+
+	if 270 <= corridor_direction < 360:
+		return corridor_direction - 270
+	if 0 <= corridor_direction < 90:
+		return corridor_direction + 270
+	return 0
+
 
 class CorridorState(BaseState):
 	"""Actions for proceeding down a corridor.
 
 	This algorithm uses proportional-differential control to follow the
-	reference trajectory (centerline of the corridor).
+	reference trajectory (centerline of the corridor).  The cross-track error
+	and its rate are tracked with a Kalman filter, so a single bad reading
+	doesn't jerk the steering.
+
+	In continuous mode, the robot doesn't stop to orient itself when it
+	starts.  It senses the walls while rolling into the corridor, and
+	steers into it unless the corridor is far off.
 	"""
 
-	DEGREES_FROM_STRAIGHT = range(180, -180, -10)
-	RELATIVE_ANGLES = [d % 360 for d in range(180, 540, 10)]
-	WALL_DIRECTION = [0] * 9 + range(0, 90, 10) + range(270, 360, 10) + [0] * 8
+	# For each bin of the heading belief: the direction of the corridor in
+	# degrees left of straight ahead, the same direction as a mount angle,
+	# and the mount angle perpendicular to a wall:
+	DEGREES_FROM_STRAIGHT = range(180, -180, -HEADING_RESOLUTION)
+	RELATIVE_ANGLES = [d % 360 for d in range(180, 540, HEADING_RESOLUTION)]
+	WALL_DIRECTION = [_wall_direction(a) for a in RELATIVE_ANGLES]
 	MOVE_DURATION = 1  # seconds of movement before the next sensor measurement
 	TAU_P = 0.2
 	TAU_D = 1.0
+	HEADING_RESOLUTION = HEADING_RESOLUTION  # degrees per bin of the heading
+	SWEEP_STEP = 10  # degrees between measurements of the orienting sweep
+	AZIMUTH_SIGMA = 5  # degrees of error in the direction of the mount
+	WALL_ANGLES = range(270, 340, 10) + range(30, 100, 10)  # to fit the walls
+	MAX_FLIGHT_HEADING = 5  # degrees off the corridor to steer, not rotate
+	MAX_FIT_DISAGREEMENT = 30  # degrees a wall fit may be off the belief
+	WIDTH_TOLERANCE = 10  # cm a fit may be wider than the known width
+	MAX_WIDTH_CTE = 10  # cm off the middle of a fit to learn its width from
+	MIN_WIDTH = 40  # cm, of the narrowest corridors the robot turns in
+
+	def __init__(self, robot, continuous=False):
+		"""Create a CorridorState.
 
-	# Probability distribution for the direction of the corridor relative to
-	# the heading of the robot.  The distribution covers a 360-degree arc in
-	# 10-degree increments. Initialized as a uniform distribution (heading
-	# unknown).
-	# TODO: should p_heading be an attribute on the robot rather than on state?
-	p_heading = [1.0 / (360 / 10)] * (360 / 10)
+		Args:
+		robot - the Robot.
+		continuous - if True, orient and sense the corridor on the move.
+		"""
+
+		super(CorridorState, self).__init__(robot)
+		self.continuous = continuous
+		self.tracker = CrossTrackFilter()
+
+	@property
+	def heading(self):
+		"""The robot's belief of the direction of the corridor.
+
+		The belief covers a 360-degree arc in bins of HEADING_RESOLUTION
+		degrees relative to the heading of the robot, and is uniform until
+		the robot orients itself.  It is kept on the robot, so that it
+		carries over from the states before this one.
+		"""
+
+		return self.robot.heading
+
+	@property
+	def p_heading(self):
+		return self.heading.belief
+
+	@p_heading.setter
+	def p_heading(self, p_heading):
+		self.heading.belief = p_heading
 
 	def _sense_initial_position(self):
 		"""Learn about this corridor and our place in it.
@@ -46,93 +190,207 @@ class CorridorState(BaseState):
 			x is the displacement from the corridor center in cm.  Positive
 				displacement indicates a position left of center.
 			y is the total width of the corridor in cm.
+
+		Both walls are fitted to a sweep of each side, and their direction
+		corrects the heading belief.  If either wall can't be fitted, or the
+		fit disagrees with the belief, the single readings at 90 and 270
+		degrees are used.  The corridors of a maze are all as wide, so a fit
+		or readings much wider than the known width are taken to have a side
+		open, and the nearer wall is kept to.
 		"""
 
+		sweep = self.robot.sweep(self.WALL_ANGLES)
+		corridor = fit_corridor(sweep['angle'], sweep['distance'])
+		if corridor is not None:
+			logger.info('Corridor fit: %s', corridor[:3])
+			if self._correct_heading(corridor):
+				self._learn_width(corridor)
+				self._corridor_width(corridor.width / 2.0 - corridor.cte,
+									 corridor.width / 2.0 + corridor.cte)
+				if not self._is_open_sided(corridor.width):
+					return (corridor.cte, corridor.width)
+
 		right_dist = self.robot.dist(90)
 		left_dist = self.robot.dist(270)
 		width = right_dist + left_dist
+		known_width = self._corridor_width(left_dist, right_dist)
+		if self._is_open_sided(width):
+			# Keep to the nearer wall:
+			if right_dist < left_dist:
+				return (right_dist - known_width / 2.0, known_width)
+			return (known_width / 2.0 - left_dist, known_width)
 
 		return (width / 2.0 - left_dist, width)
 
-	def _find_perpendicular(self, measurements, recur=True):
+	def _sense_in_flight(self):
+		"""Learn about this corridor and our place in it, without stopping.
+
+		The robot rolls on at SWEEP_SPEED while both walls are swept.  Each
+		reading is moved to where it would be seen from the end of the sweep,
+		by the odometry of the wheel ticks counted up to it, and the walls
+		are fitted to them.  The direction of the walls orients the robot, so
+		it needs neither a full sweep nor a rotation.  If the corridor is
+		more than MAX_FLIGHT_HEADING off, the robot rotates towards it.  If
+		the walls can't be fitted, the robot stops and orients itself as
+		_orient does.
+
+		Returns a tuple (x, y), as _sense_initial_position.
+		"""
+
+		self.robot.encoder_deltas()  # Start the odometry here
+		self.robot.fwd(speed=SWEEP_SPEED)
+		sweep, ticks = self.robot.sweep_in_motion(self.WALL_ANGLES)
+		with profiling.phase('compute'):
+			odometry = Odometry()
+			poses = [odometry.update(*t) for t in ticks]
+			angles, distances = compensate_motion(sweep['angle'],
+												  sweep['distance'], poses)
+			corridor = fit_corridor(angles, distances)
+		if corridor is not None:
+			logger.info('Corridor fit on the move: %s', corridor[:3])
+			if self._correct_heading(corridor):
+				self._learn_width(corridor)
+				self._corridor_width(corridor.width / 2.0 - corridor.cte,
+									 corridor.width / 2.0 + corridor.cte)
+				if not self._is_open_sided(corridor.width):
+					return (corridor.cte, corridor.width)
+		else:
+			logger.info('No corridor fit on the move')
+		self.robot.stop()
+		self.is_oriented = self._orient()
+		return self._sense_initial_position()
+
+	def _correct_heading(self, corridor):
+		"""Update the heading belief with the direction of fitted walls.
+
+		If the most likely direction of the corridor is more than
+		MAX_FLIGHT_HEADING off, the robot rotates towards it, since steering
+		alone would reach a wall first.
+
+		Once oriented, a fit more than MAX_FIT_DISAGREEMENT off the belief is
+		taken to be of the wrong walls, such as those across a junction, and
+		is ignored.
+
+		Returns True if the fit was used, else False.
+		"""
+
+		with profiling.phase('compute'):
+			if self.is_oriented:
+				believed = -self.DEGREES_FROM_STRAIGHT[
+					self.heading.distribution.map()]
+				if abs(corridor.heading - believed) > self.MAX_FIT_DISAGREEMENT:
+					logger.info('Ignoring corridor fit %s off the belief',
+								corridor.heading - believed)
+					return False
+			# The corridor's heading is clockwise, as the heading bins are:
+			index_of_corridor = (corridor.heading / self.HEADING_RESOLUTION +
+								 180 / self.HEADING_RESOLUTION)
+			sigma = math.hypot(math.sqrt(corridor.covariance[2, 2]),
+							   self.AZIMUTH_SIGMA) / self.HEADING_RESOLUTION
+			likelihood = self.heading.gaussian_likelihood(index_of_corridor,
+														  sigma)
+			if not self.is_oriented:
+				self.heading.reset()
+			try:
+				self.heading.update(likelihood)
+			except ValueError:  # the belief had ruled out the walls' direction
+				self.heading.reset()
+				self.heading.update(likelihood)
+			self.is_oriented = True
+
+		# Rotate by the belief, so that the turn and the belief agree:
+		turn_angle = self.DEGREES_FROM_STRAIGHT[self.heading.distribution.map()]
+		if abs(turn_angle) > self.MAX_FLIGHT_HEADING:
+			turn_angle = ROTATING_DEGREES_PER_TICK * int(round(
+				turn_angle / float(ROTATING_DEGREES_PER_TICK)))
+			logger.info('Rotating %s', turn_angle)
+			self.robot.rotate(turn_angle)
+			self._wait_until_stopped()
+			self.robot.encoder_deltas()  # Ticks in either direction
+			self._rotate_p_heading(turn_angle)
+		return True
+
+	def _learn_width(self, corridor):
+		"""Keep the width of a fit on the robot, as the corridors' width.
+
+		The corridors of a maze are all as wide.  A fit with a side open is
+		of the wall a corridor further, so it is twice as wide, and the robot
+		is a quarter of it off its middle.  Fits within MAX_WIDTH_CTE of the
+		middle are learnt from.  Until the width is known, so are fits less
+		than a fifth of their width off it, or with the nearer wall too close
+		for the robot to be in the middle of a corridor of MIN_WIDTH.
+		"""
+
+		cte = abs(corridor.cte)
+		if cte < self.MAX_WIDTH_CTE:
+			self.robot.corridor_width = corridor.width
+		elif self.robot.corridor_width is None and (
+				cte < corridor.width / 5.0 or
+				corridor.width - 2 * cte < self.MIN_WIDTH):
+			self.robot.corridor_width = corridor.width
+
+	def _is_open_sided(self, width):
+		"""Whether a width is much wider than the known width."""
+
+		known_width = self.robot.corridor_width
+		return (known_width is not None and
+				width > known_width + self.WIDTH_TOLERANCE)
+
+	def _find_perpendicular(self, measurements):
 		"""Find the index of the perpendicular measurement.
 
 		Args:
 		measurements - a list of distance measurements across a continuous arc.
-		recur - if False, do not recur again, as this is already the second
-			attempt with this measurement set.
 
-		Returns the index of the perpendicular measurement.  This function uses
-		a hill-climb algorithm to find the center of the "dip" in measurement
-		values, which will indicate the measurement taken perpendicular to an
-		obstacle.
+		Returns the index of the perpendicular measurement: the center of the
+		"dip" in measurement values, which indicates the measurement taken
+		perpendicular to an obstacle.  See scan.find_perpendicular.
 		"""
 
-		for m in sorted(set(measurements)):
-			left_bound = None
-			right_bound = None
-			i = measurements.index(m)
-			if i == 0:
-				continue  # can't rely on extreme left or right measurements
-			try:
-				if measurements[i - 1] < m or measurements[i + 1] < m:
-					continue  # we're on a slope, not a min
-				for j in range(1, len(measurements)):
-					if (i - j == 0 ) or (measurements[i - j] > m):
-						left_bound = left_bound or i - j
-					if (i + j == len(measurements)) or (measurements[i + j] > m):
-						right_bound = right_bound or i + j
-					if (left_bound is not None) and (right_bound is not None):
-						return left_bound + (right_bound - left_bound) / 2
-			except IndexError:
-				continue
-
-		if recur:
-			measurements.reverse()
-			i = self._find_perpendicular(measurements, recur=False)
-			return len(measurements) - 1 - i
-		else:
-			# At this point, the mins are at both ends of measurements, which
-			# means perpendicular is the first (and last) measurement.
-			return 0
+		return find_perpendicular(measurements).index
 
 	def _orient(self):
 		"""Turn the robot so it is facing down the corridor."""
 		self.robot.stop()
-		self.p_heading = self._find_p_heading()
+		self._find_p_heading()
 		turn_angle = self._turn_down_corridor()
-		self.p_heading = self._rotate_p_heading(turn_angle)
+		self._rotate_p_heading(turn_angle)
 
 		return True
 
 	def _find_p_heading(self):
-		"""Use a full sweep of sensor measurements to populate p_heading."""
-		angles = [a % 360 for a in range(270, 460, 10)]
-		measurements = []
-		for angle in angles:
-			measurements.append(self.robot.dist(angle))
-
-		index_of_perpendicular = self._find_perpendicular(measurements)
-		index_of_corridor = (index_of_perpendicular + 9) % 18
-		index_of_corridor += 9  # 180 deg measurements vs 360 deg headings
-
-		# TODO: expose azimuth error through the mount, and generate the
-		# error histogram from that.
-		p_heading = [0] * 36
-		p_heading[index_of_corridor] = 0.8
-		try:
-			p_heading[index_of_corridor + 1] = 0.1
-			p_heading[index_of_corridor - 1] = 0.1
-		except IndexError:
-			pass
-
-		print p_heading
+		"""Use a full sweep of sensor measurements to populate p_heading.
+
+		The corridor is 90 degrees from the perpendicular to the nearest wall.
+		The likelihood of each heading is normal about that direction, with
+		the error of the perpendicular and of the mount, and limited to the
+		forward half of the circle that the sweep can see.
+		"""
+		angles = [a % 360 for a in range(270, 460, self.SWEEP_STEP)]
+		measurements = self.robot.sweep(angles)['distance']
+
+		perpendicular = find_perpendicular(measurements, step=self.SWEEP_STEP)
+		bins_per_step = self.SWEEP_STEP / float(self.HEADING_RESOLUTION)
+		quarter = 90 / self.SWEEP_STEP
+		index_of_corridor = ((perpendicular.index + quarter) % (2 * quarter) +
+							 perpendicular.offset) * bins_per_step
+		index_of_corridor += 90 / self.HEADING_RESOLUTION  # 180 deg sweep
+		sigma = math.hypot(perpendicular.sigma * bins_per_step,
+						   self.AZIMUTH_SIGMA / float(self.HEADING_RESOLUTION))
+
+		likelihood = self.heading.gaussian_likelihood(index_of_corridor, sigma)
+		likelihood *= [a <= 90 or a >= 270 for a in self.RELATIVE_ANGLES]
+
+		self.heading.reset()
+		p_heading = self.heading.update(likelihood)
+
+		logger.debug('Heading belief: %s', p_heading)
 		return p_heading
 
 	def _turn_down_corridor(self):
-		turn_angle = numpy.random.choice(self.DEGREES_FROM_STRAIGHT,
-										 p=self.p_heading)
-		print 'Rotating {0}'.format(turn_angle)
+		turn_angle = self.DEGREES_FROM_STRAIGHT[
+			self.heading.distribution.sample()]
+		logger.info('Rotating %s', turn_angle)
 		self.robot.rotate(turn_angle)
 
 		return turn_angle
@@ -141,49 +399,71 @@ class CorridorState(BaseState):
 		"""Adjust the expected direction of the corridor after a turn.
 
 		Args:
-		degrees - the magnitude of the adjustment.  Adjust to the left for
-			positive values, and to the right for negative values.
+		degrees - the magnitude of the adjustment.  Positive values are a left
+			turn of the robot, which moves the corridor to the right, and
+			negative values a right turn.  Turns that are not a multiple of
+			the bin width spread the probability between neighboring bins.
 
 		Returns the new p_heading.
 		"""
 
-		steps = degrees / 10
+		return self.heading.predict(degrees)
 
-		return [
-			self.p_heading[(i - steps) % 36] for i in range(len(self.p_heading))
-		]
+	def _sample_heading(self, p_heading=None):
+		"""Return a heading index sampled from p_heading.
 
-	def _get_wall_direction(self, p_heading):
+		If p_heading is None, the heading belief is sampled, with the alias
+		table it keeps until the belief changes.
+		"""
+
+		if p_heading is None:
+			return self.heading.distribution.sample()
+		return Distribution(p_heading).sample()
+
+	def _get_wall_direction(self, p_heading=None):
 		"""Find perpendicular to wall, relative to robot's heading.
 
-		Algorithm assumes that p_heading is in the forward hemisphere.
+		Algorithm assumes that p_heading (default the heading belief) is in
+		the forward hemisphere.
 		"""
 
-		heading_index = numpy.random.choice(range(len(p_heading)),
-										 	p=p_heading)
-
-		return self.WALL_DIRECTION[heading_index]
+		return self.WALL_DIRECTION[self._sample_heading(p_heading)]
 
-	def _get_corridor_direction(self, p_heading):
+	def _get_corridor_direction(self, p_heading=None):
 		"""Find direction corresponding to straight down the corridor."""
 
-		heading_index = numpy.random.choice(range(len(p_heading)),
-											p=p_heading)
-
-		return self.RELATIVE_ANGLES[heading_index]
+		return self.RELATIVE_ANGLES[self._sample_heading(p_heading)]
 
 	def run(self, *args, **kwargs):
-		print 'Running CorridorState'
+		"""Follow the corridor until it ends or opens to one side.
 
-		# Ensure the robot is stopped
-		self.robot.stop()
+		Returns CORRIDOR_ENDED, OPENING_LEFT or OPENING_RIGHT.
+		"""
 
-		if not self.is_oriented:
-			self.is_oriented = self._orient()
+		logger.info('Running CorridorState')
 
 		# Sense the cross-track error and width of the corridor:
-		last_cte, width = self._sense_initial_position()
-		print 'Corridor width: {0}'.format(width)
+		if self.continuous:
+			cte, width = self._sense_in_flight()
+		else:
+			# Ensure the robot is stopped
+			self.robot.stop()
+
+			if not self.is_oriented:
+				self.is_oriented = self._orient()
+
+			cte, width = self._sense_initial_position()
+		logger.info('Corridor width: %s', width)
+		self.tracker.reset(cte)
+		last_time = self.robot.clock.time()
+
+		mount = self.robot.distance_sensor.mount
+
+		# The corridor may end before the first reading on the move:
+		ahead = self.robot.dist(self._get_corridor_direction())
+		if ahead < width / 2.0 + self.STOP_DISTANCE:
+			logger.info('End of corridor: %s', CORRIDOR_ENDED)
+			return CORRIDOR_ENDED
 
 		# Start the robot
 		self.robot.fwd()
@@ -191,51 +471,490 @@ class CorridorState(BaseState):
 		while True:
 			# Adjust p_heading based on turn
 			turn_degrees = self.robot.degrees_turned
-			print 'Degrees turned: {0}'.format(turn_degrees)
-			self.p_heading = self._rotate_p_heading(turn_degrees)
-
-			# Sense current distance from side of corridor
-			wall_direction = self._get_wall_direction(self.p_heading)
-			print 'Wall direction: {0}'.format(wall_direction)
+			logger.debug('Degrees turned: %s', turn_degrees)
+			with profiling.phase('compute'):
+				# degrees_turned is positive for a right turn:
+				self._rotate_p_heading(-turn_degrees)
+				wall_direction = self._get_wall_direction()
+				logger.debug('Wall direction: %s', wall_direction)
+
+			# Sense current distance from side of corridor.  Directions up to
+			# 90 degrees are on the right:
 			dist = self.robot.dist(wall_direction)
+			wall_side, opposite_side = OPENING_RIGHT, OPENING_LEFT
+			if wall_direction > 90:
+				wall_side, opposite_side = OPENING_LEFT, OPENING_RIGHT
 
 			if dist > width:
-				self.robot.stop()
+				transition = wall_side
 				break
 
-			# Compute new CTE
-			if wall_direction <= 90:
-				new_cte = dist - width / 2.0
-			else:
-				new_cte = width / 2.0 - dist
+			with profiling.phase('compute'):
+				# Compute new CTE
+				if wall_direction <= 90:
+					new_cte = dist - width / 2.0
+				else:
+					new_cte = width / 2.0 - dist
+
+				logger.debug('Cross-track error: %s', new_cte)
 
-			print 'Cross-track error: {0}'.format(new_cte)
+				# Track the CTE over the time since the last reading:
+				now = self.robot.clock.time()
+				dt = now - last_time
+				last_time = now
+				cte, rate = self.tracker.step(new_cte, dt)
 
-			# Adjust steering
-			steering_factor = -self.TAU_P * new_cte - self.TAU_D * (new_cte - last_cte)
-			print 'Steering factor: {0}'.format(steering_factor)
+				# Adjust steering.  The differential term is the change in CTE
+				# since the last reading:
+				steering_factor = -self.TAU_P * cte - self.TAU_D * rate * dt
+				logger.debug('Steering factor: %s', steering_factor)
 			self.robot.steer(steering_factor)
-			last_cte = new_cte
 
-			# Check end of corridor
-			corridor_direction = self._get_corridor_direction(self.p_heading)
-			dist = self.robot.dist(corridor_direction)
-			if dist < width / 2:
-				self.robot.stop()
+			# Check the end of the corridor, and if the corridor turns, in
+			# one pass of the mount.  If the opposite wall is out of reach,
+			# sense as close to it as possible:
+			with profiling.phase('compute'):
+				# Ahead by the most likely heading, as a sampled one well off
+				# it reads the side wall inside the stop distance:
+				corridor_direction = self.RELATIVE_ANGLES[
+					self.heading.distribution.map()]
+				opposite_wall = mount.clamp(wall_direction + 180)
+				# Stop short of a wall ahead, allowing for the distance
+				# driven before the next reading, in a pass of the loop
+				# that may take up to twice as long as the last:
+				stop_distance = max(width / 2.0,
+									self.STOP_DISTANCE + 2 * CRUISE_SPEED * dt)
+			sweep = self.robot.sweep([corridor_direction, opposite_wall])
+			if sweep['distance'][0] < stop_distance:
+				transition = CORRIDOR_ENDED
+				break
+			if sweep['distance'][1] > width:
+				transition = opposite_side
 				break
 
-			# Check if corridor turns
-			opposite_wall = (wall_direction + 180) % 360
-			try:
-				dist = self.robot.dist(opposite_wall)
-			except ValueError:
-				m = self.robot.distance_sensor.mount
-				if opposite_wall < 180:
-					dist = self.robot.dist(m.max_right)
-				else:
-					dist = self.robot.dist(m.max_left)
-			if dist > width:
-				self.robot.stop()
+		self.robot.stop()
+		logger.info('End of corridor: %s', transition)
+		logger.info('Mount slew: %.1f secs planned, %.1f secs in request order',
+					mount.planned_slew_time, mount.naive_slew_time)
+		return transition
+
+
+class JunctionState(BaseState):
+	"""Actions for choosing the way on where a corridor ends or branches.
+
+	The robot senses ahead and to either side, relative to the most likely
+	direction of the corridor it came along, and takes the first open way in
+	PREFERENCE.  Keeping to the left-hand wall like this reaches every part
+	of a maze whose walls are all connected.  Before sensing, the robot
+	refits the heading belief to the walls of the junction, and drives to
+	its middle.
+	"""
+
+	OPEN_DISTANCE = 60  # cm beyond which a way is open
+	ADVANCE = 20  # cm to drive into a side opening, if the width is unknown
+	EDGE_ANGLES = range(0, 70, 10)  # degrees forward of a side to find edges
+	SWEEP_ANGLES = [a % 360 for a in range(270, 460, 10)]
+	WALL_POINTS = 5  # readings on a line that make a wall to refit to
+	PREFERENCE = (OPENING_LEFT, OPENING_AHEAD, OPENING_RIGHT)
+	DIRECTIONS = {OPENING_LEFT: 270, OPENING_AHEAD: 0, OPENING_RIGHT: 90}
+
+	def run(self, transition=None, *args, **kwargs):
+		"""Find the way on.
+
+		Args:
+		transition - the transition into this state.  After OPENING_LEFT or
+			OPENING_RIGHT, the robot first drives on into the opening, which
+			CorridorState finds some way past its near edge, to half the
+			width of the corridors short of its far edge.
+
+		Returns OPENING_LEFT, OPENING_AHEAD, OPENING_RIGHT or DEAD_END.
+		"""
+
+		logger.info('Running JunctionState')
+		self.robot.stop()
+		self._refit_heading()
+		if transition in (OPENING_LEFT, OPENING_RIGHT):
+			middle = self._opening_middle(transition)
+			if middle is None and self.robot.corridor_width is None:
+				middle = self.ADVANCE
+			if middle is not None:
+				self._forward_clear(middle)
+		self._centre()
+		open_ways = self._sense_open_ways()
+		logger.info('Open ways: %s', sorted(open_ways))
+		for way in self.PREFERENCE:
+			if way in open_ways:
+				return way
+		return DEAD_END
+
+	def _opening_middle(self, way):
+		"""Return the distance on to the middle of a side opening.
+
+		The side is swept forward from square to it.  The far edge of the
+		opening lies between the last reading that crosses the line of the
+		side wall and the first that ends on it, within a quarter of the
+		width.
+
+		Returns the distance in cm, or None if the far edge isn't found.
+		"""
+
+		width = self.robot.corridor_width
+		if width is None:
+			return None
+		corridor_direction = CorridorState.RELATIVE_ANGLES[
+			self.robot.heading.distribution.map()]
+		side = self.DIRECTIONS[way]
+		forward = 1 if side == 270 else -1	# the way round that faces ahead
+		mount = self.robot.distance_sensor.mount
+		angles = [mount.clamp(corridor_direction + side + forward * a)
+				  for a in self.EDGE_ANGLES]
+		sweep = self.robot.sweep(angles)
+		with profiling.phase('compute'):
+			crossing = None
+			for angle, reading in zip(angles, sweep['distance']):
+				angle = math.radians(angle - corridor_direction)
+				along = reading * math.cos(angle)
+				across = abs(reading * math.sin(angle))
+				if across > 0.75 * width:
+					# Where the reading crossed the line of the side wall:
+					crossing = along * width / (2.0 * across)
+				elif crossing is not None:
+					return (crossing + along) / 2.0 - width / 2.0
+		return None
+
+	def _centre(self):
+		"""Drive on to the middle of a junction with a wall ahead.
+
+		If the width of the corridors is not known yet, it is estimated from
+		the side walls.
+		"""
+
+		corridor_direction = CorridorState.RELATIVE_ANGLES[
+			self.robot.heading.distribution.map()]
+		width = self.robot.corridor_width
+		if width is None:
+			mount = self.robot.distance_sensor.mount
+			sweep = self.robot.sweep([mount.clamp(corridor_direction + side)
+									  for side in (270, 90)])
+			width = self._corridor_width(*sweep['distance'])
+		ahead = self.robot.dist(corridor_direction)
+		if ahead < width:
+			self._forward_clear(ahead - width / 2.0)
+
+	def _refit_heading(self):
+		"""Refit the heading belief to a wall of the junction.
+
+		The walls of a maze are square to the corridor, so a wall gives the
+		direction of the corridor to within a multiple of 90 degrees, which
+		the belief resolves.  If no wall is found, the belief is kept.
+		"""
+
+		sweep = self.robot.sweep(self.SWEEP_ANGLES)
+		with profiling.phase('compute'):
+			wall = fit_wall(self.SWEEP_ANGLES, sweep['distance'],
+							min_points=self.WALL_POINTS)
+			if wall is None:
+				return
+			heading = self.robot.heading
+			believed = (CorridorState.RELATIVE_ANGLES[
+				heading.distribution.map()] + 180) % 360 - 180
+			corridor = wall + 90 * round((believed - wall) / 90.0)
+			logger.debug('Refitted corridor direction %s from %s',
+						 corridor, believed)
+			heading.reset()
+			heading.update(heading.gaussian_likelihood(
+				(corridor + 180) / float(HEADING_RESOLUTION),
+				CorridorState.AZIMUTH_SIGMA / float(HEADING_RESOLUTION)))
+		self.robot.encoder_deltas()  # Turns before the refit are in it
+
+	def _sense_open_ways(self):
+		"""Return the set of the ways on that are open, in one sweep."""
+
+		with profiling.phase('compute'):
+			corridor_direction = CorridorState.RELATIVE_ANGLES[
+				self.robot.heading.distribution.map()]
+			mount = self.robot.distance_sensor.mount
+			angles = [mount.clamp(corridor_direction + self.DIRECTIONS[way])
+					  for way in self.PREFERENCE]
+		sweep = self.robot.sweep(angles)
+		return set(way for way, distance in zip(self.PREFERENCE,
+												sweep['distance'])
+				   if distance > self.OPEN_DISTANCE)
+
+
+class TurnState(BaseState):
+	"""Actions for leaving a junction by the way chosen.
+
+	The robot rotates in place by a right angle, or not at all to go on
+	ahead, corrected by the most likely direction of the corridor it came
+	along.  The direction of travel turns with the robot, so the heading
+	belief only shifts by what the rotation misses, and is blurred by its
+	error.  Then the robot drives clear of the junction, by the width of the
+	corridor, so that CorridorState finds the walls of the new corridor.
+	"""
+
+	TURNS = {OPENING_LEFT: 90, OPENING_AHEAD: 0, OPENING_RIGHT: -90}
+	TURN_NOISE = [0.25, 0.5, 0.25]  # kernel to blur the heading belief by
+	EXIT = 40  # cm to drive into the new corridor, if the width is unknown
+
+	def run(self, transition=None, *args, **kwargs):
+		"""Turn into the way given by transition, and return TURNED."""
+
+		logger.info('Running TurnState')
+		self._turn(self.TURNS[transition])
+		width = self.robot.corridor_width
+		if width is None:
+			self._forward_clear(self.EXIT)
+		else:
+			# To the middle of the next junction, if it's a dead end:
+			self._forward_clear(width, max(width / 2.0, self.STOP_DISTANCE))
+		return TURNED
+
+	def _turn(self, degrees):
+		"""Rotate to face down a corridor, degrees left of the current one."""
+
+		self.robot.stop()
+		heading = self.robot.heading
+		rotation = degrees + CorridorState.DEGREES_FROM_STRAIGHT[
+			heading.distribution.map()]
+		rotation = (rotation + 180) % 360 - 180	# the shorter way round
+		logger.info('Rotating %s', rotation)
+		self.robot.rotate(rotation)
+		self._wait_until_stopped()
+		self.robot.encoder_deltas()  # Ticks in either direction
+
+		# Robot.rotate() turns by whole encoder ticks:
+		rotated = int(rotation / ROTATING_DEGREES_PER_TICK) * \
+			ROTATING_DEGREES_PER_TICK
+		heading.predict(rotated - degrees, self.TURN_NOISE)
+
+
+class DeadEndState(TurnState):
+	"""Actions for turning back from a dead end."""
+
+	def run(self, *args, **kwargs):
+		"""Turn around, and return TURNED."""
+
+		logger.info('Running DeadEndState')
+		self._turn(180)
+		return TURNED
+
+
+class OdometryState(BaseState):
+	"""A state that keeps track of the robot's pose by odometry."""
+
+	MAX_SQUARING = 20  # degrees of heading drift corrected against a wall
+	WALL_POINTS = 5  # readings on a line that make a wall to square up to
+	SQUARING_GAIN = 0.5  # of the drift corrected by each squaring
+
+	def __init__(self, robot, pose=(0.0, 0.0, 0.0)):
+		super(OdometryState, self).__init__(robot)
+		self.odometry = Odometry(pose)
+
+	def _rotate(self, degrees):
+		"""Rotate in place, and turn the odometry's pose to match."""
+
+		logger.debug('Rotating %s', degrees)
+		self.robot.rotate(degrees)
+		self._wait_until_stopped()
+		self.robot.encoder_deltas()  # Ticks in either direction
+		self.odometry.rotate(degrees)
+
+	def _square_up(self, sweep):
+		"""Correct the drift of the odometry's heading against a wall.
+
+		Each rotation is off by a fraction of an encoder tick, and the error
+		adds up.  In a rectilinear maze, a wall fitted to the sweep lies
+		along an axis, so the heading is corrected by the wall's angle from
+		the nearest axis, if that is small enough to be drift.  The fit is
+		itself off by a few degrees, so only part of the angle is taken.
+		"""
+
+		direction = fit_wall(sweep['angle'], sweep['distance'],
+							 min_points=self.WALL_POINTS)
+		if direction is None:
+			return
+		x, y, theta = self.odometry.pose
+		wall = math.degrees(theta) - direction
+		error = (wall + 45) % 90 - 45
+		if abs(error) <= self.MAX_SQUARING:
+			error *= self.SQUARING_GAIN
+			logger.debug('Squaring heading by %s', -error)
+			self.odometry.pose = (x, y, theta - math.radians(error))
+
+
+class ExplorationState(OdometryState):
+	"""Actions for exploring a maze that is not known in advance.
+
+	The robot builds an occupancy grid of the maze, from sensor sweeps and
+	its wheel encoders.  After each sweep it takes a short step along the
+	shortest path to the nearest frontier, where the mapped area meets the
+	unknown, until no frontier can be reached.
+	"""
+
+	SWEEP_ANGLES = [a % 360 for a in range(270, 460, 10)]
+	RESOLUTION = 2.0  # cm per cell of the occupancy grid
+	STEP = 20  # cm to move between sweeps
+	MIN_TURN = 10  # degrees off the waypoint to rotate towards it
+	MAX_TICKS = 1000  # sweeps before giving up
+
+	def __init__(self, robot, pose=(0.0, 0.0, 0.0), resolution=RESOLUTION,
+				 rectilinear=True):
+		"""Create an ExplorationState.
+
+		Args:
+		robot - the Robot.
+		pose - the starting pose (x, y, theta) of the robot in the map.
+		resolution - the width of a cell of the occupancy grid, in cm.
+		rectilinear - if True, the walls of the maze run along the x and y
+			axes of the map, as in a maze.MazeGrid, and the heading of the
+			odometry is squared up to them.
+		"""
+
+		super(ExplorationState, self).__init__(robot, pose)
+		self.rectilinear = rectilinear
+		self.grid = OccupancyGrid(resolution=resolution)
+		self.explorer = FrontierExplorer(self.grid)
+
+	def _move_to(self, waypoint):
+		"""Rotate towards a waypoint, then drive up to STEP towards it."""
+
+		x, y, theta = self.odometry.pose
+		dx, dy = waypoint[0] - x, waypoint[1] - y
+		bearing = (math.degrees(math.atan2(dy, dx) - theta) + 180) % 360 - 180
+		if abs(bearing) >= self.MIN_TURN:
+			self._rotate(bearing)
+
+		self.robot.forward(min(math.hypot(dx, dy), self.STEP))
+		self._wait_until_stopped()
+		left, right = self.robot.encoder_deltas()
+		if abs(left - right) <= 1:
+			# A tick apart is the encoders' resolution, not a turn:
+			left = right = (left + right) / 2.0
+		self.odometry.update(left, right)
+
+	def run(self, *args, **kwargs):
+		"""Explore until no frontier can be reached.
+
+		Returns the OccupancyGrid of the explored maze.
+		"""
+
+		logger.info('Running ExplorationState')
+		self.robot.stop()
+		self.robot.encoder_deltas()  # Start odometry from here
+
+		looked_back = False
+		for tick in range(self.MAX_TICKS):
+			sweep = self.robot.sweep(self.SWEEP_ANGLES)
+			with profiling.phase('compute'):
+				if self.rectilinear:
+					self._square_up(sweep)
+				pose = self.odometry.pose
+				cells = self.grid.integrate(pose, sweep['angle'],
+											sweep['distance'])
+				self.explorer.update(*cells)
+				waypoint = self.explorer.next_waypoint(pose[0], pose[1])
+
+			if waypoint is not None:
+				logger.debug('Pose %s, waypoint %s', pose, waypoint)
+				self._move_to(waypoint)
+				looked_back = False
+			elif not looked_back:
+				# The sweep only sees ahead, so look behind before giving up:
+				self._rotate(180)
+				looked_back = True
+			elif self.explorer.goals:
+				# Frontiers with room to reach them, but no path there:
+				logger.warning('%s cells by frontiers remain, but none can be '
+							   'reached, after %s sweeps',
+							   len(self.explorer.goals), tick + 1)
 				break
+			else:
+				# Frontier cells left are behind walls, out of the footprint:
+				logger.info('Explored %s cells in %s sweeps, %s frontier '
+							'cells out of reach', len(self.explorer.known),
+							tick + 1, len(self.explorer.frontier))
+				break
+		else:
+			logger.warning('Frontiers remain after %s sweeps', self.MAX_TICKS)
 
-		print 'End of corridor'
+		self.robot.stop()
+		return self.grid
+
+
+class RouteState(OdometryState):
+	"""Actions for driving to a goal in a known maze, without stopping.
+
+	The shortest route to the goal is smoothed into a trajectory, which the
+	robot follows by steering from its odometry.  It turns each corner on
+	the move, rather than stopping to rotate at the center of the cell.
+	"""
+
+	CONTROL_INTERVAL = 0.1  # seconds between steering adjustments
+	MIN_TURN = 30  # degrees off the trajectory to rotate towards it first
+	TIMEOUT = 3  # multiple of the trajectory's duration before giving up
+
+	def __init__(self, robot, grid, goal, pose):
+		"""Create a RouteState.
+
+		Args:
+		robot - the Robot.
+		grid - the maze.MazeGrid to drive through.
+		goal - the (row, col) cell to drive to.
+		pose - the starting pose (x, y, theta) of the robot in the maze.
+		"""
+
+		super(RouteState, self).__init__(robot, pose)
+		self.grid = grid
+		self.goal = goal
+		self.planner = Planner(grid)
+
+	def run(self, *args, **kwargs):
+		"""Drive to the goal.
+
+		Returns the pose at the end of the trajectory, or None if the goal
+		can't be reached.
+		"""
+
+		logger.info('Running RouteState')
+		self.robot.stop()
+		x, y, theta = self.odometry.pose
+		route = self.planner.route(self.grid.cell_at(x, y), self.goal)
+		if route is None:
+			logger.warning('No route to %s', self.goal)
+			return None
+		if len(route) == 1:
+			logger.info('Already at %s', self.goal)
+			return self.odometry.pose
+
+		with profiling.phase('compute'):
+			follower = Follower(Trajectory(route_path(self.grid, route)))
+			trajectory = follower.trajectory
+		logger.info('Route of %s cells, %.0f cm, %.1f secs', len(route),
+					trajectory.length, trajectory.duration)
+		bearing = (math.degrees(trajectory.heading[0] - theta) + 180) % 360 - 180
+		if abs(bearing) >= self.MIN_TURN:
+			self._rotate(bearing)
+		self._follow(follower)
+		return self.odometry.pose
+
+	def _follow(self, follower):
+		"""Steer along a Follower's trajectory to its end, then stop."""
+
+		trajectory = follower.trajectory
+		clock = self.robot.clock
+		deadline = clock.time() + self.TIMEOUT * trajectory.duration
+		self.robot.encoder_deltas()  # Start odometry from here
+		self.robot.fwd()
+		while not follower.done:
+			if clock.time() > deadline:
+				logger.warning('Gave up following the route at %.0f of %.0f cm',
+							   follower.s, trajectory.length)
+				break
+			clock.sleep(self.CONTROL_INTERVAL)
+			pose = self.odometry.update(*self.robot.encoder_deltas())
+			with profiling.phase('compute'):
+				steering_factor = follower.steer(pose)
+			self.robot.steer(steering_factor,
+							 max_turn_ratio=follower.max_turn_ratio)
+		self.robot.stop()
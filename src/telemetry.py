@@ -0,0 +1,197 @@
+"""A recorder of every call to the robot's driver module.
+
+A Recorder stands in for the driver module.  Each call to a driver
+function is passed through, and recorded with its arguments, its result
+and a timestamp in a preallocated ring buffer.  A background thread
+flushes the buffer to a binary log, so the control loop never waits on
+the disk.  Read a log back with read():
+
+	names, records = telemetry.read('run.tlm')
+	pings = records[records['function'] == names.index('us_dist')]
+
+A Recorder can also be given a dict of facts about the run, such as its
+random seed, which are stored in the log's header and read back with
+read_info().
+"""
+
+import inspect
+import json
+import struct
+import threading
+
+import numpy
+
+from clock import RealClock
+
+MAGIC = 'RTLM'
+VERSION = 2
+# Magic, version, max args, and the lengths of the names and info:
+HEADER = struct.Struct('<4sHHII')
+MAX_ARGS = 3					# Most arguments recorded for a call
+DEFAULT_CAPACITY = 4096			# Records held in the ring buffer
+FLUSH_INTERVAL = 0.5			# Secs between flushes to the log
+
+RECORD_DTYPE = numpy.dtype([
+	('time', '<f8'),				# clock time the call returned, in secs
+	('function', '<u2'),			# index of the function name
+	('nargs', '<u2'),				# number of arguments passed
+	('args', '<f8', (MAX_ARGS,)),	# the arguments, as numbers
+	('result', '<f8'),				# the result, or nan if not a number
+])
+
+
+_NO_ARGS = [float('nan')] * MAX_ARGS
+
+
+def _number(value):
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		return float('nan')
+
+
+class Recorder(object):
+	"""A proxy for a driver module that records every call to it."""
+
+	def __init__(self, driver, path, capacity=DEFAULT_CAPACITY, clock=None,
+				 info=None):
+		"""Create a Recorder and start flushing to its log.
+
+		Args:
+		driver - the driver module, such as gopigo.
+		path - the file to write the log to.
+		capacity - the number of records held between flushes.  If the
+			buffer fills, further records are dropped and counted.
+		clock - the clock to timestamp records with (default RealClock()).
+		info - a dict of facts about the run to store in the header, such
+			as its random seed.  It must be serializable as JSON.
+		"""
+
+		self.driver = driver
+		self.path = path
+		self.clock = clock or RealClock()
+		self.names = sorted(
+			name for name, value in vars(driver).items()
+			if not name.startswith('_') and
+			(inspect.isfunction(value) or inspect.isbuiltin(value)))
+		self.dropped = 0
+
+		self._ids = dict((name, i) for i, name in enumerate(self.names))
+		self._buffer = numpy.zeros(capacity, dtype=RECORD_DTYPE)
+		self._written = 0		# total records written to the buffer
+		self._flushed = 0		# total records flushed to the log
+		self._lock = threading.Lock()
+		self._flush_lock = threading.Lock()
+		self._stop_event = threading.Event()
+
+		names = '\n'.join(self.names)
+		info = json.dumps(info or {}, sort_keys=True)
+		header = HEADER.pack(MAGIC, VERSION, MAX_ARGS, len(names),
+							 len(info)) + names + info
+		self._file = open(path, 'wb')
+		self._file.write(header.ljust(_data_offset(len(header)), '\0'))
+		self._thread = threading.Thread(target=self._run, name='telemetry')
+		self._thread.daemon = True
+		self._thread.start()
+
+	def __getattr__(self, name):
+		value = getattr(self.driver, name)
+		if name not in self._ids:
+			return value
+
+		function_id = self._ids[name]
+		def record(*args):
+			result = value(*args)
+			self._record(function_id, args, result)
+			return result
+		record.__name__ = name
+		setattr(self, name, record)		# later lookups skip __getattr__
+
+		return record
+
+	def _record(self, function_id, args, result):
+		now = self.clock.time()
+		values = [_number(arg) for arg in args[:MAX_ARGS]]
+		values += _NO_ARGS[len(values):]
+		with self._lock:
+			if self._written - self._flushed >= len(self._buffer):
+				self.dropped += 1
+				return
+			self._buffer[self._written % len(self._buffer)] = (
+				now, function_id, len(args), values, _number(result))
+			self._written += 1
+
+	def _run(self):
+		while not self._stop_event.wait(FLUSH_INTERVAL):
+			self.flush()
+
+	def flush(self):
+		"""Write the buffered records to the log."""
+
+		with self._flush_lock:
+			with self._lock:
+				start, end = self._flushed, self._written
+				pending = self._buffer[numpy.arange(start, end) %
+									   len(self._buffer)]
+			if len(pending):
+				self._file.write(pending.tobytes())
+				self._file.flush()
+			with self._lock:
+				self._flushed = end
+
+	def close(self):
+		"""Stop the background thread, and flush and close the log."""
+
+		self._stop_event.set()
+		self._thread.join()
+		self.flush()
+		self._file.close()
+
+
+def _data_offset(header_length):
+	"""Return the offset of the records, aligned to 8 bytes."""
+
+	return (header_length + 7) // 8 * 8
+
+
+def _read_header(f, path):
+	"""Return the names, info and header length of an open log."""
+
+	try:
+		magic, version, max_args, names_length, info_length = HEADER.unpack(
+			f.read(HEADER.size))
+	except struct.error:
+		raise ValueError('{0} is not a telemetry log'.format(path))
+	if magic != MAGIC or version != VERSION or max_args != MAX_ARGS:
+		raise ValueError('{0} is not a telemetry log'.format(path))
+	names = f.read(names_length).split('\n') if names_length else []
+	info = json.loads(f.read(info_length)) if info_length else {}
+	return names, info, HEADER.size + names_length + info_length
+
+
+def read_info(path):
+	"""Return the dict of facts about the run stored in a telemetry log."""
+
+	with open(path, 'rb') as f:
+		return _read_header(f, path)[1]
+
+
+def read(path):
+	"""Read a telemetry log.
+
+	Returns a tuple (names, records), where names is the list of function
+	names, and records is a read-only numpy.memmap of RECORD_DTYPE.  A
+	partly written record at the end of the log is ignored.
+	"""
+
+	with open(path, 'rb') as f:
+		names, info, header_length = _read_header(f, path)
+		f.seek(0, 2)
+		size = f.tell()
+
+	offset = _data_offset(header_length)
+	count = (size - offset) // RECORD_DTYPE.itemsize
+	if not count:
+		return names, numpy.zeros(0, dtype=RECORD_DTYPE)
+	return names, numpy.memmap(path, dtype=RECORD_DTYPE, mode='r',
+							   offset=offset, shape=(count,))
@@ -0,0 +1,81 @@
+"""Unit tests for the acquisition module."""
+
+import time
+import unittest
+
+import acquisition
+
+
+class FakeSensor(object):
+	"""A sensor that returns the angle plus the number of readings taken."""
+
+	def __init__(self, fail_after=None):
+		self.count = 0
+		self.fail_after = fail_after
+
+	def iter_sweep(self, angles):
+		for angle in angles:
+			if self.count == self.fail_after:
+				raise ValueError('sensor failure')
+			self.count += 1
+			time.sleep(0.001)
+			yield angle, angle + self.count, time.time()
+
+
+def wait_for(condition, timeout=2.0):
+	deadline = time.time() + timeout
+	while not condition() and time.time() < deadline:
+		time.sleep(0.001)
+
+
+class AcquisitionServiceTest(unittest.TestCase):
+	"""Unit tests for the AcquisitionService class."""
+
+	def setUp(self):
+		self.sensor = FakeSensor()
+		self.service = acquisition.AcquisitionService(self.sensor,
+													  [270, 0, 90],
+													  buffer_size=4)
+
+	def tearDown(self):
+		self.service.stop()
+
+	def test_latest(self):
+		self.assertEqual(self.service.latest(0), None)
+		with self.assertRaises(ValueError):
+			self.service.latest(45)
+
+		self.service.start()
+		wait_for(lambda: self.service.count >= 6)
+		self.service.stop()
+		self.assertFalse(self.service.running)
+
+		distance, timestamp = self.service.latest(90)
+		self.assertTrue(distance > 90)
+		self.assertTrue(timestamp <= time.time())
+		self.assertEqual(self.service.latest(90, max_age=-1), None)
+
+	def test_history(self):
+		self.service._record((0, 1, 1.0))
+		self.service._record((90, 2, 2.0))
+		self.assertEqual(self.service.history()['distance'].tolist(), [1, 2])
+
+		for i in range(3, 7):
+			self.service._record((0, i, float(i)))
+		self.assertEqual(self.service.history()['distance'].tolist(),
+						 [3, 4, 5, 6])
+		self.assertEqual(self.service.latest(0)[0], 6)
+
+	def test_latest_at_time_zero(self):
+		"""Verify a reading taken at clock time 0 is not treated as missing."""
+
+		self.service._record((90, 42, 0.0))
+		self.assertEqual(self.service.latest(90), (42, 0.0))
+		self.assertEqual(self.service.latest(0), None)
+
+	def test_sensor_failure(self):
+		self.service.sensor = FakeSensor(fail_after=2)
+		self.service.start()
+		wait_for(lambda: not self.service.running)
+		with self.assertRaises(ValueError):
+			self.service.latest(0)
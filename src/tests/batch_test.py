@@ -0,0 +1,58 @@
+"""Unit tests for the batch module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import batch
+
+
+class BatchTest(unittest.TestCase):
+	"""Unit tests for the batch experiment runner."""
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def test_grid(self):
+		configs = batch.grid(tau_p=[0.1, 0.2], width=[50, 60, 80])
+		self.assertEqual(len(configs), 6)
+		self.assertEqual(configs[1].tau_p, 0.1)
+		self.assertEqual(configs[1].width, 60)
+		self.assertEqual(configs[1].tau_d, batch.DEFAULTS.tau_d)
+
+	def test_run_one(self):
+		"""Verify a run is deterministic and its metrics are sensible."""
+
+		config = batch.DEFAULTS._replace(offset=10)
+		result = batch.run_one((3, config, 1))
+		self.assertEqual(result, batch.run_one((3, config, 1)))
+
+		result = numpy.array([result], dtype=batch.RESULT_DTYPE)[0]
+		self.assertEqual(result['config'], 3)
+		self.assertEqual(result['offset'], 10)
+		self.assertFalse(result['collided'])
+		self.assertFalse(result['timed_out'])
+		self.assertTrue(0 < result['cte_rms'] < 30)
+		self.assertTrue(result['exit_time'] > 0)
+		self.assertTrue(result['steps'] > 0)
+
+	def test_run_batch(self):
+		configs = batch.grid(width=[50, 80])
+		results = batch.run_batch(configs, runs=2, processes=2, seed=5)
+		self.assertEqual(results['config'].tolist(), [0, 0, 1, 1])
+		self.assertEqual(results['seed'].tolist(), [5, 6, 7, 8])
+		self.assertEqual(results['width'].tolist(), [50, 50, 80, 80])
+
+		path = os.path.join(self.dir, 'results.npz')
+		batch.save(path, results)
+		loaded = numpy.load(path)
+		self.assertEqual(sorted(loaded.files), sorted(results.dtype.names))
+		self.assertEqual(loaded['cte_rms'].tolist(),
+						 results['cte_rms'].tolist())
+		self.assertEqual(len(batch.summarize(results)), 2)
@@ -0,0 +1,39 @@
+"""Unit tests for the cache module."""
+
+import unittest
+
+from cache import MeasurementCache
+
+
+class MeasurementCacheTest(unittest.TestCase):
+	"""Unit tests for the MeasurementCache class."""
+
+	def setUp(self):
+		self.c = MeasurementCache(ttl=1.0, max_ticks=2, resolution=10)
+		self.c.put(270, 40, ticks=100, now=10.0)
+
+	def test_hit(self):
+		self.assertEqual(self.c.get(270, ticks=100, now=10.5), 40)
+		self.assertEqual(self.c.get(274, ticks=102, now=10.5), 40)
+		self.assertEqual(self.c.stats,
+						 {'hits': 2, 'misses': 0, 'evictions': 0})
+
+	def test_quantized_wrap(self):
+		self.c.put(357, 25, ticks=100, now=10.0)
+		self.assertEqual(self.c.get(2, ticks=100, now=10.0), 25)
+
+	def test_miss(self):
+		self.assertEqual(self.c.get(90, ticks=100, now=10.0), None)
+		self.assertEqual(self.c.stats,
+						 {'hits': 0, 'misses': 1, 'evictions': 0})
+
+	def test_evict_by_age(self):
+		self.assertEqual(self.c.get(270, ticks=100, now=11.5), None)
+		self.assertEqual(self.c.get(270, ticks=100, now=10.0), None)
+		self.assertEqual(self.c.stats,
+						 {'hits': 0, 'misses': 2, 'evictions': 1})
+
+	def test_evict_by_movement(self):
+		self.assertEqual(self.c.get(270, ticks=103, now=10.0), None)
+		self.assertEqual(self.c.evictions, 1)
+		self.assertEqual(self.c.entries, {})
@@ -0,0 +1,45 @@
+"""Unit tests for the clock module."""
+
+import unittest
+
+from mock import patch
+
+import clock
+
+
+class RealClockTest(unittest.TestCase):
+	"""Unit tests for the RealClock class."""
+
+	def setUp(self):
+		self.c = clock.RealClock()
+
+	@patch('clock.time.sleep')
+	def test_sleep(self, mock_sleep):
+		self.c.sleep(0.5)
+		mock_sleep.assert_called_once_with(0.5)
+
+		self.c.sleep(0)
+		self.c.sleep(-1)
+		self.assertEqual(mock_sleep.call_count, 1)
+
+	def test_servo_delay(self):
+		"""Verify the delay is the settle time plus the travel time."""
+
+		self.assertAlmostEqual(self.c.servo_delay(0), clock.SERVO_SETTLE_TIME)
+		self.assertAlmostEqual(self.c.servo_delay(90),
+							   clock.SERVO_SETTLE_TIME + 0.2)
+		self.assertAlmostEqual(self.c.servo_delay(-90), self.c.servo_delay(90))
+
+
+class SimulatedClockTest(unittest.TestCase):
+	"""Unit tests for the SimulatedClock class."""
+
+	@patch('clock.time.sleep')
+	def test_sleep(self, mock_sleep):
+		"""Verify sleeping advances the time without waiting."""
+
+		c = clock.SimulatedClock(start=10)
+		c.sleep(2.5)
+		c.sleep(-1)
+		self.assertEqual(c.time(), 12.5)
+		self.assertFalse(mock_sleep.called)
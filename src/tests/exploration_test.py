@@ -0,0 +1,214 @@
+"""Unit tests for the exploration module."""
+
+import math
+import unittest
+
+import numpy
+
+import exploration
+from mapping import OccupancyGrid
+
+FREE = -1.0
+OCCUPIED = 2.0
+UNCERTAIN = 0.2
+
+
+def paint(grid, cells, log_odds):
+	"""Set the log-odds of cells of a grid.
+
+	Returns the cells as (ix, iy) arrays, as OccupancyGrid.integrate() does.
+	"""
+
+	ix, iy = numpy.array(list(cells), dtype=numpy.int64).reshape(-1, 2).T
+	size = grid.tile_size
+	for key, positions, i, j in grid._by_tile(ix, iy):
+		tile = grid.tiles.setdefault(
+			key, numpy.zeros((size, size), dtype=numpy.float32))
+		tile[i, j] = log_odds
+	return ix, iy
+
+
+def rectangle(x0, y0, x1, y1):
+	return [(x, y) for x in range(x0, x1) for y in range(y0, y1)]
+
+
+class FrontierExplorerTest(unittest.TestCase):
+	"""Unit tests for the FrontierExplorer class."""
+
+	def setUp(self):
+		# 1 cm cells, so a cell is traversable if its 8 neighbors are free,
+		# and no occupied cell is within 2 cells, nor is any within the
+		# margin:
+		self.grid = OccupancyGrid(resolution=1.0, tile_size=8)
+		self.explorer = exploration.FrontierExplorer(self.grid, clearance=2,
+													  footprint=1, margin=2)
+		self.room = rectangle(0, 0, 20, 10)
+
+	def test_frontier(self):
+		"""Verify the edge of a free room in the unknown is its frontier."""
+
+		self.explorer.update(*paint(self.grid, self.room, FREE))
+
+		inside = set(rectangle(1, 1, 19, 9))
+		self.assertEqual(self.explorer.frontier, set(self.room) - inside)
+		self.assertTrue(self.explorer.is_traversable((1, 1)))
+		self.assertFalse(self.explorer.is_traversable((0, 1)))
+		# Cells within 2 of the frontier are goals, from y = 7 up:
+		self.assertEqual(self.explorer.cost[(10, 5)], 2)
+		self.assertEqual(self.explorer.cost[(10, 7)], 0)
+		self.assertEqual(self.explorer.path(10.5, 5.5),
+						 [(10.5, 5.5), (10.5, 6.5), (10.5, 7.5)])
+		self.assertEqual(self.explorer.next_waypoint(10.5, 5.5, lookahead=1),
+						 (10.5, 6.5))
+		self.assertEqual(self.explorer.next_waypoint(10.5, 5.5), (10.5, 7.5))
+
+	def test_off_path(self):
+		"""Verify a robot off the paths is sent to the nearest path."""
+
+		self.explorer.update(*paint(self.grid, self.room, FREE))
+		self.assertEqual(self.explorer.next_waypoint(0.5, 5.5), (1.5, 5.5))
+		self.assertIsNone(self.explorer.next_waypoint(50, 50))
+
+	def test_explored(self):
+		"""Verify there is no waypoint once the room is walled in."""
+
+		changed = self.explorer.update(*paint(self.grid, self.room, FREE))
+		self.assertTrue(changed)
+		walls = set(rectangle(-1, -1, 21, 11)) - set(self.room)
+		self.explorer.update(*paint(self.grid, walls, OCCUPIED))
+
+		self.assertEqual(self.explorer.frontier, set())
+		self.assertEqual(self.explorer.cost, {})
+		self.assertIsNone(self.explorer.next_waypoint(10.5, 5.5))
+		self.assertFalse(self.explorer.is_traversable((1, 5)))
+		self.assertTrue(self.explorer.is_traversable((2, 5)))
+
+	def test_wall_raises_cost(self):
+		"""Verify paths are repaired around a new wall."""
+
+		self.explorer.update(*paint(self.grid, self.room, FREE))
+		walls = set(rectangle(-1, -1, 21, 11)) - set(self.room)
+		walls -= set(rectangle(-1, 3, 0, 7))	# an opening on the left
+		self.explorer.update(*paint(self.grid, walls, OCCUPIED))
+		self.assertAlmostEqual(self.explorer.cost[(10, 5)], 8)
+
+		# A wall across the room cuts it off from the opening:
+		self.explorer.update(*paint(self.grid, rectangle(6, 0, 7, 10),
+									OCCUPIED))
+		self.assertNotIn((10, 5), self.explorer.cost)
+		self.assertNotIn((4, 5), self.explorer.cost)
+		self.assertAlmostEqual(self.explorer.cost[(3, 5)], 1)
+
+	def partitioned(self, margin):
+		"""Return an explorer of a walled room, with an opening on the right
+		and a wall from the bottom up to y = 14 between.
+		"""
+
+		explorer = exploration.FrontierExplorer(self.grid, clearance=2,
+												footprint=1, margin=margin)
+		room = rectangle(0, 0, 20, 20)
+		walls = set(rectangle(-1, -1, 21, 21)) - set(room)
+		walls -= set(rectangle(20, 2, 21, 7))
+		walls |= set(rectangle(8, 0, 10, 14))
+		explorer.update(*paint(self.grid, room, FREE))
+		explorer.update(*paint(self.grid, walls, OCCUPIED))
+		return explorer
+
+	def test_margin(self):
+		"""Verify paths keep to the middle of a corridor within the margin."""
+
+		# From x = 10 to 19 on the right, the middle is at x = 15:
+		path = self.partitioned(margin=4).path(4.5, 4.5)
+		self.assertEqual(path[-1][0], 17.5)		# by the opening
+		right = [x for x, y in path if x > 10 and 8 < y < 15]
+		self.assertTrue(right)
+		for x in right:
+			self.assertLessEqual(abs(x - 15), 1)
+
+		path = self.partitioned(margin=2).path(4.5, 4.5)
+		self.assertTrue(any(abs(x - 15) > 1 for x, y in path
+							if x > 10 and 8 < y < 15))
+
+	def test_in_sight(self):
+		"""Verify a waypoint is not past a corner of the path."""
+
+		explorer = self.partitioned(margin=2)
+		self.assertTrue(explorer._in_sight((4, 4), (5, 14)))
+		self.assertFalse(explorer._in_sight((4, 4), (7, 16)))
+		self.assertEqual(explorer.next_waypoint(4.5, 4.5, lookahead=100),
+						 (5.5, 14.5))
+
+	def scratch(self, margin):
+		"""Return an explorer of the grid as it is, built from scratch."""
+
+		log_odds, origin = self.grid.to_array()
+		ix, iy = numpy.nonzero(log_odds)
+		explorer = exploration.FrontierExplorer(self.grid, clearance=2,
+												footprint=1, margin=margin)
+		explorer.update(ix + int(origin[0]), iy + int(origin[1]))
+		return explorer
+
+	def assertShortest(self, path, scratch, x, y):
+		"""Assert a path from (x, y) is as short as the scratch explorer's."""
+
+		expected = scratch.path(x, y)
+		self.assertEqual(path and path[0], expected and expected[0])
+		cells = [scratch._cell(*point) for point in path or []]
+		for cell, after in zip(cells, cells[1:]):
+			step = math.hypot(after[0] - cell[0], after[1] - cell[1])
+			self.assertAlmostEqual(
+				scratch.cost[cell],
+				scratch.cost[after] + step * scratch._weight[cell])
+		if cells:
+			self.assertIn(cells[-1], scratch.goals)
+
+	def test_settle(self):
+		"""Verify paths are right when only the costs they need have been
+		settled since the map changed."""
+
+		explorer = self.partitioned(margin=4)
+		changes = [
+			(rectangle(20, 2, 21, 7), OCCUPIED),	# close the opening
+			(rectangle(-1, 15, 0, 19), FREE),		# open the top left
+			(rectangle(20, 8, 21, 12), FREE),		# open the right
+			(rectangle(-1, 15, 0, 19), OCCUPIED),	# close the top left
+			(rectangle(5, 11, 15, 12), OCCUPIED),	# wall off the top
+		]
+		for cells, log_odds in changes:
+			explorer.update(*paint(self.grid, cells, log_odds))
+			scratch = self.scratch(margin=4)
+			for x, y in ((4.5, 4.5), (2.5, 16.5), (14.5, 4.5)):
+				self.assertShortest(explorer.path(x, y), scratch, x, y)
+		self.assertEqual(explorer.cost, scratch.cost)
+
+	def test_incremental(self):
+		"""Verify updates match an explorer built from scratch."""
+
+		self.explorer = exploration.FrontierExplorer(self.grid, clearance=2,
+													  footprint=1, margin=3)
+		random = numpy.random.RandomState(0)
+		for i in range(30):
+			x, y = random.randint(0, 25, 2)
+			w, h = random.randint(1, 8, 2)
+			log_odds = random.choice([FREE, FREE, OCCUPIED, UNCERTAIN])
+			self.explorer.update(*paint(
+				self.grid, rectangle(x, y, x + w, y + h), log_odds))
+			scratch = self.scratch(margin=3)
+
+			self.assertEqual(self.explorer.frontier, scratch.frontier)
+			self.assertEqual(self.explorer.traversable, scratch.traversable)
+			self.assertEqual(self.explorer.goals, scratch.goals)
+			ix, iy = numpy.mgrid[-5:40, -5:40].reshape(2, -1)
+			for name in ('clear_nearby', 'inflation', 'crowding',
+						 'frontier_nearby'):
+				numpy.testing.assert_array_equal(
+					self.explorer.counts_at(getattr(self.explorer, name), ix, iy),
+					scratch.counts_at(getattr(scratch, name), ix, iy))
+
+			x, y = random.uniform(-5, 30, 2)
+			self.assertShortest(self.explorer.path(x, y), scratch, x, y)
+			if i % 10 == 9:
+				self.assertEqual(sorted(self.explorer.cost),
+								 sorted(scratch.cost))
+				for cell, cost in scratch.cost.items():
+					self.assertAlmostEqual(self.explorer.cost[cell], cost)
@@ -32,6 +32,10 @@ def left_rot():
 def trim_write(trim):
 	calls.append('trim_write({0})'.format(trim))
 
+def enc_read(motor):
+	calls.append('enc_read({0})'.format(motor))
+	return 0
+
 def us_dist(pin):
 	calls.append('us_dist({0})'.format(pin))
 	return 600  # approximate max range
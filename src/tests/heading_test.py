@@ -0,0 +1,117 @@
+"""Unit tests for the heading module."""
+
+import unittest
+
+import numpy
+
+from heading import Distribution, HeadingFilter
+
+
+class DistributionTest(unittest.TestCase):
+	"""Unit tests for the Distribution class."""
+
+	def test_sample_frequencies(self):
+		"""Verify samples follow the probabilities, and skip zeros."""
+
+		p = [0.1, 0.0, 0.6, 0.3]
+		d = Distribution(p, random=numpy.random.RandomState(0))
+		samples = [d.sample() for i in range(20000)]
+		frequencies = numpy.bincount(samples, minlength=4) / 20000.0
+		numpy.testing.assert_allclose(frequencies, p, atol=0.01)
+		self.assertEqual(frequencies[1], 0)
+
+	def test_seeded(self):
+		first = Distribution([1, 2, 3], random=numpy.random.RandomState(5))
+		second = Distribution([1, 2, 3], random=numpy.random.RandomState(5))
+		self.assertEqual([first.sample() for i in range(50)],
+						 [second.sample() for i in range(50)])
+
+	def test_queries(self):
+		d = Distribution([1, 3, 0, 4])
+		numpy.testing.assert_allclose(d.p, [0.125, 0.375, 0, 0.5])
+		self.assertEqual(d.map(), 3)
+		self.assertAlmostEqual(d.expected([0, 10, 20, 30]), 18.75)
+
+	def test_invalid(self):
+		for p in ([], [0, 0], [0.5, -0.1, 0.6]):
+			with self.assertRaises(ValueError):
+				Distribution(p)
+
+
+class HeadingFilterTest(unittest.TestCase):
+	"""Unit tests for the HeadingFilter class."""
+
+	def setUp(self):
+		self.f = HeadingFilter(resolution=10)
+		self.f.belief = [0] * 17 + [0.2, 0.6, 0.2] + [0] * 16
+
+	def test_init(self):
+		self.assertEqual(HeadingFilter(resolution=5).n_bins, 72)
+		self.assertEqual(HeadingFilter(resolution=1).n_bins, 360)
+		numpy.testing.assert_allclose(HeadingFilter().belief, [1.0 / 36] * 36)
+		with self.assertRaises(ValueError):
+			HeadingFilter(resolution=7)
+		with self.assertRaises(ValueError):
+			self.f.belief = [1.0] * 35
+
+	def test_predict_whole_bins(self):
+		self.assertEqual(self.f.predict(-30).tolist(),
+						 [0] * 14 + [0.2, 0.6, 0.2] + [0] * 19)
+
+	def test_predict_wraps(self):
+		self.f.belief = [0.6, 0.2] + [0] * 33 + [0.2]
+		self.assertEqual(self.f.predict(360 + 10).tolist(),
+						 [0.2, 0.6, 0.2] + [0] * 33)
+
+	def test_predict_fractional(self):
+		"""A 5 degree turn splits each bin between two neighbors."""
+
+		self.f.belief = [0] * 18 + [1.0] + [0] * 17
+		numpy.testing.assert_allclose(self.f.predict(5),
+									  [0] * 18 + [0.5, 0.5] + [0] * 16)
+		numpy.testing.assert_allclose(self.f.predict(-7.5),
+									  [0] * 17 + [0.375, 0.5, 0.125] + [0] * 16)
+		self.assertAlmostEqual(self.f.belief.sum(), 1.0)
+
+	def test_predict_noise(self):
+		self.f.belief = [1.0] + [0] * 35
+		belief = self.f.predict(0, motion_noise_kernel=[1, 0, 3])
+		numpy.testing.assert_allclose(belief,
+									  [0] + [0.75] + [0] * 33 + [0.25])
+		with self.assertRaises(ValueError):
+			self.f.predict(0, motion_noise_kernel=[0.5, 0.5])
+
+	def test_update(self):
+		likelihood = numpy.zeros(36)
+		likelihood[17:19] = [1.0, 0.5]
+		numpy.testing.assert_allclose(self.f.update(likelihood),
+									  [0] * 17 + [0.4, 0.6] + [0] * 17)
+		with self.assertRaises(ValueError):
+			self.f.update(numpy.zeros(36))
+
+	def test_gaussian_likelihood(self):
+		"""Verify the likelihood peaks at the center and wraps around."""
+
+		likelihood = self.f.gaussian_likelihood(0.5, 1.0)
+		self.assertAlmostEqual(likelihood[0], likelihood[1])
+		self.assertAlmostEqual(likelihood[35], likelihood[2])
+		self.assertAlmostEqual(likelihood[0], numpy.exp(-0.125))
+		self.assertEqual(numpy.argmax(self.f.gaussian_likelihood(20, 2)), 20)
+
+	def test_distribution(self):
+		"""Verify the distribution is kept until the belief changes."""
+
+		distribution = self.f.distribution
+		self.assertIs(self.f.distribution, distribution)
+		self.assertIn(distribution.sample(), [17, 18, 19])
+
+		self.f.predict(0)
+		self.assertIs(self.f.distribution, distribution)
+		self.f.predict(10)
+		self.assertIsNot(self.f.distribution, distribution)
+		self.assertEqual(self.f.distribution.map(), 19)
+
+	def test_seed(self):
+		first, second = HeadingFilter(seed=3), HeadingFilter(seed=3)
+		self.assertEqual([first.distribution.sample() for i in range(20)],
+						 [second.distribution.sample() for i in range(20)])
@@ -0,0 +1,72 @@
+"""Unit tests for the localization module."""
+
+import math
+import unittest
+
+import numpy
+
+import localization
+from maze import Maze
+
+# An L-shaped room, so that readings identify a unique pose:
+ROOM = [(0, 0, 200, 0), (200, 0, 200, 60), (200, 60, 60, 60),
+		(60, 60, 60, 150), (60, 150, 0, 150), (0, 150, 0, 0)]
+ANGLES = [270, 315, 0, 45, 90]
+
+
+class MotionTest(unittest.TestCase):
+
+	def test_motion_from_encoders(self):
+		distance, turn = localization.motion_from_encoders(10, 10)
+		self.assertAlmostEqual(distance, 10 * localization.DISTANCE_PER_TICK)
+		self.assertEqual(turn, 0)
+
+		distance, turn = localization.motion_from_encoders(0, 2)
+		self.assertAlmostEqual(turn, math.radians(10))
+
+
+class ParticleFilterTest(unittest.TestCase):
+	"""Unit tests for the ParticleFilter class."""
+
+	def setUp(self):
+		self.maze = Maze(ROOM)
+		self.pf = localization.ParticleFilter(self.maze, n_particles=5000,
+											  seed=1)
+
+	def sense(self, x, y, theta):
+		return self.maze.expected_range(
+			x, y, theta - numpy.radians(ANGLES)).tolist()
+
+	def test_scatter(self):
+		self.assertTrue((self.pf.particles[:, 0] >= 0).all())
+		self.assertTrue((self.pf.particles[:, 0] <= 200).all())
+		self.assertAlmostEqual(self.pf.weights.sum(), 1.0)
+		self.assertAlmostEqual(self.pf.n_effective, 5000)
+
+	def test_predict(self):
+		self.pf.particles[:] = [10, 20, 0]
+		self.pf.predict(30, math.pi / 2)
+		x, y, theta = self.pf.estimate()
+		self.assertAlmostEqual(x, 10, delta=1)
+		self.assertAlmostEqual(y, 50, delta=1)
+		self.assertAlmostEqual(theta, math.pi / 2, delta=0.01)
+
+	def test_resample(self):
+		self.pf.weights[:] = 0
+		self.pf.weights[7] = 1.0
+		self.pf.resample()
+		self.assertTrue((self.pf.particles == self.pf.particles[7]).all())
+		self.assertAlmostEqual(self.pf.n_effective, 5000)
+
+	def test_localize(self):
+		"""Converge on the true pose while driving along the corridor."""
+
+		pose = [30, 110, -math.pi / 2]
+		for i in range(9):
+			pose[1] -= 10
+			self.pf.step(10, 0, ANGLES, self.sense(*pose))
+
+		x, y, theta = self.pf.estimate()
+		self.assertAlmostEqual(x, pose[0], delta=5)
+		self.assertAlmostEqual(y, pose[1], delta=5)
+		self.assertAlmostEqual(theta, pose[2], delta=0.15)
@@ -0,0 +1,91 @@
+"""Unit tests for the machine module."""
+
+import unittest
+
+from mock import MagicMock
+
+import machine
+import state
+
+
+class ScriptedState(state.BaseState):
+	"""A state that returns transitions from a script, and records its input."""
+
+	def __init__(self, robot, transitions):
+		super(ScriptedState, self).__init__(robot)
+		self.transitions = list(transitions)
+		self.received = []
+
+	def run(self, transition=None, *args, **kwargs):
+		self.received.append(transition)
+		return self.transitions.pop(0)
+
+
+class StateMachineTest(unittest.TestCase):
+	"""Unit tests for the StateMachine class."""
+
+	def setUp(self):
+		self.robot = MagicMock()
+		self.corridor = ScriptedState(self.robot, [
+			state.OPENING_LEFT, state.CORRIDOR_ENDED])
+		self.junction = ScriptedState(self.robot, [
+			state.OPENING_LEFT, state.DEAD_END])
+		self.turn = ScriptedState(self.robot, [state.TURNED])
+		self.states = {'corridor': self.corridor, 'junction': self.junction,
+					   'turn': self.turn}
+		self.table = {
+			('corridor', state.OPENING_LEFT): 'junction',
+			('corridor', state.CORRIDOR_ENDED): 'junction',
+			('junction', state.OPENING_LEFT): 'turn',
+			('junction', state.DEAD_END): None,
+			('turn', state.TURNED): 'corridor',
+		}
+
+	def test_run(self):
+		"""Verify each state runs with the transition that led to it."""
+
+		m = machine.StateMachine(self.robot, self.states, self.table,
+								 'corridor')
+		self.assertEqual(m.run(), state.DEAD_END)
+		self.assertEqual(m.history, [
+			('corridor', state.OPENING_LEFT),
+			('junction', state.OPENING_LEFT),
+			('turn', state.TURNED),
+			('corridor', state.CORRIDOR_ENDED),
+			('junction', state.DEAD_END),
+		])
+		self.assertEqual(self.corridor.received, [None, state.TURNED])
+		self.assertEqual(self.junction.received,
+						 [state.OPENING_LEFT, state.CORRIDOR_ENDED])
+		self.assertEqual(self.turn.received, [state.OPENING_LEFT])
+
+	def test_max_transitions(self):
+		m = machine.StateMachine(self.robot, self.states, self.table,
+								 'corridor', max_transitions=2)
+		self.assertEqual(m.run(), state.OPENING_LEFT)
+		self.assertEqual(len(m.history), 2)
+
+	def test_unknown_transition(self):
+		del self.table['turn', state.TURNED]
+		m = machine.StateMachine(self.robot, self.states, self.table,
+								 'corridor')
+		with self.assertRaises(ValueError):
+			m.run()
+
+	def test_unknown_state(self):
+		self.table['turn', state.TURNED] = 'dead end'
+		with self.assertRaises(ValueError):
+			machine.StateMachine(self.robot, self.states, self.table,
+								 'corridor')
+		with self.assertRaises(ValueError):
+			machine.StateMachine(self.robot, self.states, {}, 'start')
+
+	def test_maze_machine(self):
+		"""Verify every transition of the maze states leads somewhere."""
+
+		m = machine.maze_machine(self.robot)
+		self.assertIsInstance(m.states[m.start], state.CorridorState)
+		for name, transition in machine.MAZE_TABLE:
+			self.assertIn(machine.MAZE_TABLE[name, transition], m.states)
+		for transition in state.JunctionState.PREFERENCE + (state.DEAD_END,):
+			self.assertIn(('junction', transition), machine.MAZE_TABLE)
@@ -0,0 +1,137 @@
+"""Unit tests for the mapping module."""
+
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import mapping
+from robot import DISTANCE_PER_TICK
+
+
+class OdometryTest(unittest.TestCase):
+	"""Unit tests for the Odometry class."""
+
+	def test_straight(self):
+		o = mapping.Odometry(pose=(10, 20, math.pi / 2))
+		x, y, theta = o.update(10, 10)
+		self.assertAlmostEqual(x, 10)
+		self.assertAlmostEqual(y, 20 + 10 * DISTANCE_PER_TICK)
+		self.assertAlmostEqual(theta, math.pi / 2)
+
+	def test_turn(self):
+		"""Verify a right turn decreases theta, which wraps at pi."""
+
+		o = mapping.Odometry(pose=(0, 0, -math.pi + 0.05))
+		x, y, theta = o.update(1, 0)
+		self.assertTrue(theta > 0)
+		self.assertAlmostEqual(o.update(0, 1)[2], -math.pi + 0.05)
+
+	def test_rotate(self):
+		"""Verify a rotation turns by the whole ticks commanded."""
+
+		o = mapping.Odometry(pose=(10, 20, 0))
+		self.assertEqual(o.rotate(95.0), (10, 20, math.radians(90)))
+		self.assertAlmostEqual(o.rotate(-185.0)[2], math.radians(-90))
+		self.assertAlmostEqual(o.rotate(-100.0)[2], math.radians(170))
+
+
+class OccupancyGridTest(unittest.TestCase):
+	"""Unit tests for the OccupancyGrid class."""
+
+	def setUp(self):
+		self.grid = mapping.OccupancyGrid(resolution=4.0, tile_size=16)
+		self.dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def test_empty(self):
+		self.assertEqual(self.grid.log_odds(10, 10), 0)
+		self.assertEqual(self.grid.probability(10, 10), 0.5)
+		self.assertIsNone(self.grid.bounds)
+		self.grid.integrate((0, 0, 0), [], [])
+		self.assertEqual(self.grid.tiles, {})
+
+	def test_integrate(self):
+		"""Verify cells before a reading are free, and at its range occupied."""
+
+		# Facing up (+y) from (-30, -30), a wall 50 cm ahead and 40 cm right:
+		ix, iy = self.grid.integrate((-30, -30, math.pi / 2), [0, 90], [50, 40])
+
+		self.assertTrue(self.grid.log_odds(-30, -5) < 0)
+		self.assertTrue(self.grid.log_odds(-30, 20) > 0)
+		self.assertTrue(self.grid.log_odds(-10, -30) < 0)
+		self.assertTrue(self.grid.log_odds(10, -30) > 0)
+		self.assertEqual(self.grid.log_odds(-30, 40), 0)	# beyond the wall
+		self.assertEqual(self.grid.log_odds(-60, -30), 0)	# not sensed
+		self.assertAlmostEqual(float(self.grid.log_odds(-30, 20)),
+							   mapping.LOG_ODDS_OCCUPIED)
+
+		# The cells updated are returned, and are all that changed:
+		self.assertTrue((self.grid.cell_log_odds(ix, iy) != 0).all())
+		self.assertEqual(len(ix), (self.grid.to_array()[0] != 0).sum())
+		self.assertEqual(self.grid.cell_log_odds(ix[0] + 1000, iy[0]), 0)
+
+	def test_integrate_accumulates(self):
+		for i in range(20):
+			self.grid.integrate((0, 0, 0), [0, 0], [30, 30])
+		self.assertAlmostEqual(float(self.grid.log_odds(30, 1)),
+							   mapping.LOG_ODDS_LIMIT)
+		self.assertAlmostEqual(float(self.grid.log_odds(10, 1)),
+							   -mapping.LOG_ODDS_LIMIT)
+
+	def test_max_range(self):
+		"""Verify a reading at max range marks no cell occupied."""
+
+		self.grid.integrate((0, 0, 0), [0], [400])
+		x = numpy.arange(0, 320, 2.0)
+		self.assertTrue((self.grid.log_odds(x, 0) <= 0).all())
+		self.assertTrue(self.grid.log_odds(250, 0) < 0)
+
+	def test_lazy_tiles(self):
+		"""Verify only the tiles the readings reach are allocated."""
+
+		self.grid.integrate((10, 10, 0), [0], [40])
+		self.assertEqual(sorted(self.grid.tiles), [(0, 0)])
+		self.assertEqual(self.grid.bounds, (0, 0, 64, 64))
+
+		self.grid.integrate((10, 10, 0), [180 - 90], [40])
+		self.assertEqual(sorted(self.grid.tiles), [(0, -1), (0, 0)])
+		self.assertEqual(self.grid.nbytes, 2 * 16 * 16 * 4)
+
+		log_odds, origin = self.grid.to_array()
+		self.assertEqual(log_odds.shape, (16, 32))
+		self.assertEqual(origin, (0, -64))
+		self.assertAlmostEqual(log_odds[12, 18], self.grid.log_odds(50, 10))
+
+	def test_save_load(self):
+		self.grid.integrate((-30, -30, math.pi / 2), [0, 90], [50, 40])
+		path = os.path.join(self.dir, 'map.rmap')
+		self.grid.save(path)
+		self.assertEqual(os.path.getsize(path),
+						 mapping.HEADER.size + len(self.grid.tiles) * (8 + 256))
+
+		loaded = mapping.OccupancyGrid.load(path)
+		self.assertEqual(sorted(loaded.tiles), sorted(self.grid.tiles))
+		self.assertEqual(loaded.resolution, 4.0)
+		for key, tile in self.grid.tiles.items():
+			numpy.testing.assert_allclose(loaded.tiles[key], tile,
+										  atol=0.5 / mapping.LOG_ODDS_SCALE)
+
+	def test_load_invalid(self):
+		path = os.path.join(self.dir, 'map.rmap')
+		with open(path, 'wb') as f:
+			f.write('not a map' * 4)
+		with self.assertRaises(ValueError):
+			mapping.OccupancyGrid.load(path)
+
+		self.grid.integrate((0, 0, 0), [0], [40])
+		self.grid.save(path)
+		with open(path, 'r+b') as f:
+			f.truncate(os.path.getsize(path) - 1)
+		with self.assertRaises(ValueError):
+			mapping.OccupancyGrid.load(path)
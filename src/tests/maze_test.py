@@ -0,0 +1,84 @@
+"""Unit tests for the maze module."""
+
+import math
+import unittest
+
+import numpy
+
+from maze import Maze, MazeGrid
+
+DRAWING = """
++--+--+--+
+      |  |
++  +  +  +
+|  |     |
++--+--+--+
+"""
+BOX = [(0, 0, 100, 0), (100, 0, 100, 50), (100, 50, 0, 50), (0, 50, 0, 0)]
+
+
+class MazeTest(unittest.TestCase):
+	"""Unit tests for the Maze class."""
+
+	def setUp(self):
+		self.maze = Maze(BOX)
+
+	def test_bounds(self):
+		self.assertEqual(self.maze.bounds, (0, 0, 100, 50))
+		with self.assertRaises(ValueError):
+			Maze([])
+
+	def test_ray_cast(self):
+		angles = numpy.radians([0, 90, 180, 270, 45])
+		numpy.testing.assert_allclose(
+			self.maze.ray_cast(20, 10, angles),
+			[80, 40, 20, 10, 40 * math.sqrt(2)]
+		)
+
+	def test_ray_cast_broadcast(self):
+		distances = self.maze.ray_cast([[10, 30], [50, 70]], 25, 0)
+		numpy.testing.assert_allclose(distances, [[90, 70], [50, 30]])
+
+	def test_ray_cast_miss(self):
+		self.assertEqual(self.maze.ray_cast(200, 10, 0), numpy.inf)
+
+	def test_expected_range(self):
+		wide = Maze([(0, 0, 0, 10), (1000, 0, 1000, 10)])
+		self.assertEqual(wide.expected_range(1, 5, 0), 300)
+		self.assertEqual(wide.expected_range(1, 5, math.pi), 1)
+
+
+class MazeGridTest(unittest.TestCase):
+	"""Unit tests for the MazeGrid class."""
+
+	def setUp(self):
+		self.grid = MazeGrid.parse(DRAWING, cell_size=10)
+
+	def test_parse(self):
+		self.assertEqual((self.grid.rows, self.grid.cols), (2, 3))
+		self.assertEqual(self.grid.h_walls.tolist(),
+						 [[True, True, True],
+						  [False, False, False],
+						  [True, True, True]])
+		self.assertEqual(self.grid.v_walls.tolist(),
+						 [[False, False, True, True],
+						  [True, True, False, True]])
+		with self.assertRaises(ValueError):
+			MazeGrid.parse('|  |')
+
+	def test_format(self):
+		self.assertEqual(self.grid.format(), DRAWING.lstrip())
+
+	def test_cells(self):
+		self.assertEqual(self.grid.cell_center(0, 2), (25, 15))
+		self.assertEqual(self.grid.cell_at(25, 15), (0, 2))
+		self.assertEqual(self.grid.cell_at(1, 1), (1, 0))
+
+	def test_to_maze(self):
+		maze = self.grid.to_maze()
+		self.assertEqual(sorted(map(tuple, maze.walls.tolist())), [
+			(0, 0, 30, 0), (0, 10, 0, 0), (0, 20, 30, 20),
+			(10, 10, 10, 0), (20, 20, 20, 10), (30, 20, 30, 0)
+		])
+		self.assertEqual(maze.ray_cast(5, 15, numpy.pi), numpy.inf)
+		self.assertEqual(maze.ray_cast(5, 5, 0), 5)
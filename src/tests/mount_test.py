@@ -4,6 +4,7 @@ import unittest
 
 from mock import MagicMock, patch
 
+from clock import SimulatedClock
 import mount
 
 
@@ -80,6 +81,54 @@ class MountTest(unittest.TestCase):
 		self.mock_driver.servo.assert_called_once_with(0)
 		self.assertEqual(self.m.current_angle, 90)
 
+	def test_move_delay(self):
+		"""Verify the delay follows the travel, including across 0 degrees."""
+
+		self.m.clock = SimulatedClock(slew_seconds_per_degree=0.01,
+									  settle_time=0.1)
+		self.m.current_angle = 350
+		self.m.move(10)
+		self.assertAlmostEqual(self.m.clock.time(), 0.3)
+
+		self.m.move(90)
+		self.assertAlmostEqual(self.m.clock.time(), 1.2)
+
+	def test_sweep_order(self):
+		"""Verify angles are ordered into one pass from the nearer end."""
+
+		angles = [90, 0, 270, 300, 30, 0]
+		self.m.current_angle = 280
+		self.assertEqual(self.m.sweep_order(angles), [270, 300, 0, 30, 90])
+		self.m.current_angle = 60
+		self.assertEqual(self.m.sweep_order(angles), [90, 30, 0, 300, 270])
+
+		with self.assertRaises(ValueError):
+			self.m.sweep_order([0, 180])
+
+	def test_plan(self):
+		"""Verify a plan orders angles into one pass and reports its time."""
+
+		self.m.clock = SimulatedClock(slew_seconds_per_degree=0.01,
+									  settle_time=0.1)
+		plan = self.m.plan([300, 60, 0, 60])
+
+		self.assertEqual(plan.order, [300, 0, 60])
+		self.assertAlmostEqual(plan.slew_time, 2.1)
+		self.assertAlmostEqual(plan.naive_slew_time, 2.7)
+		self.assertAlmostEqual(self.m.planned_slew_time, 2.1)
+		self.assertAlmostEqual(self.m.naive_slew_time, 2.7)
+
+		# The next plan starts from the end of the last:
+		for angle in plan.order:
+			self.m.move(x=angle)
+		self.assertEqual(self.m.plan([0, 300, 60]).order, [60, 0, 300])
+
+	def test_clamp(self):
+		for angle, expected in [(0, 0), (90, 90), (100, 90), (170, 90),
+								(190, 270), (260, 270), (300, 300),
+								(-80, 280)]:
+			self.assertEqual(self.m.clamp(angle), expected)
+
 	def test_swivel_invalid_angles(self):
 		"""Verify exception thrown if invalid angle specified."""
 
@@ -0,0 +1,93 @@
+"""Unit tests for the npmatrix module."""
+
+import unittest
+
+import matrix
+import npmatrix
+
+
+SPD = [[4.0, 2.0, 0.6], [2.0, 5.0, 1.0], [0.6, 1.0, 3.0]]
+OTHER = [[1.0, -2.0, 0.5], [0.0, 3.0, 1.5], [2.5, 1.0, -1.0]]
+
+
+def assert_matrices_equal(test, a, b, places=7):
+	test.assertEqual((a.dimx, a.dimy), (b.dimx, b.dimy))
+	for i in range(a.dimx):
+		for j in range(a.dimy):
+			test.assertAlmostEqual(a.value[i][j], b.value[i][j], places=places)
+
+
+class MatrixTest(unittest.TestCase):
+	"""Verify npmatrix.matrix against the reference matrix.matrix."""
+
+	def setUp(self):
+		self.ref_a = matrix.matrix([row[:] for row in SPD])
+		self.ref_b = matrix.matrix([row[:] for row in OTHER])
+		self.a = npmatrix.matrix(SPD)
+		self.b = npmatrix.matrix(OTHER)
+
+	def test_init(self):
+		self.assertEqual((self.a.dimx, self.a.dimy), (3, 3))
+		self.assertEqual(npmatrix.matrix([[]]).dimx, 0)
+		self.assertEqual(repr(self.a), repr(SPD))
+
+	def test_zero_and_identity(self):
+		m = npmatrix.matrix([[]])
+		m.zero(2, 3)
+		self.assertEqual(m.value.tolist(), [[0, 0, 0], [0, 0, 0]])
+		m.identity(2)
+		self.assertEqual(m.value.tolist(), [[1, 0], [0, 1]])
+		with self.assertRaises(ValueError):
+			m.zero(0, 1)
+
+	def test_zero_reuses_storage(self):
+		storage = self.a.value
+		self.a.zero(3, 3)
+		self.assertTrue(self.a.value is storage)
+
+	def test_arithmetic(self):
+		assert_matrices_equal(self, self.a + self.b, self.ref_a + self.ref_b)
+		assert_matrices_equal(self, self.a - self.b, self.ref_a - self.ref_b)
+		assert_matrices_equal(self, self.a * self.b, self.ref_a * self.ref_b)
+		assert_matrices_equal(self, self.b.transpose(),
+							  self.ref_b.transpose())
+
+	def test_dimension_errors(self):
+		row = npmatrix.matrix([[1.0, 2.0]])
+		for op in [lambda: self.a + row, lambda: self.a - row,
+				   lambda: self.a * row, lambda: self.a.iadd(row)]:
+			with self.assertRaises(ValueError):
+				op()
+
+	def test_inverse(self):
+		assert_matrices_equal(self, self.a.Cholesky(), self.ref_a.Cholesky())
+		assert_matrices_equal(self, self.a.inverse(), self.ref_a.inverse())
+		with self.assertRaises(ValueError):
+			npmatrix.matrix([[1.0, 2.0], [2.0, 1.0]]).inverse()
+
+	def test_in_place(self):
+		out = npmatrix.matrix([[0.0] * 3] * 3)
+		storage = out.value
+		self.assertTrue(self.a.imul_into(self.b, out) is out)
+		self.assertTrue(out.value is storage)
+		assert_matrices_equal(self, out, self.ref_a * self.ref_b)
+
+		out.iadd(self.a)
+		assert_matrices_equal(self, out, self.ref_a * self.ref_b + self.ref_a)
+		out -= self.a
+		assert_matrices_equal(self, out, self.ref_a * self.ref_b)
+
+		self.b.transpose_into(out)
+		assert_matrices_equal(self, out, self.ref_b.transpose())
+		self.assertTrue(out.value is storage)
+
+		with self.assertRaises(ValueError):
+			self.a.imul_into(self.b, self.a)
+
+	def test_transpose_as_output(self):
+		"""Verify a transposed matrix can be written into."""
+
+		out = self.b.transpose()
+		self.a.imul_into(self.b, out)
+		assert_matrices_equal(self, out, self.ref_a * self.ref_b)
+		self.assertTrue(self.a.inverse().value.flags['C_CONTIGUOUS'])
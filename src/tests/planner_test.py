@@ -0,0 +1,113 @@
+"""Unit tests for the planner module."""
+
+import unittest
+
+import numpy
+
+from maze import MazeGrid
+import planner
+
+DRAWING = """
++--+--+--+--+
+|           |
++  +--+--+  +
+|  |     |  |
++  +  +--+  +
+|           |
++--+--+--+--+
+"""
+TOP_ROUTE = ((0, 0), (0, 1), (0, 2), (0, 3), (1, 3))
+
+
+class PlannerTest(unittest.TestCase):
+	"""Unit tests for the Planner class."""
+
+	def setUp(self):
+		self.planner = planner.Planner(MazeGrid.parse(DRAWING))
+
+	def test_route(self):
+		self.assertEqual(self.planner.route((0, 0), (1, 3)), TOP_ROUTE)
+		self.assertEqual(self.planner.route((1, 2), (2, 0)),
+						 ((1, 2), (1, 1), (2, 1), (2, 0)))
+		self.assertEqual(self.planner.route((1, 1), (1, 1)), ((1, 1),))
+		with self.assertRaises(ValueError):
+			self.planner.route((0, 0), (3, 0))
+
+	def test_unreachable(self):
+		self.planner.set_wall(1, 1, 'bottom')
+		self.assertIsNone(self.planner.route((0, 0), (1, 2)))
+		self.assertIsNone(self.planner.route((0, 0), (1, 2)))
+		self.assertEqual(self.planner.stats,
+						 {'hits': 1, 'misses': 1, 'evictions': 0})
+
+	def test_cache(self):
+		"""Verify routes are dropped only when a change may affect them."""
+
+		route = self.planner.route((0, 0), (1, 3))
+		self.planner.route((2, 1), (1, 2))
+		self.assertIs(self.planner.route((0, 0), (1, 3)), route)
+
+		# A wall across the first route only:
+		self.assertTrue(self.planner.set_wall(0, 1, 'right'))
+		self.assertFalse(self.planner.set_wall(0, 1, 'right'))
+		self.assertTrue(self.planner.grid.v_walls[0, 2])
+		self.assertEqual(sorted(self.planner.routes), [((2, 1), (1, 2))])
+		self.assertEqual(self.planner.route((0, 0), (1, 3)), (
+			(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (2, 3), (1, 3)))
+
+		# An opening may shorten any route:
+		self.assertTrue(self.planner.set_wall(0, 2, 'left', wall=False))
+		self.assertEqual(self.planner.routes, {})
+		self.assertEqual(self.planner.route((0, 0), (1, 3)), TOP_ROUTE)
+		self.assertEqual(self.planner.stats,
+						 {'hits': 1, 'misses': 4, 'evictions': 3})
+
+	def test_outer_wall(self):
+		self.assertFalse(self.planner.set_wall(0, 0, 'left', wall=False))
+		self.assertFalse(self.planner.grid.v_walls[0, 0])
+		self.assertEqual(self.planner.route((0, 0), (0, 1)), ((0, 0), (0, 1)))
+
+
+class ReplannerTest(unittest.TestCase):
+	"""Unit tests for the Replanner class."""
+
+	def test_route(self):
+		p = planner.Planner(MazeGrid.parse(DRAWING))
+		replanner = p.replanner((0, 0), (1, 3))
+		self.assertEqual(replanner.route(), TOP_ROUTE)
+
+		replanner.move_to((0, 1))
+		p.set_wall(0, 1, 'right')
+		self.assertEqual(replanner.route(), (
+			(0, 1), (0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (2, 3), (1, 3)))
+
+		p.set_wall(2, 2, 'right')
+		self.assertIsNone(replanner.route())
+
+	def test_random_changes(self):
+		"""Verify replanned routes are as short as routes from scratch."""
+
+		random = numpy.random.RandomState(0)
+		size = 12
+		grid = MazeGrid(random.rand(size + 1, size) < 0.3,
+						random.rand(size, size + 1) < 0.3)
+		p = planner.Planner(grid)
+		start, goal = (0, 0), (size - 1, size - 1)
+		replanner = p.replanner(start, goal)
+		for i in range(60):
+			route = replanner.route()
+			expected = p.route(start, goal)
+			if expected is None:
+				self.assertIsNone(route)
+			else:
+				self.assertEqual(len(route), len(expected))
+				self.assertEqual(route[0], start)
+				self.assertEqual(route[-1], goal)
+				for a, b in zip(route, route[1:]):
+					self.assertIn(p._index(b), p._neighbors(p._index(a)))
+				if len(route) > 1 and random.rand() < 0.5:
+					start = route[1]
+					replanner.move_to(start)
+			p.set_wall(random.randint(size), random.randint(size),
+					   random.choice(sorted(planner.SIDES)),
+					   wall=random.rand() < 0.5)
@@ -0,0 +1,106 @@
+"""Unit tests for the profiling module."""
+
+import os
+import signal
+import unittest
+
+from mock import patch
+
+import profiling
+
+
+class HistogramTest(unittest.TestCase):
+	"""Unit tests for the Histogram class."""
+
+	def setUp(self):
+		self.h = profiling.Histogram()
+
+	def test_empty(self):
+		self.assertEqual(self.h.count, 0)
+		self.assertEqual(self.h.mean, 0.0)
+		self.assertEqual(self.h.percentile(50), 0)
+
+	def test_small_values_exact(self):
+		for value in range(1, 101):
+			self.h.record(value)
+
+		self.assertEqual(self.h.count, 100)
+		self.assertEqual(self.h.min, 1)
+		self.assertEqual(self.h.max, 100)
+		self.assertAlmostEqual(self.h.mean, 50.5)
+		self.assertEqual(self.h.percentile(50), 50)
+		self.assertEqual(self.h.percentile(99), 99)
+		self.assertEqual(self.h.percentile(100), 100)
+
+	def test_precision(self):
+		"""Verify large values are counted within the relative precision."""
+
+		for value in [300, 4321, 98765, 1234567, 60000000]:
+			h = profiling.Histogram()
+			h.record(value)
+			h.record(value * 2)
+			self.assertTrue(
+				0 <= h.percentile(50) - value <
+				value * 2 ** -profiling.SUB_BUCKET_BITS)
+
+	def test_out_of_range(self):
+		self.h.record(-5)
+		self.h.record(profiling.MAX_VALUE * 2)
+		self.assertEqual(self.h.min, 0)
+		self.assertEqual(self.h.max, profiling.MAX_VALUE)
+
+
+class ProfilingTest(unittest.TestCase):
+	"""Unit tests for enabling and dumping the phase histograms."""
+
+	def tearDown(self):
+		profiling.disable()
+		if hasattr(signal, 'SIGUSR1'):
+			signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+
+	def test_disabled(self):
+		with profiling.phase('sense'):
+			pass
+		self.assertIsNone(profiling.profiler)
+		self.assertIs(profiling.phase('sense'), profiling.phase('settle'))
+
+	@patch('profiling.default_timer')
+	def test_enabled(self, mock_timer):
+		mock_timer.side_effect = [1.0, 1.25, 2.0, 2.5]
+		profiling.enable()
+
+		with profiling.phase('sense'):
+			pass
+		with profiling.phase('sense'):
+			pass
+
+		h = profiling.profiler.histograms['sense']
+		self.assertEqual(h.count, 2)
+		self.assertEqual(h.min, 250000)
+		self.assertEqual(h.max, 500000)
+
+		profiling.disable()
+		self.assertIsNone(profiling.profiler)
+		with profiling.phase('sense'):
+			pass
+		self.assertEqual(mock_timer.call_count, 4)
+
+	@patch('profiling.logger')
+	def test_dump(self, mock_logger):
+		profiling.dump()
+		self.assertFalse(mock_logger.info.called)
+
+		profiling.enable()
+		with profiling.phase('compute'):
+			pass
+		profiling.dump()
+		summary = mock_logger.info.call_args[0][1]
+		self.assertIn('compute', summary)
+		self.assertIn('p99', summary)
+
+	@unittest.skipUnless(hasattr(signal, 'SIGUSR1'), 'no SIGUSR1')
+	@patch('profiling.dump')
+	def test_signal(self, mock_dump):
+		profiling.enable()
+		os.kill(os.getpid(), signal.SIGUSR1)
+		mock_dump.assert_called_once_with()
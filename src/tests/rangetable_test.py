@@ -0,0 +1,61 @@
+"""Unit tests for the rangetable module."""
+
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import rangetable
+from maze import Maze
+
+BOX = [(0, 0, 100, 0), (100, 0, 100, 50), (100, 50, 0, 50), (0, 50, 0, 0)]
+
+
+class RangeTableTest(unittest.TestCase):
+	"""Unit tests for building and reading a RangeTable."""
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, 'box.rtbl')
+		self.maze = Maze(BOX)
+		self.table = rangetable.build(self.maze, self.path, resolution=2.0,
+									  n_angles=36, range_step=2.0)
+
+	def tearDown(self):
+		del self.table
+		shutil.rmtree(self.dir)
+
+	def test_load(self):
+		table = rangetable.RangeTable(self.path)
+		self.assertTrue(isinstance(table.table, numpy.memmap))
+		self.assertEqual(table.table.shape, (50, 25, 36))
+		self.assertEqual(table.bounds, (0, 0, 100, 50))
+		self.assertEqual(os.path.getsize(self.path),
+						 rangetable.HEADER_SIZE + 50 * 25 * 36)
+
+	def test_not_a_table(self):
+		with open(self.path, 'r+b') as f:
+			f.write('XXXX')
+		with self.assertRaises(ValueError):
+			rangetable.RangeTable(self.path)
+
+	def test_expected_range(self):
+		"""Lookups at cell centers match ray casting to within quantization."""
+
+		random = numpy.random.RandomState(0)
+		x = random.randint(0, 50, 500) * 2.0 + 1
+		y = random.randint(0, 25, 500) * 2.0 + 1
+		theta = numpy.radians(random.randint(0, 36, 500) * 10)
+
+		ranges = self.table.expected_range(x, y, theta)
+		self.assertEqual(ranges.shape, (500,))
+		numpy.testing.assert_allclose(ranges,
+									  self.maze.expected_range(x, y, theta),
+									  atol=1.0)
+
+	def test_expected_range_nearest_cell(self):
+		self.assertEqual(self.table.expected_range(7.9, 25, math.pi), 8)
+		self.assertEqual(self.table.expected_range(-20, 25, math.pi), 0)
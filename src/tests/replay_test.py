@@ -0,0 +1,85 @@
+"""Unit tests for the replay module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import replay
+import run
+import simdriver
+import telemetry
+
+
+class ReplayTest(unittest.TestCase):
+	"""Record a simulated run, and replay it."""
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, 'run.tlm')
+
+		simdriver.reset(pose=(20, 25, 0.2), sensor_noise=1.0,
+						motion_noise=0.02, seed=1, time_limit=120)
+		numpy.random.seed(1)
+		r = run.build_robot(driver_module='simdriver', telemetry=self.path,
+							seed=1)
+		r.run()
+		r.shutdown()
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def replay(self, tau_p=None):
+		session = replay.load(self.path)
+		numpy.random.seed(telemetry.read_info(self.path)['seed'])
+		r = run.build_robot(driver_module='replay')
+		if tau_p is not None:
+			r.state.TAU_P = tau_p
+		try:
+			r.run()
+			r.shutdown()
+		except replay.ReplayExhausted:
+			pass
+		return session
+
+	def test_replay(self):
+		"""Verify the same code replays the recording exactly."""
+
+		session = self.replay()
+		self.assertIsNone(session.divergence)
+		self.assertEqual(session.command_index, len(session.commands))
+		self.assertEqual(session.remaining, 0)
+		self.assertTrue(session.now > 10)	# in recorded time
+
+	def test_info(self):
+		"""Verify the log stores what replay needs to rebuild the run."""
+
+		self.assertEqual(telemetry.read_info(self.path),
+						 {'seed': 1, 'explore': False, 'solve': False,
+						  'continuous': False})
+
+	def test_divergence(self):
+		session = self.replay(tau_p=0.5)
+		self.assertIsNotNone(session.divergence)
+		index, recorded, replayed = session.divergence
+		self.assertEqual(recorded[0], replayed[0])
+		self.assertTrue(recorded[0].startswith('set_'))
+		self.assertTrue(session.mismatches > 0)
+
+	def test_strict(self):
+		replay.load(self.path, strict=True)
+		numpy.random.seed(1)
+		r = run.build_robot(driver_module='replay')
+		r.state.TAU_P = 0.5
+		with self.assertRaises(replay.ReplayDivergence):
+			r.run()
+
+	def test_query(self):
+		session = replay.load(self.path)
+		self.assertEqual(replay.volt(), simdriver.DEFAULT_VOLTAGE)
+		self.assertIsInstance(replay.enc_read(0), int)
+		session.queries.clear()
+		with self.assertRaises(replay.ReplayExhausted):
+			replay.us_dist(15)
@@ -1,10 +1,15 @@
 """Unit tests for the robot module."""
 
+import os
+import shutil
+import tempfile
 import unittest
 
-from mock import MagicMock
+from mock import MagicMock, patch
 
+import cache
 import robot
+import telemetry
 
 
 class RobotTests(unittest.TestCase):
@@ -21,6 +26,8 @@ class RobotTests(unittest.TestCase):
 		self.assertEqual(self.r.state, None)
 		self.assertEqual(self.r.distance_sensor, self.mock_sensor)
 		self.assertEqual(self.r.speed, [0, 0])
+		self.assertFalse(self.r.is_oriented)
+		self.assertEqual(self.r.heading.resolution, robot.HEADING_RESOLUTION)
 
 	def test_volt(self):
 		"""Verify volt() returns current battery voltage."""
@@ -69,6 +76,51 @@ class RobotTests(unittest.TestCase):
 		self.assertEqual(self.r.dist(45), 50)
 		self.mock_sensor.sense.assert_called_once_with(45)
 
+	def test_dist_cached(self):
+		"""Verify dist() reuses readings until the robot moves."""
+
+		ticks = {0: 10, 1: 10}
+		self.r.driver.enc_read = lambda motor: ticks[motor]
+		self.r.dist_cache = cache.MeasurementCache(ttl=60, max_ticks=1)
+		self.mock_sensor.sense.return_value = 50
+
+		self.assertEqual(self.r.dist(45), 50)
+		self.assertEqual(self.r.dist(45), 50)
+		self.assertEqual(self.mock_sensor.sense.call_count, 1)
+
+		ticks[0] = 12
+		self.assertEqual(self.r.dist(45), 50)
+		self.assertEqual(self.mock_sensor.sense.call_count, 2)
+		self.assertEqual(self.r.dist_cache.stats,
+						 {'hits': 1, 'misses': 2, 'evictions': 1})
+
+	def test_sweep(self):
+		"""Verify sweep() is delegated to the distance sensor."""
+
+		self.mock_sensor.sense_sweep.return_value = 'sweep'
+		self.assertEqual(self.r.sweep([0, 90]), 'sweep')
+		self.mock_sensor.sense_sweep.assert_called_once_with([0, 90])
+
+	def test_sweep_in_motion(self):
+		"""Verify the encoders are read as each reading is taken."""
+
+		ticks = {0: 10, 1: 10}
+		self.r.driver.enc_read = lambda motor: ticks[motor]
+		self.r.encoder_deltas()
+
+		def iter_sweep(angles):
+			for i, angle in enumerate(angles):
+				ticks[0] += 2
+				ticks[1] += 3 + i
+				yield angle, 50 + i, float(i)
+		self.mock_sensor.iter_sweep.side_effect = iter_sweep
+
+		sweep, deltas = self.r.sweep_in_motion([90, 0])
+		self.assertEqual(sweep['angle'].tolist(), [90, 0])
+		self.assertEqual(sweep['distance'].tolist(), [50, 51])
+		self.assertEqual(deltas.tolist(), [[2, 3], [2, 4]])
+		self.assertEqual(self.r.encoder_deltas(), (0, 0))
+
 	def test_stop(self):
 		"""Verify stop() is delegated to the driver."""
 
@@ -76,6 +128,32 @@ class RobotTests(unittest.TestCase):
 		self.mock_sensor.center.assert_called_once_with()
 		self.assertEqual(self.r.driver.calls[-1], 'stop()')
 
+	@patch('profiling.dump')
+	def test_shutdown_dumps_profile(self, mock_dump):
+		self.r.stop()
+		self.assertFalse(mock_dump.called)
+		self.r.shutdown()
+		mock_dump.assert_called_once_with()
+
+	def test_acquisition(self):
+		"""Verify background acquisition is started, read and stopped."""
+
+		with self.assertRaises(ValueError):
+			self.r.latest_dist(0)
+
+		self.r.start_acquisition([0, 90])
+		service = self.r.acquisition
+		self.assertEqual(service.angles, [0, 90])
+		service._record((90, 42, 1.0))
+		self.assertEqual(self.r.latest_dist(90), 42)
+		self.assertEqual(self.r.latest_dist(0), None)
+		with self.assertRaises(ValueError):
+			self.r.dist(0)
+
+		self.r.stop()
+		self.assertFalse(service.running)
+		self.mock_sensor.center.assert_called_once_with()
+
 	def test_fwd(self):
 		"""Verify fwd() is delegated to the driver."""
 
@@ -86,6 +164,21 @@ class RobotTests(unittest.TestCase):
 		self.assertEqual(self.r.driver.calls[-2],
 						 'set_speed({0})'.format(robot.DEFAULT_SPEED))
 
+		self.r.fwd(speed=robot.SWEEP_SPEED)
+		self.assertEqual(self.r.speed, [robot.SWEEP_SPEED, robot.SWEEP_SPEED])
+		self.assertEqual(self.r.driver.calls[-2],
+						 'set_speed({0})'.format(robot.SWEEP_SPEED))
+
+	def test_forward(self):
+		"""Verify forward() stops on an encoder target for the distance."""
+
+		self.r.forward(20)
+		self.assertEqual(self.r.driver.calls[-4:],
+						 ['stop()',
+						  'set_speed({0})'.format(robot.DEFAULT_SPEED),
+						  'enc_tgt(1, 1, 18)',
+						  'fwd()'])
+
 	def test_rotate(self):
 		"""Verify rotate() is executed correctly."""
 
@@ -142,6 +235,13 @@ class RobotTests(unittest.TestCase):
 		self.assertEqual(self.r.driver.calls[-2],
 						 'set_left_speed({0})'.format(expected_speed))
 
+		# Steer round a corner, with a larger limit
+		self.r.steer(5, max_turn_ratio=3)
+		self.assertEqual(
+			self.r.speed,
+			[robot.DEFAULT_SPEED, robot.DEFAULT_SPEED + 5 * robot.TURN_SPEED]
+		)
+
 		# Steer straight ahead
 		self.r.steer(0)
 		self.assertEqual(
@@ -152,3 +252,21 @@ class RobotTests(unittest.TestCase):
 						 'set_right_speed({0})'.format(robot.DEFAULT_SPEED))
 		self.assertEqual(self.r.driver.calls[-2],
 						 'set_left_speed({0})'.format(robot.DEFAULT_SPEED))
+
+	def test_telemetry(self):
+		"""Verify driver calls are recorded until shutdown."""
+
+		log_dir = tempfile.mkdtemp()
+		try:
+			path = os.path.join(log_dir, 'run.tlm')
+			r = robot.Robot(driver_module='tests.gopigo_stub', telemetry=path)
+			r.distance_sensor = self.mock_sensor
+			r.fwd()
+			r.shutdown()
+
+			names, records = telemetry.read(path)
+			self.assertEqual([names[i] for i in records['function']],
+							 ['volt', 'stop', 'set_speed', 'trim_write',
+							  'set_speed', 'fwd', 'stop'])
+		finally:
+			shutil.rmtree(log_dir)
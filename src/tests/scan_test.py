@@ -0,0 +1,71 @@
+"""Unit tests for the scan module."""
+
+import math
+import unittest
+
+import numpy
+
+import scan
+
+
+def wall_sweep(perpendicular, distance=30, step=10, n=19):
+	"""Return the distances to a flat wall sensed across a sweep."""
+
+	angles = numpy.radians((numpy.arange(n) - perpendicular) * step)
+	return numpy.minimum(distance / numpy.cos(angles).clip(1e-3), 300)
+
+
+class FindPerpendicularTest(unittest.TestCase):
+	"""Unit tests for the find_perpendicular function."""
+
+	def test_dip(self):
+		p = scan.find_perpendicular([6, 7, 8, 7, 6, 5, 4, 3, 4, 5])
+		self.assertEqual(p.index, 7)
+		self.assertEqual(p.offset, 0)
+		self.assertAlmostEqual(p.sigma, 1 / math.sqrt(12))
+		self.assertAlmostEqual(p.confidence, 1 - 3 / 5.0)
+
+	def test_plateau_at_ends(self):
+		"""Verify an even plateau's center is taken away from the end."""
+
+		self.assertEqual(scan.find_perpendicular([6, 6, 7, 8, 9]).index, 1)
+		self.assertEqual(scan.find_perpendicular([9, 8, 7, 6, 6]).index, 3)
+		self.assertEqual(scan.find_perpendicular([9, 5, 5, 5, 5, 9]).index, 2)
+
+	def test_no_dip(self):
+		"""Verify single readings at the ends are not taken as a dip."""
+
+		for distances in [[3, 4, 5, 6], [6, 5, 4], [5]]:
+			p = scan.find_perpendicular(distances)
+			self.assertEqual(p.index, len(distances) - 1)
+			self.assertEqual(p.confidence, 0)
+		with self.assertRaises(ValueError):
+			scan.find_perpendicular([])
+
+	def test_flat(self):
+		p = scan.find_perpendicular([5] * 6)
+		self.assertEqual(p.index, 3)
+		self.assertEqual(p.confidence, 0)
+
+	def test_does_not_modify(self):
+		distances = [3, 4, 5, 6, 7, 8, 8, 8, 7, 6]
+		scan.find_perpendicular(distances)
+		self.assertEqual(distances, [3, 4, 5, 6, 7, 8, 8, 8, 7, 6])
+
+	def test_fit(self):
+		"""Verify the fit finds the perpendicular between measurements."""
+
+		for perpendicular in [9.0, 9.3, 8.6]:
+			distances = wall_sweep(perpendicular)
+			p = scan.find_perpendicular(distances, step=10)
+			self.assertEqual(p.index, int(round(perpendicular)))
+			self.assertAlmostEqual(p.index + p.offset, perpendicular)
+			self.assertTrue(p.sigma < 1e-3)
+
+		# A dense, noisy sweep:
+		random = numpy.random.RandomState(0)
+		distances = wall_sweep(90.4, step=1, n=181)
+		distances += random.normal(0, 0.5, distances.shape)
+		p = scan.find_perpendicular(numpy.rint(distances), step=1)
+		self.assertTrue(abs(p.index + p.offset - 90.4) < 3 * p.sigma)
+		self.assertTrue(p.sigma < 1)
@@ -9,6 +9,28 @@ import sensor
 SENSOR_PIN = 0
 
 
+class MedianTest(unittest.TestCase):
+	"""Unit tests for median and dispersion."""
+
+	def test_median(self):
+		for values in ([5], [3, 7], [9, 1, 5], [4, 8, 2, 6], [7, 3, 9, 1, 5],
+					   [6, 2, 8, 4, 10, 12], [13, 5, 9, 1, 11, 3, 7]):
+			ordered = sorted(values)
+			m, r = divmod(len(values), 2)
+			expected = ordered[m] if r else (ordered[m - 1] + ordered[m]) / 2
+			self.assertEqual(sensor.median(values), expected)
+
+	def test_median_does_not_reorder(self):
+		values = [7, 3, 9, 1, 5]
+		sensor.median(values)
+		self.assertEqual(values, [7, 3, 9, 1, 5])
+
+	def test_dispersion(self):
+		self.assertEqual(sensor.dispersion([30]), 0.0)
+		self.assertAlmostEqual(sensor.dispersion([28, 30, 29]), 2 / 1.693)
+		self.assertAlmostEqual(sensor.dispersion(range(7)), 2.160, places=3)
+
+
 class BaseSensorTest(unittest.TestCase):
 	"""Unit tests for the BaseSensor class."""
 
@@ -76,6 +98,82 @@ class UltrasonicSensorTest(unittest.TestCase):
 
 		self.assertEqual(self.s.sense_distance(60), expected_measurement)
 
+	def test_sense_reading(self):
+		measurements = [29, 31, 28]
+		self.driver.us_dist.side_effect = lambda x: measurements.pop()
+
+		reading = self.s.sense_reading(60)
+
+		self.assertEqual(reading.distance, int(ultrasonic_sensor_error(29)))
+		self.assertAlmostEqual(reading.dispersion, 1.1 * 3 / 1.693)
+		self.assertEqual(reading.pings, sensor.PINGS)
+
+	def test_sense_reading_adaptive_agree(self):
+		"""Verify an adaptive reading stops when two pings agree."""
+
+		self.s.adaptive = True
+		measurements = [50, 41, 40]
+		self.driver.us_dist.side_effect = lambda x: measurements.pop()
+
+		reading = self.s.sense_reading(60)
+
+		self.assertEqual(reading.pings, 2)
+		self.assertEqual(reading.distance, int(ultrasonic_sensor_error(40)))
+		self.assertEqual(self.driver.us_dist.call_count, 2)
+
+	def test_sense_reading_adaptive_disagree(self):
+		"""Verify an adaptive reading takes max_pings when two disagree."""
+
+		self.s.adaptive = True
+		measurements = [41, 40, 42, 120, 40]
+		self.driver.us_dist.side_effect = lambda x: measurements.pop()
+
+		reading = self.s.sense_reading(60)
+
+		self.assertEqual(reading.pings, sensor.MAX_PINGS)
+		self.assertEqual(reading.distance, int(ultrasonic_sensor_error(41)))
+		self.assertGreater(reading.dispersion, 0)
+
+	def test_sense_reading_adaptive_max_range(self):
+		"""Verify that pings beyond MAX_RANGE agree with each other."""
+
+		self.s.adaptive = True
+		measurements = [682, 681]
+		self.driver.us_dist.side_effect = lambda x: measurements.pop()
+
+		reading = self.s.sense_reading(60)
+
+		self.assertEqual(reading.pings, 2)
+		self.assertEqual(reading.dispersion, 0)
+
+	def test_init_max_pings(self):
+		with self.assertRaises(ValueError):
+			sensor.UltrasonicSensor(adaptive=True, max_pings=1)
+
+	def test_sense_sweep(self):
+		"""Verify a sweep is taken in one pass and returned in request order."""
+
+		self.mount.plan.return_value.order = [270, 0, 90]
+		measurements = {270: 30, 0: 100, 90: 20}
+		self.driver.us_dist.side_effect = (
+			lambda x: measurements[self.mount.move.call_args[1]['x']])
+
+		sweep = self.s.sense_sweep([0, 90, 270, 0])
+
+		self.assertEqual(sweep.dtype, sensor.SWEEP_DTYPE)
+		self.assertEqual(sweep['angle'].tolist(), [0, 90, 270, 0])
+		self.assertEqual(sweep['distance'].tolist(),
+						 [int(ultrasonic_sensor_error(measurements[a]))
+						  for a in [0, 90, 270, 0]])
+		self.assertEqual(self.mount.move.call_args_list,
+						 [call(x=270), call(x=0), call(x=90)])
+		self.assertEqual(self.driver.us_dist.call_count, 9)
+
+	def test_sense_sweep_fixed_sensor(self):
+		self.s.mount = None
+		with self.assertRaises(ValueError):
+			self.s.sense_sweep([0])
+
 	@patch('sensor.UltrasonicSensor.sense_distance')
 	def test_sense_swath(self, mock_sense_distance):
 		measurements = [101, 100, 102]
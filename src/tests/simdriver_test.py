@@ -0,0 +1,245 @@
+"""Unit tests for the simdriver module."""
+
+import math
+import time
+import unittest
+
+import numpy
+
+import machine
+from maze import Maze, MazeGrid
+import robot
+import simdriver
+import state
+
+
+class SimDriverTest(unittest.TestCase):
+	"""Unit tests for the simulated driver functions."""
+
+	def setUp(self):
+		self.world = simdriver.reset(
+			maze=simdriver.corridor(width=60, closed_end=True),
+			pose=(50, 20, 0))
+
+	def test_us_dist(self):
+		self.assertEqual(simdriver.us_dist(15), 250)	# straight ahead
+		simdriver.servo(0)		# mount angle 90, to the right
+		simdriver.clock.sleep(0.5)
+		self.assertEqual(simdriver.us_dist(15), 20)
+		simdriver.servo(180)	# mount angle 270, to the left
+		simdriver.clock.sleep(0.1)	# not long enough to complete the move
+		self.assertNotEqual(simdriver.us_dist(15), 40)
+		simdriver.clock.sleep(0.5)
+		self.assertEqual(simdriver.us_dist(15), 40)
+
+	def test_fwd(self):
+		simdriver.set_speed(40)
+		simdriver.fwd()
+		simdriver.clock.sleep(2)
+		self.assertAlmostEqual(self.world.pose[0], 50 + 2 * 40 * 0.25)
+		self.assertEqual(simdriver.enc_read(0),
+						 int(20 / robot.DISTANCE_PER_TICK))
+		self.assertEqual(self.world.time, 2)
+
+	def test_rotate(self):
+		r = robot.Robot(driver_module='simdriver')
+		r.rotate(90)
+		simdriver.clock.sleep(5)
+		self.assertAlmostEqual(self.world.pose[2], math.radians(90),
+							   delta=math.radians(10))
+		self.assertEqual(self.world.direction, [0, 0])
+
+	def test_collision(self):
+		self.world.pose[2] = -math.pi / 2
+		simdriver.set_speed(100)
+		simdriver.fwd()
+		simdriver.clock.sleep(2)
+		self.assertTrue(self.world.collided)
+		self.assertTrue(self.world.pose[1] >= simdriver.ROBOT_RADIUS)
+
+	def test_time_limit(self):
+		simdriver.reset(time_limit=1)
+		simdriver.clock.sleep(0.5)
+		with self.assertRaises(simdriver.SimulationTimeout):
+			simdriver.clock.sleep(0.6)
+
+
+class ClosedLoopTest(unittest.TestCase):
+	"""Run CorridorState end to end against the simulation."""
+
+	def test_corridor(self):
+		"""Verify CorridorState drives the corridor without collisions,
+		whatever the noise and the sensing directions sampled."""
+
+		start = time.time()
+		simulated = 0
+		for seed in range(8):
+			numpy.random.seed(seed)	# CorridorState samples its directions
+			r = simdriver.build_robot(pose=(20, 25, 0.2), sensor_noise=1.0,
+									  motion_noise=0.02, seed=seed,
+									  time_limit=120)
+			self.assertIs(r.clock, simdriver.clock)
+			state.CorridorState(r).run()
+
+			world = simdriver.world
+			self.assertFalse(world.collided, 'collided with seed {0}'.format(
+				seed))
+			# Within a width of the end:
+			self.assertTrue(world.pose[0] > 300 - 60)
+			self.assertTrue(world.time > 10)
+			simulated += world.time
+		self.assertTrue(time.time() - start < simulated / 10)
+
+	def test_junction(self):
+		"""Verify the maze machine turns into the branch of an L."""
+
+		numpy.random.seed(0)
+		walls = [(0, 0, 300, 0), (300, 0, 300, 300), (0, 60, 240, 60),
+				 (240, 60, 240, 300), (0, 0, 0, 60)]
+		r = simdriver.build_robot(maze=Maze(walls), pose=(20, 30, 0.1),
+								  sensor_noise=1.0, motion_noise=0.02, seed=0,
+								  time_limit=120)
+		m = machine.maze_machine(r, max_transitions=3)
+		self.assertEqual(m.run(), state.TURNED)
+		self.assertEqual(m.history, [
+			('corridor', state.OPENING_LEFT),
+			('junction', state.OPENING_LEFT),
+			('turn', state.TURNED),
+		])
+
+		world = simdriver.world
+		self.assertFalse(world.collided)
+		self.assertTrue(240 < world.pose[0] < 300)	# up the branch
+		self.assertTrue(world.pose[1] > 60)
+		self.assertTrue(abs(world.pose[2] - math.pi / 2) < 0.3)
+
+	def test_maze(self):
+		"""Verify the robot keeps clear of the walls round the junctions and
+		dead ends of a maze."""
+
+		grid = MazeGrid.parse('''
++--+--+--+--+
+|  |        |
++  +  +  +--+
+|  |  |     |
++  +--+--+  +
+|     |     |
++--+  +  +  +
+|        |  |
++--+--+--+--+
+''', cell_size=60)
+		x, y = grid.cell_center(3, 0)
+		for seed in range(4):
+			numpy.random.seed(seed)
+			r = simdriver.build_robot(maze=grid.to_maze(), pose=(x, y, 0.1),
+									  sensor_noise=1.0, motion_noise=0.02,
+									  seed=seed, time_limit=600)
+			m = machine.maze_machine(r, max_transitions=24)
+			m.run()
+
+			world = simdriver.world
+			self.assertFalse(world.collided)
+			self.assertEqual(len(m.history), 24)
+			self.assertIn(('dead end', state.TURNED), m.history)
+
+	def test_exploration(self):
+		"""Verify ExplorationState maps a small maze, and stops."""
+
+		grid = MazeGrid.parse('''
++--+--+--+
+|     |  |
++  +--+  +
+|        |
++--+--+--+
+''')
+		x, y = grid.cell_center(1, 0)
+		r = simdriver.build_robot(maze=grid.to_maze(), pose=(x, y, 0),
+								  sensor_noise=1.0, motion_noise=0.02, seed=1,
+								  time_limit=600)
+		explored = state.ExplorationState(r, pose=(x, y, 0)).run()
+
+		self.assertFalse(simdriver.world.collided)
+		for row in range(grid.rows):
+			for col in range(grid.cols):
+				self.assertTrue(explored.log_odds(*grid.cell_center(row, col))
+								< 0)
+		self.assertTrue(explored.log_odds(1, 20) > 0)	# the left wall
+		self.assertTrue(explored.log_odds(60, 1) > 0)	# the bottom wall
+
+	def test_exploration_maze(self):
+		"""Verify ExplorationState maps every cell of a maze, through its
+		junctions and round its corners."""
+
+		grid = MazeGrid.parse('''
++--+--+--+--+
+|  |        |
++  +  +  +--+
+|  |  |     |
++  +--+--+  +
+|     |     |
++--+  +  +  +
+|        |  |
++--+--+--+--+
+''')
+		x, y = grid.cell_center(3, 0)
+		for seed in range(4):
+			numpy.random.seed(seed)
+			r = simdriver.build_robot(maze=grid.to_maze(), pose=(x, y, 0),
+									  sensor_noise=1.0, motion_noise=0.02,
+									  seed=seed, time_limit=600)
+			explored = state.ExplorationState(r, pose=(x, y, 0)).run()
+
+			self.assertFalse(simdriver.world.collided)
+			for row in range(grid.rows):
+				for col in range(grid.cols):
+					self.assertTrue(
+						explored.log_odds(*grid.cell_center(row, col)) < 0)
+
+	def test_corridor_continuous(self):
+		"""Verify CorridorState senses the corridor on the move, and is faster
+		for it."""
+
+		times = []
+		for continuous in (False, True):
+			numpy.random.seed(2)
+			r = simdriver.build_robot(pose=(20, 25, -0.2), sensor_noise=1.0,
+									  motion_noise=0.02, seed=2, time_limit=120)
+			state.CorridorState(r, continuous=continuous).run()
+
+			world = simdriver.world
+			self.assertFalse(world.collided)
+			t, x, y, theta = numpy.array(world.trajectory).T
+			times.append(t[numpy.flatnonzero(x >= 300 - 60)[0]])
+			self.assertTrue(r.is_oriented)
+		self.assertTrue(times[1] < times[0] - 3)
+
+	def test_route(self):
+		"""Verify RouteState steers round the corners of a route to its goal."""
+
+		grid = MazeGrid.parse('''
++--+--+--+
+|        |
++--+--+  +
+|        |
++  +--+--+
+|        |
++--+--+--+
+''')
+		x, y = grid.cell_center(0, 0)
+		r = simdriver.build_robot(maze=grid.to_maze(), pose=(x, y, 0),
+								  motion_noise=0.02, seed=1, time_limit=120)
+		state.RouteState(r, grid, (2, 2), pose=(x, y, 0)).run()
+
+		world = simdriver.world
+		self.assertFalse(world.collided)
+		goal_x, goal_y = grid.cell_center(2, 2)
+		self.assertTrue(math.hypot(world.pose[0] - goal_x,
+								   world.pose[1] - goal_y) < 15)
+		self.assertTrue(world.time < 30)
+
+		# A route of one cell is already driven:
+		end = tuple(world.pose)
+		pose = (goal_x, goal_y, end[2])
+		self.assertEqual(state.RouteState(r, grid, (2, 2), pose=pose).run(),
+						 pose)
+		self.assertEqual(tuple(world.pose), end)
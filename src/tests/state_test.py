@@ -2,35 +2,165 @@
 
 import unittest
 
-from mock import MagicMock
+from mock import MagicMock, patch
+import numpy
 
+from heading import HeadingFilter
+from mount import SwivelMount
+import robot
+from scan import Perpendicular
+from sensor import SWEEP_DTYPE
+import state
 from state import BaseState, CorridorState
+from tests.walls_test import corridor_sweep
+from walls import Corridor
+
+
+def mock_robot():
+	"""Return a MagicMock robot with a uniform heading belief."""
+
+	robot = MagicMock()
+	robot.heading = HeadingFilter()
+	robot.is_oriented = False
+	robot.corridor_width = None
+	return robot
 
 
 class BaseStateTests(unittest.TestCase):
 	"""Unit tests for the BaseState class."""
 
 	def setUp(self):
-		self.mock_robot = MagicMock()
+		self.mock_robot = mock_robot()
 		self.state = BaseState(self.mock_robot)
 
 	def test_init(self):
 		self.assertEqual(self.state.robot, self.mock_robot)
 		self.assertFalse(self.state.is_oriented)
 
+	def test_is_oriented(self):
+		"""Verify orientation is kept on the robot, across states."""
+
+		self.state.is_oriented = True
+		self.assertTrue(self.mock_robot.is_oriented)
+		self.assertTrue(BaseState(self.mock_robot).is_oriented)
+
 	def test_run(self):
 		"""Verify that BaseState can't be used to run the robot."""
 		with self.assertRaises(NotImplementedError):
 			self.state.run()
 
+	def test_forward_clear(self):
+		"""Verify the robot stops short of a wall ahead, or a corner by its
+		path."""
+
+		self.mock_robot.degrees_turned = 0
+		for distances, expected in (({}, 100), ({0: 50}, 35),
+									({0: 50, 20: 30}, 13.2)):
+			self.mock_robot.forward.reset_mock()
+			self.mock_robot.sweep.side_effect = sweep_of(distances, 300)
+			self.state._forward_clear(100)
+			self.assertAlmostEqual(self.mock_robot.forward.call_args[0][0],
+								   expected, places=1)
+
+		self.mock_robot.forward.reset_mock()
+		self.mock_robot.sweep.side_effect = sweep_of({0: 10}, 300)
+		self.state._forward_clear(100)
+		self.mock_robot.forward.assert_not_called()
+
 
 class CorridorStateTests(unittest.TestCase):
 	"""Unit tests for the CorridorState class."""
 
 	def setUp(self):
-		self.mock_robot = MagicMock()
+		self.mock_robot = mock_robot()
 		self.state = CorridorState(self.mock_robot)
 
+	def test_heading_tables(self):
+		"""Verify the tables cover every bin of the heading belief."""
+
+		bins = 360 // robot.HEADING_RESOLUTION
+		for table in (CorridorState.DEGREES_FROM_STRAIGHT,
+					  CorridorState.RELATIVE_ANGLES,
+					  CorridorState.WALL_DIRECTION):
+			self.assertEqual(len(table), bins)
+		self.assertEqual(CorridorState.DEGREES_FROM_STRAIGHT[bins // 2], 0)
+		self.assertEqual(CorridorState.RELATIVE_ANGLES[bins // 2], 0)
+		self.assertEqual(CorridorState.WALL_DIRECTION[bins // 2], 270)
+		self.assertEqual(CorridorState.WALL_DIRECTION[bins // 2 - 1],
+						 90 - robot.HEADING_RESOLUTION)
+
+	def test_sense_initial_position(self):
+		"""Verify the walls are fitted, or single readings are used."""
+
+		sweep = numpy.zeros(14, dtype=SWEEP_DTYPE)
+		sweep['angle'] = CorridorState.WALL_ANGLES
+		sweep['distance'] = corridor_sweep(sweep['angle'], cte=10)
+		self.mock_robot.sweep.return_value = sweep
+		cte, width = self.state._sense_initial_position()
+		self.assertAlmostEqual(cte, 10, places=0)
+		self.assertAlmostEqual(width, 60, places=0)
+		self.mock_robot.rotate.assert_not_called()
+		self.assertEqual(self.state.heading.distribution.map(), 18)
+
+		self.assertAlmostEqual(self.mock_robot.corridor_width, 60, places=0)
+
+		# Walls 35 degrees to the right correct a wrong orientation, as far
+		# as the belief of the orientation allows:
+		self.state.is_oriented = False
+		self.mock_robot.degrees_turned = 0
+		sweep['distance'] = corridor_sweep(sweep['angle'], heading=35)
+		self.state._sense_initial_position()
+		turn = self.mock_robot.rotate.call_args[0][0]
+		self.assertTrue(-40 <= turn <= -20)
+		self.assertEqual(self.state.heading.distribution.map(), 18)
+
+		# Once oriented, walls as far off are of the wrong corridor, and the
+		# single readings are used:
+		self.mock_robot.rotate.reset_mock()
+		self.mock_robot.dist.side_effect = lambda angle: {90: 20, 270: 40}[angle]
+		self.assertEqual(self.state._sense_initial_position(), (-10, 60))
+		self.mock_robot.rotate.assert_not_called()
+
+		sweep['distance'] = corridor_sweep(sweep['angle'])
+		sweep['distance'][7:] = 300
+		self.assertEqual(self.state._sense_initial_position(), (-10, 60))
+
+		# Much wider than the known width, a side is open, and the nearer
+		# wall is kept to:
+		for distances, expected_cte in (({90: 20, 270: 100}, -10),
+										({90: 90, 270: 25}, 5)):
+			self.mock_robot.dist.side_effect = distances.get
+			cte, width = self.state._sense_initial_position()
+			self.assertAlmostEqual(cte, expected_cte, places=0)
+			self.assertAlmostEqual(width, 60, places=0)
+
+	@patch('state.fit_corridor')
+	def test_sense_in_flight(self, mock_fit_corridor):
+		"""Verify the sweep on the move orients the robot, or falls back to
+		stopping."""
+
+		sweep = numpy.zeros(14, dtype=SWEEP_DTYPE)
+		sweep['angle'] = CorridorState.WALL_ANGLES
+		self.mock_robot.sweep_in_motion.return_value = (
+			sweep, numpy.zeros((14, 2), dtype=int))
+		self.mock_robot.degrees_turned = 0
+
+		# The corridor 30 degrees to the right is too far off to steer into:
+		mock_fit_corridor.return_value = Corridor(60, 5, 30, numpy.eye(3))
+		self.assertEqual(self.state._sense_in_flight(), (5, 60))
+		self.mock_robot.fwd.assert_called_once_with(speed=robot.SWEEP_SPEED)
+		self.mock_robot.rotate.assert_called_once_with(-30)
+		self.assertTrue(self.state.is_oriented)
+		self.assertEqual(self.state.heading.distribution.map(), 18)
+
+		mock_fit_corridor.return_value = None
+		with patch.object(self.state, '_orient') as mock_orient, \
+				patch.object(self.state, '_sense_initial_position') as mock_sense:
+			mock_sense.return_value = (0, 50)
+			self.assertEqual(self.state._sense_in_flight(), (0, 50))
+			mock_orient.assert_called_once_with()
+			self.mock_robot.stop.assert_called_once_with()
+
 	def test_find_perpendicular(self):
 		"""Find not the minimum, but the center of the "dip"."""
 		test_cases = [
@@ -48,35 +178,50 @@ class CorridorStateTests(unittest.TestCase):
 			self.assertEqual(self.state._find_perpendicular(test_case[0]),
 							 test_case[1])
 
-	def test_find_p_heading(self):
-		orig_find_perpendicular = self.state._find_perpendicular
-		self.state._find_perpendicular = MagicMock()
-		heading_histogram = [0.2, 0.6, 0.2]
-
+	@patch('state.find_perpendicular')
+	def test_find_p_heading(self, mock_find_perpendicular):
 		test_cases = [
-			(0, [0] * 17 + heading_histogram + [0] * 16),   # Centered at 270
-			(11, [0] * 10 + heading_histogram + [0] * 23)  # Centered at 020
+			(Perpendicular(0, 0.0, 0.0, 1.0), 18),   # Corridor at 000
+			(Perpendicular(11, 0.0, 0.0, 1.0), 11),  # Corridor at 290
+			(Perpendicular(10, 0.5, 0.0, 1.0), 10.5)
 		]
 
-		for test_case in test_cases:
-			self.state._find_perpendicular.return_value = test_case[0]
-			self.assertEqual(self.state._find_p_heading(), test_case[1])
+		for perpendicular, center in test_cases:
+			mock_find_perpendicular.return_value = perpendicular
+			p_heading = self.state._find_p_heading()
+			self.assertAlmostEqual(p_heading.sum(), 1)
+			self.assertAlmostEqual((p_heading * numpy.arange(36)).sum(), center,
+								   places=3)
+			self.assertTrue(abs(numpy.argmax(p_heading) - center) <= 0.5)
+
+	@patch('state.find_perpendicular')
+	def test_find_p_heading_uncertain(self, mock_find_perpendicular):
+		"""Verify the belief widens with the error of the perpendicular."""
 
-		self.state._find_perpendicular = orig_find_perpendicular
+		mock_find_perpendicular.return_value = Perpendicular(0, 0.0, 1.0, 1.0)
+		sharp = self.state._find_p_heading()[18]
+		mock_find_perpendicular.return_value = Perpendicular(0, 0.0, 2.0, 1.0)
+		self.assertTrue(self.state._find_p_heading()[18] < sharp)
+
+		mock_find_perpendicular.return_value = Perpendicular(0, 0.0, 20.0, 0.0)
+		p_heading = self.state._find_p_heading()
+		self.assertEqual(p_heading[:9].tolist(), [0] * 9)	# Behind the robot
+		self.assertTrue(p_heading[9:28].min() > 0)
 
 	def test_rotate_p_heading(self):
 		p_histogram = [0.2, 0.6, 0.2]
-		self.state.p_heading = [0] * 17 + p_histogram + [0] * 16
 		test_cases = [
 			(-30, [0] * 14 + p_histogram + [0] * 19),
 			(30, [0] * 20 + p_histogram + [0] * 13)
 		]
 
 		for test_case in test_cases:
+			self.state.p_heading = [0] * 17 + p_histogram + [0] * 16
 			self.assertEqual(
-				self.state._rotate_p_heading(test_case[0]),
+				self.state._rotate_p_heading(test_case[0]).tolist(),
 				test_case[1]
 			)
+			self.assertEqual(self.state.p_heading.tolist(), test_case[1])
 
 	def test_get_wall_direction(self):
 		p_histogram = [0.2, 0.6, 0.2]
@@ -105,3 +250,137 @@ class CorridorStateTests(unittest.TestCase):
 				corridor_direction in test_case[1],
 				'{0} not in {1}'.format(corridor_direction, test_case[1])
 			)
+
+
+def sweep_of(distances, default=20):
+	"""Return a side effect for Robot.sweep() of a distance per angle."""
+
+	def sweep(angles):
+		result = numpy.zeros(len(angles), dtype=SWEEP_DTYPE)
+		result['angle'] = angles
+		result['distance'] = [distances.get(a, default) for a in angles]
+		return result
+	return sweep
+
+
+class JunctionStateTests(unittest.TestCase):
+	"""Unit tests for the JunctionState class."""
+
+	def setUp(self):
+		self.mock_robot = mock_robot()
+		self.mock_robot.heading.belief = numpy.eye(36)[18]	# straight ahead
+		self.mock_robot.degrees_turned = 0
+		self.mock_robot.distance_sensor.mount = SwivelMount(
+			driver=MagicMock(), servo_center=90, clock=MagicMock())
+		self.mock_robot.dist.return_value = 200
+		self.state = state.JunctionState(self.mock_robot)
+
+	@patch('state.fit_wall', return_value=None)
+	def test_preference(self, mock_fit_wall):
+		test_cases = [
+			({0: 200, 90: 200, 270: 200}, state.OPENING_LEFT),
+			({0: 200, 90: 200}, state.OPENING_AHEAD),
+			({90: 200}, state.OPENING_RIGHT),
+			({}, state.DEAD_END),
+		]
+
+		for distances, transition in test_cases:
+			self.mock_robot.sweep.side_effect = sweep_of(distances)
+			self.assertEqual(self.state.run(state.CORRIDOR_ENDED), transition)
+		self.mock_robot.forward.assert_not_called()
+
+	@patch('state.fit_wall', return_value=None)
+	def test_relative_to_corridor(self, mock_fit_wall):
+		"""Verify the ways are sensed relative to the corridor, and advanced
+		into when found on the move."""
+
+		self.mock_robot.heading.belief = numpy.eye(36)[17]	# 10 degrees left
+		self.mock_robot.sweep.side_effect = sweep_of({80: 200})
+		with patch.object(self.state, '_forward_clear') as mock_forward_clear:
+			self.assertEqual(self.state.run(state.OPENING_RIGHT),
+							 state.OPENING_RIGHT)
+			mock_forward_clear.assert_called_once_with(
+				state.JunctionState.ADVANCE)
+		self.assertEqual(self.mock_robot.sweep.call_args[0][0], [270, 350, 80])
+		self.assertEqual(self.mock_robot.corridor_width, 40)
+
+	def test_opening_middle(self):
+		"""Verify the far edge of a side opening is found, and the middle
+		isn't overshot."""
+
+		# A 40 cm corridor with an opening on the right, from 10 cm behind
+		# the robot to 30 cm ahead of it:
+		self.mock_robot.corridor_width = 40
+		self.mock_robot.sweep.side_effect = sweep_of(
+			{90: 300, 80: 173, 70: 88, 60: 60, 50: 47, 40: 39, 30: 40})
+		middle = self.state._opening_middle(state.OPENING_RIGHT)
+		self.assertEqual(self.mock_robot.sweep.call_args[0][0],
+						 [90, 80, 70, 60, 50, 40, 30])
+		self.assertTrue(0 < middle <= 10)
+
+		# Nor is the far edge found of an opening wider than the sweep:
+		self.mock_robot.sweep.side_effect = sweep_of({}, 300)
+		self.assertIsNone(self.state._opening_middle(state.OPENING_RIGHT))
+
+	def test_refit_heading(self):
+		"""Verify the heading belief is refitted to the walls, as far as it
+		resolves the direction of the corridor."""
+
+		self.mock_robot.heading.belief = numpy.eye(36)[17]	# 10 degrees left
+		def sweep(angles):
+			result = numpy.zeros(len(angles), dtype=SWEEP_DTYPE)
+			result['angle'] = angles
+			result['distance'] = corridor_sweep(result['angle'])
+			return result
+		self.mock_robot.sweep.side_effect = sweep
+		self.state._refit_heading()
+		self.assertEqual(self.mock_robot.heading.distribution.map(), 18)
+		self.mock_robot.encoder_deltas.assert_called_once_with()
+
+
+class TurnStateTests(unittest.TestCase):
+	"""Unit tests for the TurnState and DeadEndState classes."""
+
+	def setUp(self):
+		self.mock_robot = mock_robot()
+		self.mock_robot.degrees_turned = 0
+
+	def test_turn(self):
+		"""Verify the turn is corrected by the heading, and the belief stays
+		on the new corridor."""
+
+		self.mock_robot.heading.belief = numpy.eye(36)[17]	# 10 degrees left
+		turn = state.TurnState(self.mock_robot)
+		self.assertEqual(turn.run(state.OPENING_LEFT), state.TURNED)
+		self.mock_robot.rotate.assert_called_once_with(100)
+		self.mock_robot.forward.assert_called_once_with(turn.EXIT)
+		self.assertEqual(self.mock_robot.heading.distribution.map(), 18)
+		self.assertAlmostEqual(self.mock_robot.heading.belief[18], 0.5)
+
+	def test_exit(self):
+		"""Verify the robot drives on by the width of the corridor, or to
+		the middle of a dead end."""
+
+		self.mock_robot.heading.belief = numpy.eye(36)[18]
+		self.mock_robot.corridor_width = 60
+		turn = state.TurnState(self.mock_robot)
+		with patch.object(turn, '_forward_clear') as mock_forward_clear:
+			turn.run(state.OPENING_AHEAD)
+			mock_forward_clear.assert_called_once_with(60, 30)
+
+	def test_dead_end(self):
+		self.mock_robot.heading.belief = numpy.eye(36)[18]
+		dead_end = state.DeadEndState(self.mock_robot)
+		self.assertEqual(dead_end.run(state.DEAD_END), state.TURNED)
+		self.mock_robot.rotate.assert_called_once_with(-180)
+		self.mock_robot.forward.assert_not_called()
+		self.assertEqual(self.mock_robot.heading.distribution.map(), 18)
+
+	def test_shorter_way_round(self):
+		"""Verify a turn and its correction are wrapped to the shorter way."""
+
+		self.mock_robot.heading.belief = numpy.eye(36)[1]	# 170 degrees left
+		dead_end = state.DeadEndState(self.mock_robot)
+		dead_end.run(state.DEAD_END)
+		self.mock_robot.rotate.assert_called_once_with(-10)
+		self.assertEqual(self.mock_robot.heading.distribution.map(), 18)
@@ -0,0 +1,94 @@
+"""Unit tests for the telemetry module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from clock import SimulatedClock
+import telemetry
+from tests import gopigo_stub
+
+
+class RecorderTest(unittest.TestCase):
+	"""Unit tests for the Recorder class."""
+
+	def setUp(self):
+		self.dir = tempfile.mkdtemp()
+		self.path = os.path.join(self.dir, 'run.tlm')
+		self.clock = SimulatedClock()
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def test_record(self):
+		"""Verify calls pass through and are read back from the log."""
+
+		recorder = telemetry.Recorder(gopigo_stub, self.path, clock=self.clock)
+		self.assertEqual(recorder.us_dist(15), 600)
+		self.clock.sleep(0.5)
+		recorder.enc_tgt(1, 0, 18)
+		recorder.stop()
+		self.assertIs(recorder.calls, gopigo_stub.calls)	# not a function
+		recorder.close()
+
+		names, records = telemetry.read(self.path)
+		self.assertEqual(names[:3], ['enc_read', 'enc_tgt', 'fwd'])
+		self.assertEqual([names[i] for i in records['function']],
+						 ['us_dist', 'enc_tgt', 'stop'])
+		self.assertEqual(records['time'].tolist(), [0, 0.5, 0.5])
+		self.assertEqual(records['nargs'].tolist(), [1, 3, 0])
+		numpy.testing.assert_equal(records['args'],
+								   [[15, numpy.nan, numpy.nan], [1, 0, 18],
+									[numpy.nan] * 3])
+		numpy.testing.assert_equal(records['result'], [600, numpy.nan,
+													   numpy.nan])
+
+	def test_flush(self):
+		"""Verify records are appended across flushes and wrap the buffer."""
+
+		recorder = telemetry.Recorder(gopigo_stub, self.path, capacity=4,
+									  clock=self.clock)
+		for i in range(3):
+			recorder.servo(i)
+		recorder.flush()
+		self.assertEqual(len(telemetry.read(self.path)[1]), 3)
+		for i in range(3, 6):
+			recorder.servo(i)
+		recorder.close()
+
+		names, records = telemetry.read(self.path)
+		self.assertEqual(records['args'][:, 0].tolist(), range(6))
+		self.assertEqual(recorder.dropped, 0)
+
+	def test_dropped(self):
+		recorder = telemetry.Recorder(gopigo_stub, self.path, capacity=2,
+									  clock=self.clock)
+		for i in range(5):
+			recorder.servo(i)
+		recorder.close()
+		self.assertEqual(recorder.dropped, 3)
+		self.assertEqual(len(telemetry.read(self.path)[1]), 2)
+
+	def test_info(self):
+		"""Verify facts about the run are read back from the header."""
+
+		recorder = telemetry.Recorder(gopigo_stub, self.path, clock=self.clock,
+									  info={'seed': 1234})
+		recorder.servo(90)
+		recorder.close()
+
+		self.assertEqual(telemetry.read_info(self.path), {'seed': 1234})
+		names, records = telemetry.read(self.path)
+		self.assertEqual(records['args'][:, 0].tolist(), [90])
+
+		telemetry.Recorder(gopigo_stub, self.path, clock=self.clock).close()
+		self.assertEqual(telemetry.read_info(self.path), {})
+
+	def test_read_invalid(self):
+		with open(self.path, 'wb') as f:
+			f.write('not a log at all')
+		with self.assertRaises(ValueError):
+			telemetry.read(self.path)
@@ -0,0 +1,70 @@
+"""Unit tests for the tracking module."""
+
+import unittest
+
+import numpy
+
+import npmatrix
+from matrix import matrix
+import tracking
+
+
+class KalmanFilterTest(unittest.TestCase):
+	"""Unit tests for the KalmanFilter class."""
+
+	def test_matches_closed_form(self):
+		"""Verify the closed form CrossTrackFilter is the same filter."""
+
+		ctf = tracking.CrossTrackFilter(cte=5, gate=None)
+		for matrix_class in [matrix, npmatrix.matrix]:
+			ctf.reset(5)
+			kf = tracking.KalmanFilter(
+				x=matrix_class([[5.0], [0.0]]),
+				P=matrix_class(ctf.P),
+				H=matrix_class([[1.0, 0.0]]),
+				R=matrix_class([[ctf.r]]))
+
+			for z, dt in [(4.0, 0.5), (2.5, 0.7), (3.0, 0.4), (0.5, 1.0)]:
+				F, Q = tracking.constant_velocity(dt, tracking.CTE_PROCESS_NOISE)
+				kf.predict(matrix_class(F.value), matrix_class(Q.value))
+				kf.update(matrix_class([[z]]))
+				ctf.step(z, dt)
+
+				numpy.testing.assert_allclose(
+					numpy.array(kf.x.value, dtype=float).ravel(),
+					[ctf.cte, ctf.rate])
+				numpy.testing.assert_allclose(
+					numpy.array(kf.P.value, dtype=float), ctf.P)
+
+
+class CrossTrackFilterTest(unittest.TestCase):
+	"""Unit tests for the CrossTrackFilter class."""
+
+	def test_tracks_rate(self):
+		"""Verify the rate converges on a steady drift."""
+
+		f = tracking.CrossTrackFilter(cte=0, measurement_noise=1,
+									  process_noise=0.5)
+		random = numpy.random.RandomState(0)
+		t = 0
+		for i in range(40):
+			dt = random.uniform(0.3, 0.8)
+			t += dt
+			f.step(2.0 * t + random.normal(0, 1), dt)
+		self.assertTrue(abs(f.rate - 2.0) < 0.5)
+		self.assertTrue(abs(f.cte - 2.0 * t) < 2 * f.sigma + 1)
+
+	def test_gate(self):
+		"""Verify a spike is rejected without disturbing the estimate."""
+
+		f = tracking.CrossTrackFilter(cte=0)
+		for i in range(10):
+			f.step(0.0, 0.5)
+		cte, rate = f.step(40.0, 0.5)
+		self.assertEqual(f.rejected, 1)
+		self.assertAlmostEqual(cte, 0)
+		self.assertAlmostEqual(rate, 0)
+
+		f.gate = None
+		self.assertTrue(f.update(40.0))
+		self.assertTrue(f.cte > 1)
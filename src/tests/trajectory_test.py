@@ -0,0 +1,149 @@
+"""Unit tests for the trajectory module."""
+
+import math
+import unittest
+
+import numpy
+
+from maze import MazeGrid
+import robot
+import trajectory
+
+# An L-shaped path, turning left after 50 cm:
+CORNER = [(0, 0), (50, 0), (50, 50)]
+
+
+class SmoothTest(unittest.TestCase):
+	"""Unit tests for the path functions."""
+
+	def test_densify(self):
+		path = trajectory.densify(CORNER, spacing=20)
+		self.assertEqual(len(path), 7)
+		numpy.testing.assert_allclose(path[:4], [
+			(0, 0), (50 / 3.0, 0), (100 / 3.0, 0), (50, 0)])
+		numpy.testing.assert_allclose(path[-1], (50, 50))
+
+	def test_smooth(self):
+		path = trajectory.densify(CORNER)
+		smoothed = trajectory.smooth(path)
+		self.assertEqual(smoothed.shape, path.shape)
+		numpy.testing.assert_allclose(smoothed[[0, -1]], path[[0, -1]])
+
+		# The corner is cut, but the path stays near it:
+		corner = numpy.hypot(*(smoothed - (50, 0)).T).min()
+		self.assertTrue(2 < corner < 15)
+
+		# A straight path stays straight:
+		line = trajectory.densify([(0, 0), (30, 40)])
+		numpy.testing.assert_allclose(trajectory.smooth(line), line, atol=1e-9)
+
+	def test_route_path(self):
+		grid = MazeGrid.parse('''
++--+--+
+|     |
++--+  +
+|     |
++--+--+
+''')
+		path = trajectory.route_path(grid, [(0, 0), (0, 1), (1, 1), (1, 0)])
+		numpy.testing.assert_allclose(path[0], grid.cell_center(0, 0))
+		numpy.testing.assert_allclose(path[-1], grid.cell_center(1, 0))
+		for x, y in path:
+			self.assertNotEqual(grid.cell_at(x, y), None)
+
+
+class TrajectoryTest(unittest.TestCase):
+	"""Unit tests for the Trajectory class."""
+
+	def test_straight(self):
+		t = trajectory.Trajectory([(0, 0), (0, 100)], speed=20)
+		self.assertAlmostEqual(t.length, 100)
+		self.assertAlmostEqual(t.duration, 5)
+		x, y, heading, curvature, time = t.at(52.5)
+		self.assertAlmostEqual(x, 0)
+		self.assertAlmostEqual(y, 52.5)
+		self.assertAlmostEqual(heading, math.pi / 2)
+		self.assertAlmostEqual(curvature, 0)
+		self.assertAlmostEqual(time, 2.625)
+		self.assertEqual(t.at(-10)[:2], (0, 0))
+		self.assertEqual(t.at(1000)[:2], (0, 100))
+
+	def test_zero_length(self):
+		for path in ([(5, 5)], [(5, 5), (5, 5)]):
+			with self.assertRaises(ValueError):
+				trajectory.Trajectory(path)
+
+	def test_curve(self):
+		"""Verify curvature along an arc, and that the robot speeds round it."""
+
+		angles = numpy.linspace(0, math.pi, 200)
+		arc = numpy.column_stack((50 * numpy.cos(angles),
+								  50 * numpy.sin(angles)))
+		t = trajectory.Trajectory(arc, speed=20)
+		self.assertAlmostEqual(t.length, 50 * math.pi, places=1)
+		self.assertAlmostEqual(t.at(t.length / 2)[3], 1 / 50.0, places=3)
+		self.assertAlmostEqual(math.cos(t.at(t.length / 2)[2]), -1, places=3)
+		ratio = trajectory.turn_ratio(1 / 50.0)
+		self.assertAlmostEqual(t.duration, t.length / 20 * 2 / (1 + ratio),
+							   delta=0.1)
+
+	def test_turn_ratio(self):
+		self.assertEqual(trajectory.turn_ratio(0), 1)
+		radius = 2 * robot.WHEEL_BASE
+		self.assertAlmostEqual(trajectory.turn_ratio(-1 / radius),
+							   (radius + robot.WHEEL_BASE / 2) /
+							   (radius - robot.WHEEL_BASE / 2))
+		self.assertEqual(trajectory.turn_ratio(3 / robot.WHEEL_BASE),
+						 float('inf'))
+
+	def test_steering_factor(self):
+		self.assertEqual(trajectory.steering_factor(0), 0)
+		factor = trajectory.steering_factor(1.0, max_turn_ratio=2)
+		self.assertAlmostEqual(factor, robot.DEFAULT_SPEED /
+							   float(robot.TURN_SPEED))
+		self.assertAlmostEqual(trajectory.steering_factor(-1.0, 2), -factor)
+
+
+class FollowerTest(unittest.TestCase):
+	"""Unit tests for the Follower class."""
+
+	def test_straight(self):
+		follower = trajectory.Follower(
+			trajectory.Trajectory([(0, 0), (100, 0)]))
+		self.assertEqual(follower.steer((0, 0, 0)), 0)
+		self.assertTrue(follower.steer((10, 2, 0)) < 0)	# left of the line
+		self.assertAlmostEqual(follower.s, 10)
+		self.assertTrue(follower.steer((10, -2, 0)) > 0)
+		self.assertFalse(follower.done)
+
+		# The projection never goes backwards, nor jumps ahead:
+		follower.project(0, 0)
+		self.assertAlmostEqual(follower.s, 10)
+		follower.project(90, 0)
+		self.assertAlmostEqual(follower.s, 10 + follower.lookahead)
+
+		for x in range(30, 110, 10):
+			follower.project(x, 0)
+		self.assertTrue(follower.done)
+
+	def test_drive(self):
+		"""Verify a simple motion model following a corner reaches its end."""
+
+		t = trajectory.Trajectory(trajectory.smooth(
+			trajectory.densify(CORNER)))
+		follower = trajectory.Follower(t)
+		x, y, theta = 0.0, 0.0, 0.0
+		for i in range(500):
+			if follower.done:
+				break
+			factor = follower.steer((x, y, theta))
+			ratio = 1 + abs(factor) * robot.TURN_SPEED / robot.DEFAULT_SPEED
+			turn = math.copysign((ratio - 1) * 0.5 / robot.WHEEL_BASE, factor)
+			theta += turn
+			x += math.cos(theta) * (1 + ratio) / 2 * 0.5
+			y += math.sin(theta) * (1 + ratio) / 2 * 0.5
+			distance = numpy.hypot(t.x - x, t.y - y).min()
+			self.assertTrue(distance < 3, distance)
+
+		self.assertTrue(follower.done)
+		self.assertTrue(math.hypot(x - 50, y - 50) < trajectory.SPACING * 2)
@@ -0,0 +1,104 @@
+"""Unit tests for the walls module."""
+
+import math
+import unittest
+
+import numpy
+
+import walls
+
+
+def corridor_sweep(angles, cte=0, heading=0, width=60):
+	"""Return the distances to the walls of a corridor across a sweep.
+
+	The robot is cte cm left of center, and the corridor runs heading
+	degrees clockwise from straight ahead.
+	"""
+
+	relative = numpy.radians(numpy.asarray(angles, dtype=float) - heading)
+	sin = numpy.sin(relative)
+	left = (width / 2.0 - cte) / -sin
+	right = (width / 2.0 + cte) / sin
+	return numpy.where(sin < 0, left, right)
+
+
+class WallsTest(unittest.TestCase):
+	"""Unit tests for fitting corridor walls."""
+
+	def setUp(self):
+		self.angles = range(270, 340, 10) + range(30, 100, 10)
+
+	def test_to_points(self):
+		points = walls.to_points([0, 90, 270], [10, 20, 30])
+		numpy.testing.assert_allclose(points, [[10, 0], [0, -20], [0, 30]],
+									  atol=1e-9)
+
+	def test_find_line(self):
+		points = numpy.array([[0, 10], [10, 10], [20, 10.5], [30, 40], [40, 10]])
+		self.assertEqual(walls.find_line(points).tolist(),
+						 [True, True, True, False, True])
+		self.assertEqual(walls.find_line(points[:1]).tolist(), [False])
+
+	def test_fit_corridor(self):
+		for cte, heading in [(0, 0), (10, 5), (-12, -15)]:
+			distances = corridor_sweep(self.angles, cte, heading)
+			corridor = walls.fit_corridor(self.angles, distances)
+			self.assertAlmostEqual(corridor.width, 60)
+			self.assertAlmostEqual(corridor.cte, cte)
+			self.assertAlmostEqual(corridor.heading, heading)
+			numpy.testing.assert_allclose(corridor.covariance, 0, atol=1e-9)
+
+	def test_fit_corridor_outliers(self):
+		"""Verify stray readings are rejected and noise gives a covariance."""
+
+		random = numpy.random.RandomState(0)
+		distances = corridor_sweep(self.angles, 5, 10)
+		distances += random.normal(0, 0.5, len(distances))
+		distances[2] = 300		# no echo
+		distances[10] = 15		# a reflection
+		corridor = walls.fit_corridor(self.angles, distances)
+		self.assertTrue(abs(corridor.width - 60) < 2)
+		self.assertTrue(abs(corridor.cte - 5) < 1)
+		self.assertTrue(abs(corridor.heading - 10) < 2)
+		sigma = numpy.sqrt(numpy.diag(corridor.covariance))
+		self.assertTrue((sigma > 0).all())
+		self.assertTrue(abs(corridor.heading - 10) < 4 * sigma[2])
+
+	def test_fit_corridor_one_wall(self):
+		distances = corridor_sweep(self.angles)
+		distances[:7] = 300		# nothing on the left
+		self.assertIsNone(walls.fit_corridor(self.angles, distances))
+
+	def test_fit_wall(self):
+		distances = corridor_sweep(self.angles, 10, 20)
+		distances[:7] = 300		# only the right wall
+		distances[9] = 20		# a reflection
+		self.assertAlmostEqual(walls.fit_wall(self.angles, distances), 20)
+		self.assertIsNone(walls.fit_wall(self.angles[:2], distances[:2]))
+
+	def test_compensate_motion(self):
+		"""Verify a sweep taken on the move fits the corridor at its end."""
+
+		angles = numpy.array(self.angles)
+		steps = numpy.arange(len(angles))
+		poses = numpy.column_stack((3.0 * steps, 5 + 0.5 * steps,
+									0.1 - 0.01 * steps))
+		distances = [corridor_sweep([angle], cte=y,
+									heading=math.degrees(theta))[0]
+					 for angle, (x, y, theta) in zip(angles, poses)]
+
+		compensated = walls.compensate_motion(angles, distances, poses)
+		corridor = walls.fit_corridor(*compensated)
+		self.assertAlmostEqual(corridor.width, 60)
+		self.assertAlmostEqual(corridor.cte, poses[-1, 1])
+		self.assertAlmostEqual(corridor.heading, math.degrees(poses[-1, 2]))
+		uncompensated = walls.fit_corridor(angles, distances)
+		self.assertTrue(abs(uncompensated.cte - poses[-1, 1]) > 1)
+
+		# From a standing robot, and beyond range, readings are unchanged:
+		distances[0] = walls.UltrasonicSensor.MAX_RANGE
+		still = walls.compensate_motion(angles, distances, [(10, 20, 1)] * 14)
+		numpy.testing.assert_allclose(still[0], angles)
+		numpy.testing.assert_allclose(still[1], distances)
+		moved = walls.compensate_motion(angles, distances, poses)
+		self.assertEqual(moved[1][0], distances[0])
@@ -0,0 +1,164 @@
+"""Kalman filters for tracking the robot's position in a corridor."""
+
+import math
+
+from matrix import matrix
+
+CTE_MEASUREMENT_NOISE = 3.0	# Std dev of a sensed cross-track error, in cm
+CTE_PROCESS_NOISE = 10.0	# Std dev of the change in rate, in cm/s per sec
+RATE_SIGMA = 10.0			# Initial std dev of the rate, in cm/s
+GATE = 9.0					# Squared std devs beyond which a reading is rejected
+
+
+class KalmanFilter(object):
+	"""A linear Kalman filter over matrix objects.
+
+	Works with matrix.matrix or npmatrix.matrix, and with any number of
+	states and measurements.
+	"""
+
+	def __init__(self, x, P, H, R):
+		"""Create a KalmanFilter.
+
+		Args:
+		x - the initial state estimate, as a column matrix.
+		P - the initial covariance of the state estimate.
+		H - the measurement function, mapping states to measurements.
+		R - the covariance of the measurement noise.
+		"""
+
+		self.x = x
+		self.P = P
+		self.H = H
+		self.R = R
+		self.I = x.__class__([[0.0]])
+		self.I.identity(x.dimx)
+
+	def predict(self, F, Q):
+		"""Project the estimate forward.
+
+		Args:
+		F - the state transition matrix over the elapsed time.
+		Q - the covariance of the process noise over the elapsed time.
+		"""
+
+		self.x = F * self.x
+		self.P = F * self.P * F.transpose() + Q
+
+	def update(self, z):
+		"""Correct the estimate with a measurement z, as a column matrix."""
+
+		y = z - self.H * self.x
+		S = self.H * self.P * self.H.transpose() + self.R
+		K = self.P * self.H.transpose() * S.inverse()
+		self.x = self.x + K * y
+		self.P = (self.I - K * self.H) * self.P
+
+
+def constant_velocity(dt, process_noise):
+	"""Return the (F, Q) matrices of a constant velocity model.
+
+	Args:
+	dt - the elapsed time, in secs.
+	process_noise - the std dev of the change in velocity per sec.
+	"""
+
+	q = process_noise ** 2
+	F = matrix([[1.0, dt], [0.0, 1.0]])
+	Q = matrix([[q * dt ** 3 / 3, q * dt ** 2 / 2],
+				[q * dt ** 2 / 2, q * dt]])
+	return F, Q
+
+
+class CrossTrackFilter(object):
+	"""Track the cross-track error and its rate of change.
+
+	This is a KalmanFilter with the constant_velocity model and a measurement
+	of the cross-track error alone, written out in closed form.  With two
+	states and one measurement, each step is a few multiplications, with no
+	matrices to build or invert.
+
+	Readings further than sqrt(GATE) std devs from the prediction are
+	rejected as sonar spikes.
+	"""
+
+	def __init__(self, cte=0.0, rate=0.0,
+				 measurement_noise=CTE_MEASUREMENT_NOISE,
+				 process_noise=CTE_PROCESS_NOISE, gate=GATE):
+		"""Create a CrossTrackFilter.
+
+		Args:
+		cte - the initial cross-track error, in cm.
+		rate - the initial rate of change of the cross-track error, in cm/s.
+		measurement_noise - the std dev of a sensed cross-track error.
+		process_noise - the std dev of the change in rate per sec.
+		gate - the squared number of std devs beyond which a reading is
+			rejected, or None to accept every reading.
+		"""
+
+		self.r = measurement_noise ** 2
+		self.q = process_noise ** 2
+		self.gate = gate
+		self.rejected = 0
+		self.reset(cte, rate)
+
+	def reset(self, cte=0.0, rate=0.0):
+		"""Start tracking again from a sensed cross-track error."""
+
+		self.cte = float(cte)
+		self.rate = float(rate)
+		self.p00 = self.r
+		self.p01 = 0.0
+		self.p11 = RATE_SIGMA ** 2
+
+	@property
+	def P(self):
+		"""The covariance of (cte, rate)."""
+
+		return [[self.p00, self.p01], [self.p01, self.p11]]
+
+	def predict(self, dt):
+		"""Project the estimate forward by dt secs."""
+
+		q = self.q
+		self.cte += self.rate * dt
+		self.p00 += dt * (2 * self.p01 + dt * self.p11) + q * dt ** 3 / 3
+		self.p01 += dt * self.p11 + q * dt ** 2 / 2
+		self.p11 += q * dt
+
+	def update(self, cte):
+		"""Correct the estimate with a sensed cross-track error.
+
+		Returns False if the reading was rejected by the gate.
+		"""
+
+		y = cte - self.cte
+		s = self.p00 + self.r
+		if self.gate is not None and y * y > self.gate * s:
+			self.rejected += 1
+			return False
+
+		k0 = self.p00 / s
+		k1 = self.p01 / s
+		self.cte += k0 * y
+		self.rate += k1 * y
+		self.p11 -= k1 * self.p01
+		self.p01 -= k1 * self.p00
+		self.p00 -= k0 * self.p00
+		return True
+
+	def step(self, cte, dt):
+		"""Predict forward by dt secs and update with a sensed cte.
+
+		Returns the new estimate (cte, rate).
+		"""
+
+		self.predict(dt)
+		self.update(cte)
+		return self.cte, self.rate
+
+	@property
+	def sigma(self):
+		"""The std dev of the cross-track error estimate."""
+
+		return math.sqrt(self.p00)
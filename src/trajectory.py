@@ -0,0 +1,247 @@
+"""Smooth trajectories through a maze, and a controller to follow them.
+
+A route of cells, as from planner.Planner, turns sharply at the center of
+each cell.  The robot can only follow it by stopping to rotate at every
+corner.  Here the route is smoothed into a path of gentle curves, and
+sampled at even steps of arc length into a Trajectory.  A Follower steers
+along it without stopping:
+
+	path = trajectory.route_path(grid, route)
+	follower = trajectory.Follower(trajectory.Trajectory(path))
+	...
+	robot.steer(follower.steer(odometry.update(*robot.encoder_deltas())),
+				max_turn_ratio=trajectory.MAX_TURN_RATIO)
+
+Coordinates follow maze.Maze: x and y in cm, and theta in radians
+counter-clockwise from the x axis.
+"""
+
+import math
+
+import numpy
+
+from robot import DEFAULT_SPEED, TURN_SPEED, WHEEL_BASE
+
+WEIGHT_DATA = 0.05		# Pull of each point towards the original path
+WEIGHT_SMOOTH = 0.45	# Pull of each point towards its neighbors
+TOLERANCE = 0.001		# Cm of total change at which smoothing stops
+MAX_ITERATIONS = 10000
+SPACING = 5.0			# Cm between the points of a path, and of a trajectory
+CRUISE_SPEED = 17.5		# Cm/s of the robot driving straight at DEFAULT_SPEED
+MAX_TURN_RATIO = 3.0	# Max ratio of outside wheel to inside wheel speeds
+LOOKAHEAD = 15.0		# Cm along the trajectory to steer towards
+
+
+def smooth(path, weight_data=WEIGHT_DATA, weight_smooth=WEIGHT_SMOOTH,
+		   tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+	"""Return a smoothed copy of a path, by gradient descent.
+
+	Each point is pulled towards its place on the original path, and
+	towards the midpoint of its neighbors, until the points move less than
+	tolerance in total.  The ends of the path stay fixed.  All the points
+	are moved at once, so weight_data + 4 * weight_smooth must be less
+	than 2 for the descent to converge.  The ratio of weight_smooth to
+	weight_data sets how many points a corner is rounded over.
+
+	Args:
+	path - a sequence of points, as an n x d array-like.
+
+	Returns an n x d array.
+	"""
+
+	path = numpy.array(path, dtype=float)
+	result = path.copy()
+	for i in range(max_iterations):
+		inner = result[1:-1]
+		change = (weight_data * (path[1:-1] - inner) +
+				  weight_smooth * (result[:-2] + result[2:] - 2 * inner))
+		inner += change
+		if abs(change).sum() < tolerance:
+			break
+	return result
+
+
+def densify(path, spacing=SPACING):
+	"""Return the points along a path of straight segments, spacing apart.
+
+	Every corner of the path is kept, and each segment is divided evenly,
+	into steps of at most spacing.
+	"""
+
+	path = numpy.asarray(path, dtype=float)
+	points = [path[:1]]
+	for start, end in zip(path[:-1], path[1:]):
+		steps = max(1, int(math.ceil(numpy.hypot(*(end - start)) / spacing)))
+		fraction = numpy.arange(1, steps + 1, dtype=float)[:, numpy.newaxis]
+		points.append(start + (end - start) * fraction / steps)
+	return numpy.concatenate(points)
+
+
+def route_path(grid, route, spacing=SPACING, **kwargs):
+	"""Return a smoothed path through the centers of a route's cells.
+
+	Args:
+	grid - the maze.MazeGrid of the route.
+	route - a sequence of (row, col) cells, as from planner.Planner.
+	spacing - the distance between the points of the path, in cm.
+	kwargs - passed on to smooth().
+
+	Returns an n x 2 array of (x, y) points.
+	"""
+
+	centers = [grid.cell_center(row, col) for row, col in route]
+	return smooth(densify(centers, spacing), **kwargs)
+
+
+def turn_ratio(curvature):
+	"""Return the ratio of outside to inside wheel speeds for a curvature.
+
+	Args:
+	curvature - the inverse of the radius of the turn, in 1/cm.
+	"""
+
+	half = abs(curvature) * WHEEL_BASE / 2.0
+	if half >= 1:
+		return float('inf')
+	return (1 + half) / (1 - half)
+
+
+class Trajectory(object):
+	"""A path sampled at even steps of arc length, with the time to each.
+
+	The robot speeds up around curves, because steering speeds up the
+	outside wheel, and the times allow for that.  Every sample is a
+	constant distance apart, so a reference is looked up by arc length
+	with no search.
+	"""
+
+	def __init__(self, path, spacing=SPACING, speed=CRUISE_SPEED,
+				 max_turn_ratio=MAX_TURN_RATIO):
+		"""Create a Trajectory.
+
+		Args:
+		path - the points to follow, as an n x 2 array-like of (x, y).
+		spacing - the arc length between samples, in cm.
+		speed - the speed of the robot driving straight, in cm/s.
+		max_turn_ratio - the max ratio of outside to inside wheel speeds.
+
+		Raises ValueError if the path has zero length.
+		"""
+
+		path = numpy.asarray(path, dtype=float)
+		steps = numpy.hypot(*numpy.diff(path, axis=0).T)
+		along = numpy.concatenate(([0], numpy.cumsum(steps)))
+		self.length = along[-1]
+		if not self.length > 0:
+			raise ValueError('path has zero length')
+		s = numpy.linspace(0, self.length,
+						   max(2, int(math.ceil(self.length / spacing)) + 1))
+		self.spacing = s[1] - s[0]
+		self.x = numpy.interp(s, along, path[:, 0])
+		self.y = numpy.interp(s, along, path[:, 1])
+		self._heading = numpy.unwrap(numpy.arctan2(numpy.gradient(self.y),
+												   numpy.gradient(self.x)))
+		self.heading = (self._heading + math.pi) % (2 * math.pi) - math.pi
+		self.curvature = numpy.gradient(self._heading) / self.spacing
+
+		# The inside wheel turns at the straight speed:
+		ratio = numpy.minimum([turn_ratio(k) for k in self.curvature],
+							  max_turn_ratio)
+		pace = 2 / (speed * (1 + ratio))	# secs per cm
+		self.time = numpy.concatenate(
+			([0], numpy.cumsum((pace[1:] + pace[:-1]) / 2 * self.spacing)))
+
+	@property
+	def duration(self):
+		"""The time to drive the whole trajectory, in seconds."""
+
+		return self.time[-1]
+
+	def index(self, s):
+		"""Return the index of the sample at or before arc length s."""
+
+		return min(max(int(s / self.spacing), 0), len(self.x) - 1)
+
+	def at(self, s):
+		"""Return the reference (x, y, heading, curvature, time) at s.
+
+		Arc lengths beyond the ends are clamped to them, and those between
+		samples are interpolated.
+		"""
+
+		s = min(max(s, 0.0), self.length)
+		i = min(self.index(s), len(self.x) - 2)
+		f = s / self.spacing - i
+
+		def interpolate(a):
+			return float(a[i] + f * (a[i + 1] - a[i]))
+
+		heading = interpolate(self._heading)
+		return (interpolate(self.x), interpolate(self.y),
+				(heading + math.pi) % (2 * math.pi) - math.pi,
+				interpolate(self.curvature), interpolate(self.time))
+
+
+class Follower(object):
+	"""Steer along a Trajectory by pure pursuit.
+
+	Each step, the robot's pose is projected onto the trajectory near where
+	it last was, and the robot steers along the arc to the point lookahead
+	cm further on.
+	"""
+
+	def __init__(self, trajectory, lookahead=LOOKAHEAD,
+				 max_turn_ratio=MAX_TURN_RATIO):
+		self.trajectory = trajectory
+		self.lookahead = lookahead
+		self.max_turn_ratio = max_turn_ratio
+		self.s = 0.0		# Arc length of the robot's projection
+
+	@property
+	def done(self):
+		"""Whether the robot has reached the end of the trajectory."""
+
+		return self.s >= self.trajectory.length - self.trajectory.spacing
+
+	def project(self, x, y):
+		"""Move s to the nearest sample to (x, y), within lookahead of s."""
+
+		t = self.trajectory
+		start = t.index(self.s)
+		end = t.index(self.s + self.lookahead) + 1
+		d = (t.x[start:end] - x) ** 2 + (t.y[start:end] - y) ** 2
+		self.s = max(self.s, (start + int(d.argmin())) * t.spacing)
+		return self.s
+
+	def curvature(self, pose):
+		"""Return the curvature to steer at from pose, in 1/cm."""
+
+		x, y, theta = pose
+		self.project(x, y)
+		target_x, target_y = self.trajectory.at(self.s + self.lookahead)[:2]
+		dx, dy = target_x - x, target_y - y
+		distance = math.hypot(dx, dy)
+		if not distance:
+			return 0.0
+		alpha = math.atan2(dy, dx) - theta
+		return 2 * math.sin(alpha) / distance
+
+	def steer(self, pose):
+		"""Return the steering factor for Robot.steer() from pose.
+
+		Pass max_turn_ratio to Robot.steer() as well, so the turn isn't cut
+		short.
+		"""
+
+		return steering_factor(self.curvature(pose), self.max_turn_ratio)
+
+
+def steering_factor(curvature, max_turn_ratio=MAX_TURN_RATIO):
+	"""Return the Robot.steer() factor that turns at a curvature.
+
+	Positive curvature turns left.  The turn is limited to max_turn_ratio.
+	"""
+
+	ratio = min(turn_ratio(curvature), max_turn_ratio)
+	factor = (ratio - 1) * DEFAULT_SPEED / TURN_SPEED
+	return math.copysign(factor, curvature)
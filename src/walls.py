@@ -0,0 +1,225 @@
+"""Corridor walls fitted to a sweep of distance measurements.
+
+Readings are converted to points in the robot's frame, with x straight
+ahead and y to the left, in cm.  A reading at mount angle a (degrees
+clockwise from ahead) and distance d is the point (d cos a, -d sin a).
+"""
+
+from collections import namedtuple
+import math
+
+import numpy
+
+from sensor import UltrasonicSensor
+
+SIDE_ARC = 60			# Degrees either side of 90 and 270 that see a side wall
+TOLERANCE = 3.0			# Cm from a wall line within which a point is an inlier
+MIN_POINTS = 3			# Fewest inliers that make a wall
+MAX_HYPOTHESES = 256	# Most candidate lines tried for each wall
+
+# The corridor, as fitted to both walls:
+#	width - the distance between the walls, in cm.
+#	cte - the cross-track error, in cm.  Positive is left of center.
+#	heading - the direction of the corridor, in degrees clockwise from
+#		straight ahead.
+#	covariance - the 3x3 covariance of (width, cte, heading).
+Corridor = namedtuple('Corridor', ['width', 'cte', 'heading', 'covariance'])
+
+
+def to_points(angles, distances):
+	"""Return an N x 2 array of the points at the given angles and distances."""
+
+	radians = numpy.radians(numpy.asarray(angles, dtype=float))
+	distances = numpy.asarray(distances, dtype=float)
+	return numpy.column_stack((distances * numpy.cos(radians),
+							   -distances * numpy.sin(radians)))
+
+
+def compensate_motion(angles, distances, poses, pose=None,
+					  max_range=UltrasonicSensor.MAX_RANGE):
+	"""Return readings taken on the move as they would be seen from one pose.
+
+	Each reading is placed at the pose the robot was at when it was taken,
+	and moved into the robot's frame at pose.  Readings at or beyond
+	max_range are left as they are, so that they are still ignored.
+
+	Args:
+	angles - the mount angles of the readings, in degrees.
+	distances - the distances read, in cm.
+	poses - the pose (x, y, theta) of the robot at each reading, as from
+		mapping.Odometry, with theta in radians counter-clockwise.
+	pose - the pose to see the readings from.  Default is the last of poses.
+	max_range - readings at or beyond this distance found no wall.
+
+	Returns a tuple (angles, distances) of float arrays.
+	"""
+
+	distances = numpy.asarray(distances, dtype=float)
+	poses = numpy.asarray(poses, dtype=float).reshape(-1, 3)
+	x, y, theta = poses[-1] if pose is None else pose
+	points = to_points(angles, distances)
+
+	# Rotate each point by the heading it was read at, and translate it by
+	# its position relative to pose:
+	turn = poses[:, 2] - theta
+	cos, sin = numpy.cos(turn), numpy.sin(turn)
+	dx, dy = poses[:, 0] - x, poses[:, 1] - y
+	ahead = (math.cos(theta) * dx + math.sin(theta) * dy +
+			 cos * points[:, 0] - sin * points[:, 1])
+	left = (-math.sin(theta) * dx + math.cos(theta) * dy +
+			sin * points[:, 0] + cos * points[:, 1])
+
+	valid = (distances > 0) & (distances < max_range)
+	compensated = numpy.where(valid, numpy.hypot(ahead, left), distances)
+	angles = numpy.where(valid, -numpy.degrees(numpy.arctan2(left, ahead)),
+						 numpy.asarray(angles, dtype=float)) % 360
+	return angles, compensated
+
+
+def find_line(points, tolerance=TOLERANCE, max_hypotheses=MAX_HYPOTHESES,
+			  random=None):
+	"""Find the points on the line through the most points, by RANSAC.
+
+	Every line through a pair of points is a candidate, and all candidates
+	are scored against all points at once.  If there are more pairs than
+	max_hypotheses, that many are sampled.
+
+	Args:
+	points - an N x 2 array.
+	tolerance - the distance from a line within which a point is on it.
+	max_hypotheses - the most candidate lines to score.
+	random - a numpy RandomState for sampling pairs (default seeded with 0,
+		so fits are repeatable).
+
+	Returns a boolean array that is True for the points on the line.
+	"""
+
+	n = len(points)
+	if n < 2:
+		return numpy.zeros(n, dtype=bool)
+
+	first, second = numpy.triu_indices(n, 1)
+	if len(first) > max_hypotheses:
+		random = random or numpy.random.RandomState(0)
+		chosen = random.choice(len(first), max_hypotheses, replace=False)
+		first, second = first[chosen], second[chosen]
+
+	direction = points[second] - points[first]
+	length = numpy.hypot(direction[:, 0], direction[:, 1])
+	keep = length > 0
+	if not keep.any():
+		return numpy.ones(n, dtype=bool)	# all points are the same
+	first, direction, length = first[keep], direction[keep], length[keep]
+	normal = numpy.column_stack((-direction[:, 1], direction[:, 0]))
+	normal /= length[:, None]
+
+	# Distance of every point from every candidate line:
+	offsets = points[None, :, :] - points[first][:, None, :]
+	residuals = numpy.abs((offsets * normal[:, None, :]).sum(axis=2))
+	inliers = residuals < tolerance
+	return inliers[numpy.argmax(inliers.sum(axis=1))]
+
+
+def fit_corridor(angles, distances, tolerance=TOLERANCE,
+				 max_range=UltrasonicSensor.MAX_RANGE):
+	"""Fit two parallel walls to a sweep.
+
+	Readings within SIDE_ARC of 270 degrees are taken as the left wall, and
+	of 90 degrees as the right.  Outliers in each are rejected by RANSAC,
+	then both walls are fitted together by total least squares, sharing one
+	direction.
+
+	Args:
+	angles - the mount angles of the readings, in degrees.
+	distances - the distances read, in cm.
+	tolerance - the distance from a wall within which a point is on it.
+	max_range - readings at or beyond this distance are ignored.
+
+	Returns a Corridor, or None if either wall has too few points.
+	"""
+
+	angles = numpy.asarray(angles, dtype=float) % 360
+	distances = numpy.asarray(distances, dtype=float)
+	valid = (distances > 0) & (distances < max_range)
+	points = to_points(angles, distances)
+
+	walls = []
+	for side in (270, 90):
+		on_side = valid & (numpy.abs(angles - side) <= SIDE_ARC)
+		wall = points[on_side]
+		wall = wall[find_line(wall, tolerance)]
+		if len(wall) < MIN_POINTS:
+			return None
+		walls.append(wall)
+
+	return _fit_parallel(walls[0], walls[1])
+
+
+def fit_wall(angles, distances, tolerance=TOLERANCE,
+			 max_range=UltrasonicSensor.MAX_RANGE, min_points=MIN_POINTS):
+	"""Fit one wall to the readings of a sweep on the same line.
+
+	Outliers are rejected by RANSAC, then the wall is fitted to the rest by
+	total least squares.
+
+	Args:
+	angles - the mount angles of the readings, in degrees.
+	distances - the distances read, in cm.
+	tolerance - the distance from a wall within which a point is on it.
+	max_range - readings at or beyond this distance are ignored.
+	min_points - the fewest points that make a wall.
+
+	Returns the direction of the wall, in degrees clockwise from straight
+	ahead (-90 to 90), or None if no wall has min_points points.
+	"""
+
+	distances = numpy.asarray(distances, dtype=float)
+	valid = (distances > 0) & (distances < max_range)
+	points = to_points(numpy.asarray(angles, dtype=float)[valid],
+					   distances[valid])
+	wall = points[find_line(points, tolerance)]
+	if len(wall) < max(min_points, 2):
+		return None
+
+	centered = wall - wall.mean(axis=0)
+	direction = numpy.linalg.eigh(centered.T.dot(centered))[1][:, 1]
+	if direction[0] < 0:
+		direction = -direction
+	return -math.degrees(math.atan2(direction[1], direction[0]))
+
+
+def _fit_parallel(left, right):
+	"""Fit parallel lines to the points of the left and right walls."""
+
+	means = [left.mean(axis=0), right.mean(axis=0)]
+	centered = numpy.concatenate((left - means[0], right - means[1]))
+	scatter = centered.T.dot(centered)
+	eigenvalues, eigenvectors = numpy.linalg.eigh(scatter)
+	direction = eigenvectors[:, 1]
+	if direction[0] < 0:
+		direction = -direction
+	normal = numpy.array([-direction[1], direction[0]])
+
+	# Each wall is the line normal . p = c, with c > 0 on the left:
+	c_left, c_right = normal.dot(means[0]), normal.dot(means[1])
+	phi = math.atan2(direction[1], direction[0])
+
+	# Covariance of (phi, c_left, c_right) from the Jacobian of the residuals
+	# normal . p - c:
+	n = len(centered)
+	variance = eigenvalues[0] / (n - 3) if n > 3 else 0.0
+	points = numpy.concatenate((left, right))
+	jacobian = numpy.zeros((n, 3))
+	jacobian[:, 0] = -points.dot(direction)
+	jacobian[:len(left), 1] = -1
+	jacobian[len(left):, 2] = -1
+	covariance = variance * numpy.linalg.pinv(jacobian.T.dot(jacobian))
+
+	# (width, cte, heading) are linear in (phi, c_left, c_right):
+	transform = numpy.array([[0, 1, -1],
+							 [0, -0.5, -0.5],
+							 [-math.degrees(1), 0, 0]])
+	covariance = transform.dot(covariance).dot(transform.T)
+
+	return Corridor(c_left - c_right, -(c_left + c_right) / 2.0,
+					-math.degrees(phi), covariance)